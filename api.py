@@ -0,0 +1,237 @@
+"""Read-only HTTP API over the data behind the dashboard.
+
+Turned off with SAFETY_API=0. The endpoints, under /api:
+
+- GET /api/lgas: the LGA names.
+- GET /api/lgas/<lga>: everything the panels show for one LGA, namely the
+  safety score and rank, and the yearly counts, rates and predicted rate
+  of every crime type.
+- GET /api/lgas/batch?lga=A&lga=B (or POST {"lgas": [...]}): the same for
+  many LGAs in one call. Names that match no LGA are listed under
+  "unknown".
+- GET /api/export.csv and /api/export.parquet: the whole crime table,
+  streamed EXPORT_CHUNK_ROWS rows at a time (Parquet needs pyarrow).
+
+Every GET response carries an ETag (the data version, see
+loader.data_version) and a Last-Modified (the source files' mtime).
+Clients that send them back get a 304 without the response being built,
+until a reload brings in new data.
+"""
+import io
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, Response, jsonify, request
+from werkzeug.http import is_resource_modified
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+API_ENABLED = os.environ.get('SAFETY_API', '1').lower() not in ('0', 'false', 'no')
+EXPORT_CHUNK_ROWS = int(os.environ.get('SAFETY_EXPORT_CHUNK_ROWS', 10000))
+
+# LGAs answered by one batch call
+MAX_BATCH = 500
+
+
+def _number(value):
+    """Returns a NumPy or Python number as a JSON-safe int or float (None for NaN)."""
+    if isinstance(value, np.float32):
+        # Shortest decimal that reads back as the same float32, not the
+        # float64 expansion of it (1008.7143, not 1008.7142944335938)
+        value = float(str(value))
+    elif hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def find_lga(data, name):
+    """Returns the LGA a name refers to, ignoring case and punctuation, or None."""
+    if name in data.store:
+        return name
+    return data.search.lga(name)
+
+
+def lga_metrics(data, lga):
+    """Returns the metrics of one LGA as a JSON-ready dict."""
+    store = data.store
+    ranking = data.ranking
+    i = store.position(lga)
+    result = {'lga': lga}
+    if store.has_column('Final_Safety_Score'):
+        result['safety_score'] = _number(store.value(lga, 'Final_Safety_Score'))
+    if ('safety', None, None) in ranking:
+        result['safety_rank'] = ranking.rank(lga, 'safety')
+        result['lgas_ranked'] = len(ranking)
+    # Other per-LGA numbers of the table, outside the crime arrays
+    result['values'] = {
+        column: _number(values[i])
+        for column, values in store.columns.items()
+        if column not in store.array_columns
+    }
+    crimes = {}
+    for crime in store.crime_types:
+        c = store.crime_index(crime)
+        crimes[crime] = {
+            'counts': {year: _number(store.counts[i, c, y]) for y, year in enumerate(store.years)},
+            'rates': {year: _number(store.rates[i, c, y]) for y, year in enumerate(store.years)},
+        }
+        if store.prediction_year is not None:
+            crimes[crime]['predicted_rate'] = _number(store.predictions[i, c])
+    result['crimes'] = crimes
+    if store.prediction_year is not None:
+        result['prediction_year'] = store.prediction_year
+    return result
+
+
+def table_columns(data):
+    """Returns the columns of the full crime table, in export order."""
+    return list(data.df.columns) + [column for column in data.store.columns if column in data.store.array_columns]
+
+
+def table_chunks(data, rows=EXPORT_CHUNK_ROWS):
+    """Yields the full crime table as dicts of column -> values, `rows` rows at a time.
+
+    The frame only keeps the keys and scores (see Dataset), so the crime
+    columns are read back from the store's arrays. An empty table is one
+    empty chunk, so the exports still carry the header or schema.
+    """
+    store = data.store
+    for start in range(0, max(len(store), 1), rows):
+        stop = min(start + rows, len(store))
+        chunk = {}
+        for column in table_columns(data):
+            if column in store.array_columns:
+                chunk[column] = store.columns[column][start:stop]
+            else:
+                chunk[column] = data.df[column].to_numpy()[start:stop]
+        yield chunk
+
+
+def csv_stream(data):
+    """Yields the full crime table as CSV text, one chunk of rows at a time."""
+    columns = table_columns(data)
+    for i, chunk in enumerate(table_chunks(data)):
+        yield pd.DataFrame(chunk, columns=columns).to_csv(index=False, header=i == 0)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects what is written until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        payload = b''.join(self.chunks)
+        self.chunks = []
+        return payload
+
+
+def parquet_stream(data):
+    """Yields the full crime table as a Parquet file, one row group per chunk of rows."""
+    sink = _ChunkSink()
+    writer = None
+    for chunk in table_chunks(data):
+        table = pa.table({column: pa.array(values) for column, values in chunk.items()})
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def create_blueprint(current, url_prefix='/api'):
+    """Returns the API blueprint. `current` returns the Dataset to serve."""
+    api = Blueprint('api', __name__, url_prefix=url_prefix)
+
+    def conditional(data, build):
+        """Returns build(), or a 304 when the client has this data version already."""
+        if request.method in ('GET', 'HEAD') and not is_resource_modified(
+                request.environ, etag=data.version, last_modified=data.modified):
+            response = Response(status=304)
+        else:
+            response = build()
+        response.set_etag(data.version)
+        response.last_modified = data.modified
+        # Clients may keep responses but must revalidate them, as a reload
+        # can change the data at any time
+        response.cache_control.no_cache = True
+        return response
+
+    def export(data, stream, mimetype, extension):
+        response = Response(stream(data), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="crime-{data.version}.{extension}"'
+        return response
+
+    @api.route('/lgas')
+    def lgas():
+        data = current()
+        return conditional(data, lambda: jsonify(version=data.version, lgas=data.ranking.lgas))
+
+    @api.route('/lgas/batch', methods=['GET', 'POST'])
+    def lgas_batch():
+        data = current()
+        if request.method == 'POST':
+            body = request.get_json(silent=True) or {}
+            names = body.get('lgas') if isinstance(body, dict) else None
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                return jsonify(error='Expected a JSON body like {"lgas": ["Albury", ...]}'), 400
+        else:
+            names = request.args.getlist('lga')
+        if len(names) > MAX_BATCH:
+            return jsonify(error=f'At most {MAX_BATCH} LGAs per call'), 400
+
+        def build():
+            found, unknown = {}, []
+            for name in names:
+                lga = find_lga(data, name)
+                if lga is None:
+                    unknown.append(name)
+                elif lga not in found:
+                    found[lga] = lga_metrics(data, lga)
+            return jsonify(version=data.version, lgas=found, unknown=unknown)
+        return conditional(data, build)
+
+    @api.route('/lgas/<lga>')
+    def lga_detail(lga):
+        data = current()
+        name = find_lga(data, lga)
+        if name is None:
+            return jsonify(error=f'Unknown LGA: {lga}'), 404
+        return conditional(data, lambda: jsonify(version=data.version, **lga_metrics(data, name)))
+
+    @api.route('/export.csv')
+    def export_csv():
+        data = current()
+        return conditional(data, lambda: export(data, csv_stream, 'text/csv', 'csv'))
+
+    @api.route('/export.parquet')
+    def export_parquet():
+        data = current()
+        if pq is None:
+            return jsonify(error='Parquet exports need pyarrow'), 501
+        return conditional(data, lambda: export(data, parquet_stream, 'application/vnd.apache.parquet', 'parquet'))
+
+    return api
+
+
+def init_app(server, current, url_prefix='/api'):
+    """Registers the API on a Flask server, unless SAFETY_API=0."""
+    if API_ENABLED:
+        server.register_blueprint(create_blueprint(current, url_prefix))
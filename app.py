@@ -1,411 +1,1071 @@
-from dash import Dash, html, dash_table, dcc, callback, Output, Input
+from dash import Dash, html, dash_table, dcc, callback, Output, Input, State, Patch, ctx
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import dash_bootstrap_components as dbc
 import dash
-import json
+from dash.exceptions import PreventUpdate
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
 import plotly.graph_objects as go
+from flask import abort, request, send_file
+import api
+from callback_cache import CACHE_TTL as CALLBACK_CACHE_TTL, CallbackCache, backend_from_env
+from dataset import Dataset, DatasetWatcher, VersionRegistry
+from geometry import DEFAULT_DETAIL, DETAIL_LEVELS
+from loader import CACHE_DIR, log_startup_timings, timed
+from metrics import Metrics, counter_lines
+from ranking import percentile, rank_order
+from search_index import normalize
 
-df = pd.read_csv("community_safety_predictions_2025_lga.csv")
-df = df[df['LGA'] != "Lord Howe Island"]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('safety.app')
 
-geojson = json.load(open("NSW-suburb.geojson", "r", encoding="utf-8"))
+# The data every callback reads. A reload builds a new Dataset in the
+# background and swaps this reference (see dataset.py); callbacks take it
+# once, as `data = dataset`, so a request never mixes two versions.
+MEMORY_MAP = os.environ.get('SAFETY_MMAP', '').lower() in ('1', 'true', 'yes')
+dataset = Dataset(mmap=MEMORY_MAP)
 
-# dropdown, checklist options
-suburb = sorted(df['LGA'].unique()) 
-crime_type = ['Theft', 'Drug', 'Assault', 'Damage']
-years = ['2020', '2021', '2022', '2023', '2024']
+# Geometry indexes of the current and recent data versions, so pages loaded
+# before a reload can still fetch the map they reference
+geometry_indexes = OrderedDict([(dataset.geometry_version, dataset.map_geometry)])
+GEOMETRY_VERSIONS_KEPT = 3
+# Data versions whose memory-mapped arrays are kept on disk, newest last
+data_versions = deque([dataset.version], maxlen=GEOMETRY_VERSIONS_KEPT)
+# Versions every process holds, so one does not delete the files of another.
+# Under gunicorn this first record is the master's, which respawned workers
+# fork from.
+version_registry = VersionRegistry()
+version_registry.record(data_versions, geometry_indexes)
+
+FORECAST_HORIZONS = [1, 2, 3, 5]
+TOP_N = 3
+
+# Shared guard for the suburb dropdown
+MAX_SUBURBS = 20
+
+# With SAFETY_SUBURB_SEARCH (the default), the suburb dropdown only ships the
+# selected suburbs and asks the server for matches as the user types,
+# instead of listing every LGA in the page
+SUBURB_SEARCH = os.environ.get('SAFETY_SUBURB_SEARCH', '1').lower() not in ('0', 'false', 'no')
+SEARCH_RESULTS = 20
+INITIAL_SUBURBS = ['Albury', 'Ballina']
+
+# Rows listed by the nearby areas panel
+NEARBY_RESULTS = 15
+
+# One colour per selected suburb, the original pink and blue first
+SUBURB_COLORS = ['#ef43cf', '#38b6ff'] + px.colors.qualitative.Plotly[2:] + px.colors.qualitative.Light24
+
+# Callback results shared between workers, keyed on the data they were built from
+callback_cache = CallbackCache(backend_from_env(), version=lambda: dataset.version)
+
+# Crime types with a weight slider. Callbacks are registered once, so these
+# stay as they were at startup; crime types added by a reload get weight 1.
+WEIGHT_CRIMES = list(dataset.crime_types)
+
+def swap_dataset(new):
+    """Makes `new` the dataset that requests use."""
+    global dataset
+    with heatmap_cache_lock:
+        geometry_indexes[new.geometry_version] = new.map_geometry
+        geometry_indexes.move_to_end(new.geometry_version)
+        while len(geometry_indexes) > GEOMETRY_VERSIONS_KEPT:
+            geometry_indexes.popitem(last=False)
+        dataset = new
+        heatmap_cache.clear()
+        data_versions.append(new.version)
+        kept = list(data_versions), list(geometry_indexes)
+    # The cache directories of versions no process holds any more are deleted
+    version_registry.record(*kept)
+    version_registry.remove_unused()
+
+# Reloads the data when the source files change (SAFETY_RELOAD_INTERVAL
+# seconds between checks, 0 to turn off). Started per process: by
+# start_data_watcher() under gunicorn (post_fork), or below with app.py.
+data_watcher = DatasetWatcher(lambda: dataset, swap_dataset, mmap=MEMORY_MAP)
+
+def start_data_watcher():
+    # A forked worker holds the versions it inherited until its first reload
+    with heatmap_cache_lock:
+        kept = list(data_versions), list(geometry_indexes)
+    version_registry.record(*kept)
+    data_watcher.start()
+
+# With SAFETY_BACKGROUND_MAP=1, the heatmap is built in a background job
+# instead of the request thread, so slow map renders do not hold up the other
+# panels. Jobs are run by a DiskcacheManager: a process per job, results in a
+# diskcache directory under CACHE_DIR, no broker needed. Without the
+# diskcache extras (pip install "dash[diskcache]") the heatmap is built in
+# the request as before.
+BACKGROUND_MAP = os.environ.get('SAFETY_BACKGROUND_MAP', '').lower() in ('1', 'true', 'yes')
+BACKGROUND_JOB_EXPIRE = int(os.environ.get('SAFETY_BACKGROUND_JOB_EXPIRE', 300))
+
+def background_manager():
+    """Returns the job manager for background callbacks, or None if unavailable."""
+    if not BACKGROUND_MAP:
+        return None
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        return DiskcacheManager(diskcache.Cache(os.path.join(CACHE_DIR, 'background')), expire=BACKGROUND_JOB_EXPIRE)
+    except ImportError as error:
+        logger.warning('Building the heatmap in the request thread, background callbacks need dash[diskcache]: %s', error)
+        return None
+
+background_callback_manager = background_manager()
+
+# Figures built by background jobs. Each job is a new process, so its own
+# heatmap cache is gone when it exits; the jobs share their figures through
+# the manager's diskcache instead.
+shared_figures = background_callback_manager.handle if background_callback_manager is not None else None
 
 external_stylesheets = [dbc.themes.DARKLY]
-app = Dash(__name__, external_stylesheets=external_stylesheets)
+app = Dash(__name__, external_stylesheets=external_stylesheets,
+           background_callback_manager=background_callback_manager)
+
+# Callback timings and response sizes, served from /metrics (SAFETY_METRICS=1)
+metrics = Metrics()
+metrics.collectors.append(lambda: [
+    line
+    for kind in ('hits', 'misses', 'errors')
+    for line in counter_lines(
+        f'safety_callback_cache_{kind}_total', f'Shared callback cache {kind}.', 'callback',
+        {name: counts[kind] for name, counts in callback_cache.stats().items()})
+])
+metrics.init_app(app.server)
+
+# Read-only JSON, CSV and Parquet endpoints under /api (SAFETY_API=0 turns them off)
+api.init_app(app.server, lambda: dataset)
 
 # Define color scheme
 BACKGROUND_COLOR = '#2b2f42'  
 CARD_COLOR = '#353a50'        
 TEXT_COLOR = 'white'
 
-# For Interactive map
+# Map geometry files
+@app.server.route('/_geometry/<version>/<layer>/<level>.json')
+def serve_geometry(version, layer, level):
+    index = geometry_indexes.get(version)
+    path = None if index is None else index['files'].get((layer, level))
+    if path is None:
+        abort(404)
+    # The URL changes with the geometry version, so browsers can keep it for good
+    if 'gzip' in request.accept_encodings:
+        response = send_file(path + '.gz', mimetype='application/json', max_age=31536000)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_file(path, mimetype='application/json', max_age=31536000)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
-nsw_loca_2 = []
-count = []
-for feature in geojson["features"]:
-    nsw_loca_2.append(feature[u'properties'][u'nsw_loca_2'])
-    count.append( 0 )
+def geometry_url(layer, detail, data):
+    """Returns the URL the browser loads a map layer from."""
+    return app.get_relative_path(f'/_geometry/{data.geometry_version}/{layer}/{detail}.json')
 
-temp = { 'nsw_loca_2': nsw_loca_2, 'Theft_Count_2020': 0, 'Theft_Rate_2020': 0, 'Theft_Count_2021': 0, 'Theft_Rate_2021': 0, 'Theft_Count_2022': 0, 'Theft_Rate_2022': 0, 'Theft_Count_2023': 0, 'Theft_Rate_2023': 0, 'Theft_Count_2024': 0, 'Theft_Rate_2024': 0, 'Damage_Count_2020': 0, 'Damage_Rate_2020': 0, 'Damage_Count_2021': 0, 'Damage_Rate_2021': 0, 'Damage_Count_2022': 0, 'Damage_Rate_2022': 0, 'Damage_Count_2023': 0, 'Damage_Rate_2023': 0, 'Damage_Count_2024': 0, 'Damage_Rate_2024': 0, 'Drug_Count_2020': 0, 'Drug_Rate_2020': 0, 'Drug_Count_2021': 0, 'Drug_Rate_2021': 0, 'Drug_Count_2022': 0, 'Drug_Rate_2022': 0, 'Drug_Count_2023': 0, 'Drug_Rate_2023': 0, 'Drug_Count_2024': 0, 'Drug_Rate_2024': 0, 'Assault_Count_2020': 0, 'Assault_Rate_2020': 0, 'Assault_Count_2021': 0, 'Assault_Rate_2021': 0, 'Assault_Count_2022': 0, 'Assault_Rate_2022': 0, 'Assault_Count_2023': 0, 'Assault_Rate_2023': 0, 'Assault_Count_2024': 0, 'Assault_Rate_2024': 0, 'Safety_Score': 0, 'Model_Safety_Score': 0, 'Adjusted_Safety_Score': 0, 'Color_Code': 0, 'Predicted_Assault_2025': 0, 'Predicted_Drug_2025': 0, 'Predicted_Damage_2025': 0, 'Predicted_Theft_2025': 0,'New_Safety_Score': 0, 'Final_Safety_Score': 0}
+# Heatmap figure cache
+# The choropleth only depends on the crime type, year and map options, so each combination
+# is built once and reused until it is evicted (least recently used first).
+HEATMAP_CACHE_SIZE = int(os.environ.get('HEATMAP_CACHE_SIZE', 32))
+heatmap_cache = OrderedDict()
+heatmap_cache_lock = threading.Lock()
 
-df1 = pd.DataFrame(temp)
+def suburb_outlines(detail, data):
+    """Returns a transparent choropleth trace that only draws suburb borders."""
+    return go.Choropleth(
+        geojson=geometry_url('suburbs', detail, data),
+        featureidkey="properties.nsw_loca_2",
+        locations=data.suburb_names,
+        z=[0] * len(data.suburb_names),
+        colorscale=[[0, 'rgba(0,0,0,0)'], [1, 'rgba(0,0,0,0)']],
+        showscale=False,
+        marker_line_color='white',
+        marker_line_width=0.3,
+        hoverinfo='skip'
+    )
 
-df2 = df[['nsw_loca_2', 'Theft_Count_2023']]
+def build_heatmap(selected_crime_type, selected_year, detail=DEFAULT_DETAIL, show_suburbs=False, data=None):
+    """Builds the crime heatmap for a crime type and year at a level of detail."""
+    data = data or dataset
+    store = data.store
+    crime = selected_crime_type if selected_crime_type in store.crime_types else 'Theft'
+    # int64, not the store's compact dtype: plotly express draws unsigned
+    # integer columns with a discrete colour scale
+    map_data = pd.DataFrame({'LGA': store.lgas, 'count': store.crime_counts(crime, selected_year).astype(np.int64)})
+    
+    heat_map= px.choropleth(map_data,
+        geojson=geometry_url('lgas', detail, data), 
+        locations='LGA', 
+        color='count', 
+        featureidkey="properties.LGA",
+        hover_name='LGA',
+        hover_data={'count': True, 'LGA': False},
+        labels={'count': 'Number of {}'.format(selected_crime_type)},
+        range_color=(0, 1000),
+        color_continuous_scale="Redor"
+    )
+    heat_map.update_geos(
+        fitbounds=None,
+        visible=False,
+        projection_scale=600,
+        center=dict(lat=-33.85, lon=151.13), # Sydney Coordinates
+        )
+    heat_map.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        paper_bgcolor=CARD_COLOR,
+        plot_bgcolor=CARD_COLOR,
+        height=1000,
+        geo=dict(
+            projection_type="mercator",
+            bgcolor=CARD_COLOR,
+            center=dict(lat=-33.85, lon=151.13),
+            projection_scale=600,
+            showframe = False
+            ),
+            coloraxis=dict(
+            colorbar=dict(
+            title=dict(
+                text='Number of {}'.format(selected_crime_type),
+                side='right'
+                ),
+                thickness=20,
+                len=0.75,
+                x=1.02,
+                xanchor='left',
+                y=0.5,
+                yanchor='middle',
+                tickmode='auto',
+                nticks=10,
+                showticklabels=True,
+                tickfont=dict(size=12, color='white'),
+                titlefont=dict(size=14, color='white')
+            )
+        )
+    )
+    if show_suburbs:
+        heat_map.add_trace(suburb_outlines(detail, data))
 
-data = pd.concat([df, df1]).drop_duplicates(subset=['nsw_loca_2'])
-data = data[data['nsw_loca_2'] != "LORD HOWE ISLAND"]
+    return heat_map
 
-def get_top_safest_suburbs():
-    """Returns dynamically populated top 3 safest suburbs."""
-    top_suburbs = df.nlargest(3, 'Final_Safety_Score')['LGA']
-    return html.Ul([
-        html.Li(f"{suburb}") 
-        for suburb in top_suburbs
-    ], style={
-        'list-style': 
-        'none', 
-        'padding': '0', 
-        'font-size': '18px', 
-        'color': TEXT_COLOR})
+def cached_figure(key, build, data):
+    """Returns the cached figure for a key, building it with `build` on a cache miss."""
+    with heatmap_cache_lock:
+        if key in heatmap_cache:
+            heatmap_cache.move_to_end(key)
+            return heatmap_cache[key]
+
+    figure = None if shared_figures is None else shared_figures.get(('heatmap',) + key)
+    if figure is None:
+        figure = build()
+        if shared_figures is not None and data is dataset:
+            shared_figures.set(('heatmap',) + key, figure, expire=CALLBACK_CACHE_TTL)
+
+    with heatmap_cache_lock:
+        if data is not dataset:
+            # Swapped while building, do not keep a figure of the old data
+            return figure
+        heatmap_cache[key] = figure
+        heatmap_cache.move_to_end(key)
+        while len(heatmap_cache) > HEATMAP_CACHE_SIZE:
+            heatmap_cache.popitem(last=False)
+    return figure
+
+def get_heatmap(selected_crime_type, selected_year, detail=DEFAULT_DETAIL, show_suburbs=False, data=None):
+    """Returns the cached heatmap figure, building it on a cache miss."""
+    if detail not in DETAIL_LEVELS:
+        detail = DEFAULT_DETAIL
+    data = data or dataset
+    key = (data.version, selected_crime_type, selected_year, detail, show_suburbs)
+    return cached_figure(
+        key, lambda: build_heatmap(selected_crime_type, selected_year, detail, show_suburbs, data), data)
+
+def build_heatmap_animation(selected_crime_type, detail=DEFAULT_DETAIL, show_suburbs=False, data=None):
+    """Builds the heatmap with one animation frame per year.
+
+    The first trace (and the geometry URL it loads) is shipped once: each
+    frame only restyles its colour values, and the suburb outlines are left
+    alone.
+    """
+    data = data or dataset
+    store = data.store
+    crime = selected_crime_type if selected_crime_type in store.crime_types else 'Theft'
+    years = data.years
+    heat_map = go.Figure(build_heatmap(selected_crime_type, years[-1], detail, show_suburbs, data))
+    heat_map.frames = [
+        go.Frame(name=str(year), traces=[0],
+                 data=[go.Choropleth(z=store.crime_counts(crime, year).astype(np.int64))])
+        for year in years
+    ]
+    # Redrawing is needed for geo traces to pick up the new colours
+    step_args = {'mode': 'immediate', 'frame': {'duration': 0, 'redraw': True}, 'transition': {'duration': 0}}
+    heat_map.update_layout(
+        updatemenus=[dict(
+            type='buttons', direction='left', showactive=False,
+            x=0, xanchor='left', y=0, yanchor='top', pad={'t': 10, 'r': 10},
+            font=dict(color='black'),
+            buttons=[
+                dict(label='Play', method='animate',
+                     args=[None, {**step_args, 'frame': {'duration': 800, 'redraw': True}, 'fromcurrent': True}]),
+                dict(label='Pause', method='animate', args=[[None], step_args]),
+            ],
+        )],
+        sliders=[dict(
+            active=len(years) - 1,
+            x=0.12, len=0.88, y=0, yanchor='top', pad={'t': 10},
+            font=dict(color='white'),
+            currentvalue=dict(prefix='Year: ', font=dict(color='white', size=16)),
+            steps=[dict(label=str(year), method='animate', args=[[str(year)], step_args]) for year in years],
+        )],
+    )
+    return heat_map
+
+def get_heatmap_animation(selected_crime_type, detail=DEFAULT_DETAIL, show_suburbs=False, data=None):
+    """Returns the cached animated heatmap of a crime type, building it on a cache miss."""
+    if detail not in DETAIL_LEVELS:
+        detail = DEFAULT_DETAIL
+    data = data or dataset
+    # One figure per crime type covers every year
+    key = (data.version, selected_crime_type, 'animation', detail, show_suburbs)
+    return cached_figure(
+        key, lambda: build_heatmap_animation(selected_crime_type, detail, show_suburbs, data), data)
+
+def heatmap_patch(heat_map):
+    """Returns a partial update that swaps the colour values of the heatmap."""
+    trace = heat_map.data[0]
+    patched = Patch()
+    patched['data'][0]['z'] = trace.z
+    patched['data'][0]['hovertemplate'] = trace.hovertemplate
+    patched['layout']['coloraxis']['colorbar']['title']['text'] = heat_map.layout.coloraxis.colorbar.title.text
+    return patched
+
+def animation_patch(heat_map, selected_year):
+    """Returns a partial update that moves the animated heatmap to a year."""
+    names = [frame.name for frame in heat_map.frames]
+    if str(selected_year) not in names:
+        return dash.no_update
+    position = names.index(str(selected_year))
+    patched = Patch()
+    patched['data'][0]['z'] = heat_map.frames[position].data[0].z
+    patched['layout']['sliders'][0]['active'] = position
+    return patched
+
+def animation_at(heat_map, selected_year):
+    """Returns the animated heatmap as a dict, showing a year to start from."""
+    names = [frame.name for frame in heat_map.frames]
+    if str(selected_year) not in names or names.index(str(selected_year)) == heat_map.layout.sliders[0].active:
+        return heat_map
+    # A copy, the cached figure stays as built
+    position = names.index(str(selected_year))
+    figure = heat_map.to_dict()
+    figure['data'][0]['z'] = figure['frames'][position]['data'][0]['z']
+    figure['layout']['sliders'][0]['active'] = position
+    return figure
+
+def warm_heatmap_cache():
+    """Pre-builds the heatmap for every crime type and year."""
+    for crime in dataset.crime_types:
+        for year in dataset.years:
+            get_heatmap(crime, year)
+
+if os.environ.get('WARM_HEATMAP_CACHE', '').lower() in ('1', 'true', 'yes'):
+    with timed('warm heatmap cache'):
+        warm_heatmap_cache()
+
+def suburb_options(selected, data):
+    """Returns the initial suburb dropdown options."""
+    if SUBURB_SEARCH:
+        return [{'label': lga, 'value': lga} for lga in selected]
+    return [{'label': lga, 'value': lga} for lga in data.df['LGA']]
 
 # App layout
-app.layout = dbc.Container([
-
-    dbc.Row([
-        dbc.Col([
-            dbc.Row([
-                # Dashboard title
-                html.H1('Sydney Community Safety Dashboard')
-                ], style={'margin': '5px'}),
+# Built per page load, so the options follow the data after a reload
+def serve_layout():
+    data = dataset
+    return dbc.Container([
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Row([
+                    # Dashboard title
+                    html.H1('Sydney Community Safety Dashboard')
+                    ], style={'margin': '5px'}),
             
-            dbc.Row([
-                html.Div([
-                    html.H3("Instructions"),
+                dbc.Row([
+                    html.Div([
+                        html.H3("Instructions"),
                 
-                    # Instructions list
-                    html.Ul([
-                    html.Li('Select a suburb or local government area.', 
-                        style={'color': 'white', 'margin-bottom': '10px', 'font-size': '22px'}),
-                    html.Li('Filter by year.', 
-                        style={'color': 'white', 'margin-bottom': '10px', 'font-size': '22px'}),
-                    html.Li('Filter according to crime type of interest.', 
-                        style={'color': 'white', 'margin-bottom': '10px', 'font-size': '22px'}),
-                    html.Li('Compare suburbs/LGA according to their safety!', 
-                        style={'color': 'white', 'font-size': '22px'})
-                    ], style={
-                        'padding': '20px',
-                        'list-style-type': 'decimal',
-                        'width':'90%',
-                        'margin':'0 auto',
-                        'overflow':'hidden',
-                        'text-align':'left'
-                        }
-                    )
-                ])
-            ], style={
-                'backgroundColor': CARD_COLOR,
-                'border': 'none',
-                'borderRadius': '10px',
-                'margin': '10px',
-                'padding': '20px',
-            }),
-
-            dbc.Row([
-                html.Div([
-                    html.H3("Choose 2 Suburbs (and filter by year)"),
+                        # Instructions list
+                        html.Ul([
+                        html.Li('Select a suburb or local government area.', 
+                            style={'color': 'white', 'margin-bottom': '10px', 'font-size': '22px'}),
+                        html.Li('Filter by year.', 
+                            style={'color': 'white', 'margin-bottom': '10px', 'font-size': '22px'}),
+                        html.Li('Filter according to crime type of interest.', 
+                            style={'color': 'white', 'margin-bottom': '10px', 'font-size': '22px'}),
+                        html.Li('Compare suburbs/LGA according to their safety!', 
+                            style={'color': 'white', 'font-size': '22px'})
+                        ], style={
+                            'padding': '20px',
+                            'list-style-type': 'decimal',
+                            'width':'90%',
+                            'margin':'0 auto',
+                            'overflow':'hidden',
+                            'text-align':'left'
+                            }
+                        )
+                    ])
+                ], style={
+                    'backgroundColor': CARD_COLOR,
+                    'border': 'none',
+                    'borderRadius': '10px',
+                    'margin': '10px',
+                    'padding': '20px',
+                }),
+
+                dbc.Row([
                     html.Div([
-                        # Suburb dropdown
+                        html.H3(f"Choose up to {MAX_SUBURBS} Suburbs (and filter by year)"),
+                        html.Div([
+                            # Suburb dropdown
+                            dcc.Dropdown(
+                                id='suburb-dropdown',
+                                options=suburb_options(INITIAL_SUBURBS, data),
+                                clearable=False, 
+                                multi=True,
+                                value=INITIAL_SUBURBS,
+                                placeholder=f"Please select up to {MAX_SUBURBS} suburbs", 
+                                style={
+                                    'width':'100%',
+                                    'height':'40px',
+                                    'marginRight': '20px',
+                                    'font-size': '20px', 
+                                    'color': 'black',
+                                }
+                            ),
+                            # Year Dropdown
+                            dcc.Dropdown(
+                                id='year-dropdown',
+                                options=data.years,
+                                clearable=True, #original is false
+                                value='2023',
+                                placeholder="Please select year",
+                                style={
+                                    'width': '100%',
+                                    'height':'40px',
+                                    'font-size': '20px', 
+                                    'color': 'black',
+                                }
+                            ),
+                        ], style={
+                            'display':'flex',
+                            'gap':'5px',
+                            'align-items':'center',
+                        }),
+
+                        html.Div(id='warning-message', style={'color': 'red', 'font-weight': 'bold'}),
+                        html.Div(
+                            html.H4("Filter by crime type")
+                            ),
+                        # Crime Type Dropdown
                         dcc.Dropdown(
-                            id='suburb-dropdown',
-                            options=[{'label': lga, 'value': lga} for lga in df['LGA']],
-                            clearable=False, 
-                            multi=True,
-                            value=['Albury','Ballina'],
-                            placeholder="Please select 2 suburbs", 
+                            id='crime-type-dropdown',
+                            options=data.crime_types,
+                            value='Theft',
+                            clearable=True,
                             style={
                                 'width':'100%',
                                 'height':'40px',
                                 'marginRight': '20px',
                                 'font-size': '20px', 
-                                'color': 'black',
+                                'color':'black'
                             }
+                        )
+                    ])
+                ], style={
+                    'backgroundColor': CARD_COLOR, 
+                    'border': 'none', 
+                    'borderRadius': '10px', 
+                    'margin': '10px', 
+                    'padding': '20px'}
+                ), # End Row - All Filter
+
+                dbc.Row([ # Crime weights
+                    html.Div([
+                        html.H3("Your Priorities"),
+                        dcc.Checklist(
+                            id='use-weights',
+                            options=[{'label': 'Score suburbs with my weights', 'value': 'on'}],
+                            value=[],
+                            inputStyle={"margin-right": "8px"},
+                            style={'font-size': '18px', 'color': 'white', 'margin-bottom': '10px'}
                         ),
-                        # Year Dropdown
-                        dcc.Dropdown(
-                            id='year-dropdown',
-                            options=years,
-                            clearable=True, #original is false
-                            value='2023',
-                            placeholder="Please select year",
-                            style={
-                                'width': '100%',
-                                'height':'40px',
-                                'font-size': '20px', 
-                                'color': 'black',
-                            }
+                        html.Div([
+                            html.Div([
+                                html.Label(crime, style={'font-size': '18px', 'color': 'white'}),
+                                dcc.Slider(
+                                    id=f'weight-{crime}',
+                                    min=0,
+                                    max=5,
+                                    step=1,
+                                    value=1,
+                                    marks={i: str(i) for i in range(6)},
+                                ),
+                            ]) for crime in WEIGHT_CRIMES
+                        ]),
+                    ])
+                ], style={
+                    'backgroundColor': CARD_COLOR,
+                    'border': 'none',
+                    'borderRadius': '10px',
+                    'margin': '10px',
+                    'padding': '20px'}
+                ), # End Row - Crime weights
+                    
+                        dbc.Row([  # Top 3 Safest Suburbs
+                            html.H3('Top 3 Safest Suburbs', style={'color': TEXT_COLOR}),
+                            html.Div(
+                                id='top_suburbs',
+                                style={
+                                    'display': 'inline-flex', 
+                                    'gap': '15px',
+                                    'white-space': 'nowrap',
+                                    'overflow': 'hidden',
+                                    'text-overflow': 'ellipsis',
+                                    'font-size': '20px',
+                                    'width': '100%',
+                                }
+                            ),
+                            html.H3('Top 3 Least Safe Suburbs', style={'color': TEXT_COLOR}),
+                            html.Div(
+                                id='least_safe_suburbs',
+                                style={
+                                    'display': 'inline-flex', 
+                                    'gap': '15px',
+                                    'white-space': 'nowrap',
+                                    'overflow': 'hidden',
+                                    'text-overflow': 'ellipsis',
+                                    'font-size': '20px',
+                                    'width': '100%',
+                                }
+                            ),
+                                ], style={
+                                    'backgroundColor': CARD_COLOR,
+                                    'border': 'none',
+                                    'borderRadius': '10px',
+                                    'margin': '10px',
+                                    'padding': '20px',
+                                }), # End Row - Top 3 Safest suburb
+                        
+
+                dbc.Row([ # Heatmap
+                    html.H3("Crime Heatmap"),
+                    html.Div([
+                        # Map level of detail
+                        dcc.RadioItems(
+                            id='map-detail',
+                            options=[{'label': level.capitalize(), 'value': level} for level in DETAIL_LEVELS],
+                            value=DEFAULT_DETAIL,
+                            inline=True,
+                            inputStyle={"margin-right": "8px"},
+                            labelStyle={"margin-right": "30px"},
+                            style={'font-size': '18px', 'color': 'white'}
+                        ),
+                        # Suburb borders on top of the LGA shapes, and
+                        # playing the selected crime type through the years
+                        dcc.Checklist(
+                            id='map-overlay',
+                            options=[{'label': 'Show suburb outlines', 'value': 'suburbs'},
+                                     {'label': 'Animate years', 'value': 'animate'}],
+                            value=[],
+                            inline=True,
+                            inputStyle={"margin-right": "8px"},
+                            style={'font-size': '18px', 'color': 'white'}
                         ),
                     ], style={
-                        'display':'flex',
-                        'gap':'5px',
-                        'align-items':'center',
+                        'display': 'flex',
+                        'gap': '30px',
+                        'align-items': 'center',
+                        'margin': '10px 0',
                     }),
+                    # Shown while a background job builds the heatmap
+                    dbc.Progress(id='map-progress', value=0, max=3, striped=True, animated=True,
+                                 style={'display': 'none', 'height': '6px', 'margin': '0 0 10px'}),
+                    dcc.Graph(
+                        id='choropleth-map', 
+                        ),
+                    # Data version of the figure in the browser, see update_heatmap
+                    dcc.Store(id='map-data-version', data=data.version),
+                    #Data source acknowledgement
+                    html.Div([
+                        html.P('Crime data sourced from the NSW Bureau of Crime Statistics and Research (BOCSAR). Data accessed from the publicly-available dataset via BOCSAR Crime Tool',
+                            style={
+                                'font-style':'italic',
+                                'font-size':'20px',
+                                'color':'white',
+                                'margin':'0px'
+                            })
+                    ]),
+                ], style={
+                    'border':'none', 
+                    'border-radius': '10px', 
+                    'margin': '10px',
+                    'padding': '20px',
+                    'backgroundColor':CARD_COLOR})
+            ], lg=6), # End Left Column
+
 
-                    html.Div(id='warning-message', style={'color': 'red', 'font-weight': 'bold'}),
+            dbc.Col([ # Right Column
+                dbc.Row([ # Safety Score
                     html.Div(
-                        html.H4("Filter by crime type")
-                        ),
-                    # Crime Type Dropdown
-                    dcc.Dropdown(
-                        id='crime-type-dropdown',
-                        options=crime_type,
-                        value='Theft',
-                        clearable=True,
+                        html.H3("Overall Safety Score")
+                    ),
+                    html.Div(
+                        id='gauge-output',
                         style={
-                            'width':'100%',
-                            'height':'40px',
-                            'marginRight': '20px',
-                            'font-size': '20px', 
-                            'color':'black'
+                            'display': 'flex',
+                            'flex-wrap': 'wrap',
+                            'gap': '15px',
+                            'width': '100%',
+                            'justify-content': 'space-evenly'
                         }
                     )
-                ])
-            ], style={
-                'backgroundColor': CARD_COLOR, 
-                'border': 'none', 
-                'borderRadius': '10px', 
-                'margin': '10px', 
-                'padding': '20px'}
-            ), # End Row - All Filter
-                    
-                    dbc.Row([  # Top 3 Safest Suburbs
-                        html.H3('Top 3 Safest Suburbs', style={'color': TEXT_COLOR}),
-                        html.Div(
-                            id='top_suburbs',
-                            style={
-                                'display': 'inline-flex', 
-                                'gap': '15px',
-                                'white-space': 'nowrap',
-                                'overflow': 'hidden',
-                                'text-overflow': 'ellipsis',
-                                'font-size': '20px',
-                                'width': '100%',
-                            }
-                        ),
-                            ], style={
-                                'backgroundColor': CARD_COLOR,
-                                'border': 'none',
-                                'borderRadius': '10px',
-                                'margin': '10px',
-                                'padding': '20px',
-                            }), # End Row - Top 3 Safest suburb
-                        
 
-            dbc.Row([ # Heatmap
-                html.H3("Crime Heatmap"),
-                dcc.Graph(
-                    id='choropleth-map', 
-                    ),
-                #Data source acknowledgement
-                html.Div([
-                    html.P('Crime data sourced from the NSW Bureau of Crime Statistics and Research (BOCSAR). Data accessed from the publicly-available dataset via BOCSAR Crime Tool',
-                        style={
-                            'font-style':'italic',
-                            'font-size':'20px',
-                            'color':'white',
-                            'margin':'0px'
-                        })
-                ]),
-            ], style={
-                'border':'none', 
-                'border-radius': '10px', 
-                'margin': '10px',
-                'padding': '20px',
-                'backgroundColor':CARD_COLOR})
-        ], lg=6), # End Left Column
-
-
-        dbc.Col([ # Right Column
-            dbc.Row([ # Safety Score
-                html.Div(
-                    html.H3("Overall Safety Score")
-                ),
-                html.Div(
-                    id='gauge-output',
-                    style={
-                        'display': 'flex',
-                        'flex-wrap': 'wrap',
-                        'gap': '15px',
-                        'width': '100%',
-                        'justify-content': 'space-evenly'
-                    }
-                )
-
-            ], style={
-                'border':'none', 
-                'border-radius': '10px', 
-                'margin': '10px',
-                'padding': '20px',
-                'backgroundColor':CARD_COLOR}), # end safety score
-            
-            dbc.Row([ # Top Crime Types
-                html.Div(
-                    html.H3("Top Crime Types")
-                ),
-                dbc.Col([ # graph 1
-                        html.Div(id='top-crime-1-graph')
-                ], lg=6),
-                dbc.Col([ # graph 2
-                        html.Div(id='top-crime-2-graph')
-                ], lg=6)
-            ], style={
+                ], style={
                     'border':'none', 
                     'border-radius': '10px', 
                     'margin': '10px',
                     'padding': '20px',
-                    'backgroundColor':CARD_COLOR}
-                    ), # End Top Crime
+                    'backgroundColor':CARD_COLOR}), # end safety score
+            
+                dbc.Row([ # Top Crime Types
+                    html.Div(
+                        html.H3("Top Crime Types")
+                    ),
+                    # One pie per selected suburb, two per row
+                    dbc.Row(id='top-crime-graphs')
+                ], style={
+                        'border':'none', 
+                        'border-radius': '10px', 
+                        'margin': '10px',
+                        'padding': '20px',
+                        'backgroundColor':CARD_COLOR}
+                        ), # End Top Crime
 
-            # 5Y Crime Trend
-            dbc.Row([
-                html.Div(
-                    html.H3("5 Year Crime Trend")
-                ),
-                html.Div(id='crime-trend-graph')
+                # 5Y Crime Trend
+                dbc.Row([
+                    html.Div(
+                        html.H3("5 Year Crime Trend")
+                    ),
+                    # Forecast horizon
+                    dcc.RadioItems(
+                        id='forecast-horizon',
+                        options=[{'label': f'Forecast {h} year{"s" if h > 1 else ""}', 'value': h} for h in FORECAST_HORIZONS],
+                        value=1,
+                        inline=True,
+                        inputStyle={"margin-right": "8px"},
+                        labelStyle={"margin-right": "30px"},
+                        style={'font-size': '18px', 'color': 'white'}
+                    ),
+                    html.Div(id='crime-trend-graph')
                 
+                    ], style={
+                        'border':'none', 
+                        'border-radius': '10px', 
+                        'margin': '10px',
+                        'padding': '20px',
+                        'backgroundColor':CARD_COLOR}
+                        ),
+
+                dbc.Row([ # Crime Compared 
+                    html.Div(
+                        html.H3("Crimes Compared")
+                    ),
+                    html.Div([
+                        dcc.Checklist(
+                            id='crime_count',
+                            options=data.crime_types,
+                            value=['Theft','Drug'],
+                            inline=True,
+                            style={
+                                'display': 'flex',
+                                'justify-content': 'space-around',
+                                'align-items': 'center',
+                                'width': '100%',
+                                'padding': '20px 40px',
+                                'margin': '20px 0',
+                                'font-size': '18px',
+                                'color': 'white'
+                            },
+                            inputStyle={
+                                "margin-right": "10px",
+                                "transform": "scale(1.2)" 
+                },
+                            labelStyle={
+                                "margin-right": "40px",
+                                "display": "inline-flex",
+                                "align-items": "center"
+                }
+                        ),
+                        html.Div(id='crime-compared-graph')
+                    ])
                 ], style={
-                    'border':'none', 
+                    'border':'none',
                     'border-radius': '10px', 
                     'margin': '10px',
                     'padding': '20px',
-                    'backgroundColor':CARD_COLOR}
-                    ),
+                    'backgroundColor':CARD_COLOR}),
 
-            dbc.Row([ # Crime Compared 
-                html.Div(
-                    html.H3("Crimes Compared")
-                ),
-                html.Div([
-                    dcc.Checklist(
-                        id='crime_count',
-                        options=crime_type,
-                        value=['Theft','Drug'],
-                        inline=True,
-                        style={
-                            'display': 'flex',
-                            'justify-content': 'space-around',
-                            'align-items': 'center',
-                            'width': '100%',
-                            'padding': '20px 40px',
-                            'margin': '20px 0',
-                            'font-size': '18px',
-                            'color': 'white'
-                        },
-                        inputStyle={
-                            "margin-right": "10px",
-                            "transform": "scale(1.2)" 
-            },
-                        labelStyle={
-                            "margin-right": "40px",
-                            "display": "inline-flex",
-                            "align-items": "center"
-            }
+                dbc.Row([ # Safest Areas Near Me
+                    html.Div(
+                        html.H3("Safest Areas Near Me")
                     ),
-                    html.Div(id='crime-compared-graph')
-                ])
-            ], style={
-                'border':'none',
-                'border-radius': '10px', 
-                'margin': '10px',
-                'padding': '20px',
-                'backgroundColor':CARD_COLOR})
-        ], lg=6) # End Right Column
+                    html.Div([
+                        # A suburb, LGA or coordinates; clicking an LGA on the map fills it in
+                        dcc.Input(
+                            id='nearby-origin',
+                            type='text',
+                            debounce=True,
+                            placeholder='Suburb, LGA or "lat, lon"',
+                            style={'width': '100%', 'height': '40px', 'font-size': '20px'}
+                        ),
+                        dcc.RadioItems(
+                            id='nearby-mode',
+                            options=[
+                                {'label': 'Within radius', 'value': 'radius'},
+                                {'label': f'{NEARBY_RESULTS} nearest', 'value': 'nearest'},
+                            ],
+                            value='radius',
+                            inline=True,
+                            inputStyle={"margin-right": "8px"},
+                            labelStyle={"margin-right": "30px"},
+                            style={'font-size': '18px', 'color': 'white', 'margin': '10px 0'}
+                        ),
+                        dcc.Slider(
+                            id='nearby-radius',
+                            min=1,
+                            max=50,
+                            step=1,
+                            value=10,
+                            marks={km: f'{km} km' for km in (1, 10, 20, 30, 40, 50)},
+                        ),
+                    ]),
+                    html.Div(id='nearby-areas')
+                ], style={
+                    'border':'none',
+                    'border-radius': '10px', 
+                    'margin': '10px',
+                    'padding': '20px',
+                    'backgroundColor':CARD_COLOR}) # End Safest Areas Near Me
+            ], lg=6) # End Right Column
 
-    ]) # End Big Row
+        ]) # End Big Row
 
-], fluid=True, style={'backgroundColor': BACKGROUND_COLOR}) # End Container
+    ], fluid=True, style={'backgroundColor': BACKGROUND_COLOR}) # End Container
+
+app.layout = serve_layout
+
+# Figure templates
+# Each chart is validated by plotly once, as a template, and then filled in
+# per suburb as a plain dict. Building a validated figure per suburb costs
+# milliseconds each, which would make the callbacks slower with every
+# suburb selected.
+@functools.lru_cache(maxsize=None)
+def gauge_template():
+    return go.Figure(
+        go.Indicator(
+            mode="gauge+number",
+            value=0,
+            title={
+                'text': '', 
+                'font': {'size': 20, 'color':'white'}
+                },
+            number={
+                'font': {'color': 'white'}
+                },
+            gauge={
+                'axis': {'range': [0, 100], 'tickwidth': 1.5, 'tickcolor': "black"},
+                'bar': {'color': '#00CC96', 'thickness': 0.3},
+                'borderwidth': 0,
+                'bgcolor': CARD_COLOR
+            }
+        )
+    ).update_layout(
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        paper_bgcolor=CARD_COLOR,
+        plot_bgcolor=CARD_COLOR
+    ).to_plotly_json()
+
+@functools.lru_cache(maxsize=4)
+def pie_template(crime_types):
+    return px.pie(
+        names=list(crime_types),
+        values=[1] * len(crime_types),
+        title='',
+        hole=.4
+    ).update_traces(textposition='inside').update_layout(
+        title_x=0.5,
+        uniformtext_minsize=12, 
+        uniformtext_mode='hide',
+        paper_bgcolor=CARD_COLOR,
+        plot_bgcolor=CARD_COLOR,
+        title_font=dict(color='white',size=18),
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=-0.2,
+            xanchor='center',
+            x=0.5,
+            font=dict(color='white',size=18)
+        )).to_plotly_json()
 
 # Callback - Top 3 Safest Suburbs
 @app.callback(
-    Output('top_suburbs', 'children'),
-    Input('year-dropdown', 'value')
+    [Output('top_suburbs', 'children'),
+    Output('least_safe_suburbs', 'children')],
+    [Input('year-dropdown', 'value'),
+    Input('use-weights', 'value')] +
+    [Input(f'weight-{crime}', 'value') for crime in WEIGHT_CRIMES]
 )
-def update_top_safest_suburbs(selected_year):
-    """Update the top 3 safest suburbs based on the selected year."""
+@metrics.instrument('top_suburbs')
+@callback_cache.memoize()
+def update_top_safest_suburbs(selected_year, use_weights=None, *weights):
+    """Update the top 3 safest and least safe suburbs based on the selected year."""
+    data = dataset
+    ranking = data.ranking
+    year = known_year(selected_year, data)
 
-    # Top 3 suburbs based on the 'Final_Safety_Score'
-    top_suburbs = df.nlargest(3, 'Final_Safety_Score')['LGA']
-    
-    items = [
+    # Suburbs ranked by the user's weights, the year's safety score, or the
+    # 'Final_Safety_Score' when no year is selected
+    if use_weights:
+        order, _ = rank_order(data.scorer.scores(crime_weights(weights, data), year)[ranking.rows])
+        safest = [ranking.lgas[i] for i in order[:TOP_N]]
+        least_safe = [ranking.lgas[i] for i in order[::-1][:TOP_N]]
+    elif ('safety', None, year) in ranking:
+        safest = ranking.top('safety', year=year, n=TOP_N)
+        least_safe = ranking.bottom('safety', year=year, n=TOP_N)
+    else:
+        safest = least_safe = []
+
+    return suburb_items(safest), suburb_items(least_safe)
+
+def crime_weights(weights, data):
+    """Returns the slider weights in the order of the data's crime types."""
+    return data.scorer.slider_weights(WEIGHT_CRIMES, weights)
+
+def known_suburbs(suburbs, data):
+    """Returns the selected suburbs that are in the data.
+
+    A reload can drop an LGA that a page loaded earlier still has selected.
+    """
+    return [suburb for suburb in suburbs or [] if suburb in data.store.positions]
+
+def known_year(selected_year, data):
+    """Returns the selected year if it is in the data, otherwise None.
+
+    The year dropdown can be cleared, and a reload can drop a year.
+    """
+    return selected_year if selected_year and str(selected_year) in data.store.year_positions else None
+
+def suburb_items(suburbs):
+    return [
         html.Div(f"{suburb}", style={'font-size': '20px', 'margin-bottom': '5px'}) 
-        for suburb in top_suburbs
+        for suburb in suburbs
     ]
-    return items
 
-# Callback - All Filter
+def too_many_suburbs(suburbs):
+    """Returns True when more suburbs are selected than can be compared."""
+    return len(suburbs or []) > MAX_SUBURBS
+
+# Callback - Suburb warning
 @app.callback(
-    [Output('gauge-output', 'children'),
-     Output('warning-message', 'children'),
-     Output('choropleth-map', 'figure'),
-     Output('top-crime-1-graph', 'children'),
-     Output('top-crime-2-graph', 'children'),
-     Output('crime-trend-graph', 'children'),
-     Output('crime-compared-graph', 'children')],
-    [Input('suburb-dropdown', 'value'),
-    Input('year-dropdown', 'value'),
-    Input('crime-type-dropdown', 'value'),
-    Input('crime_count', 'value')]
+    Output('warning-message', 'children'),
+    Input('suburb-dropdown', 'value')
+)
+@metrics.instrument('warning')
+def update_warning(suburbs):
+    if too_many_suburbs(suburbs):
+        return f"Only a maximum of {MAX_SUBURBS} suburbs can be selected."
+    return ""
+
+# Callback - Suburb search
+if SUBURB_SEARCH:
+    @app.callback(
+        Output('suburb-dropdown', 'options'),
+        Input('suburb-dropdown', 'search_value'),
+        State('suburb-dropdown', 'value')
+    )
+    @metrics.instrument('suburb_search')
+    def update_suburb_options(search_value, selected):
+        """Returns the selected suburbs followed by the best matches of the search."""
+        if not search_value:
+            raise PreventUpdate
+        selected = selected or []
+        options = [{'label': lga, 'value': lga} for lga in selected]
+        options += [
+            {'label': label, 'value': lga}
+            for label, lga in dataset.search.search(search_value, SEARCH_RESULTS + len(selected))
+            if lga not in selected
+        ][:SEARCH_RESULTS]
+        return options
+
+# Callback - Nearby areas origin from a map click
+@app.callback(
+    Output('nearby-origin', 'value'),
+    Input('choropleth-map', 'clickData'),
+    prevent_initial_call=True
 )
-def update_gauge(suburbs,selected_year,selected_crime_type,selected_crime):
-    top_crime_1_fig = []
-    top_crime_2_fig = []
-    if len(suburbs) > 2:
-        return [], "Only a maximum of 2 suburbs can be selected.", [], [], [], [], []
+def update_nearby_origin(click):
+    points = (click or {}).get('points') or []
+    if not points or 'location' not in points[0]:
+        raise PreventUpdate
+    return points[0]['location']
 
-    # Heatmap
+# Callback - Heatmap
+def render_heatmap(set_progress, selected_crime_type, selected_year, detail, overlay, figure_version=None):
+    """Returns the heatmap figure (or a patch of it) and the data version it shows.
+
+    `set_progress` reports the finished steps out of 3, or is None outside a
+    background job.
+    """
+    report = set_progress or (lambda progress: None)
     if not selected_crime_type:
         selected_crime_type = 'Theft'
-    selected_column = f"{selected_crime_type}_Count_{selected_year}"
-    
-    if selected_column not in data.columns:
-        selected_column = f'Theft_Count_{selected_year}'
-    
-    heat_map= px.choropleth(data,
-        geojson=geojson, 
-        locations='nsw_loca_2', 
-        color=selected_column, 
-        featureidkey="properties.nsw_loca_2",
-        hover_name='nsw_loca_2',
-        hover_data={selected_column: True, 'nsw_loca_2': False},
-        labels={selected_column: 'Number of {}'.format(selected_crime_type)},
-        range_color=(0, 1000),
-        color_continuous_scale="Redor"
+    show_suburbs = 'suburbs' in (overlay or [])
+    animate = 'animate' in (overlay or [])
+    data = dataset
+    if known_year(selected_year, data) is None:
+        # Keep the map as it is until a year is chosen again
+        raise PreventUpdate
+    full = ctx.triggered_id in (None, 'map-detail', 'map-overlay') or figure_version != data.version
+    report((1, 3))
+    with metrics.span('heatmap.figure'):
+        if animate:
+            heat_map = get_heatmap_animation(selected_crime_type, detail, show_suburbs, data)
+        else:
+            heat_map = get_heatmap(selected_crime_type, selected_year, detail, show_suburbs, data)
+    report((2, 3))
+
+    if animate:
+        # The frames hold every year of the crime type, so changing the year
+        # only moves the slider. A new crime type needs new frames.
+        if full or ctx.triggered_id == 'crime-type-dropdown':
+            return animation_at(heat_map, selected_year), data.version
+        with metrics.span('heatmap.patch'):
+            return animation_patch(heat_map, selected_year), dash.no_update
+
+    # The first render (and new map options) ships the full figure, later
+    # changes only send the new colour values and labels. A figure of older
+    # data may have other LGAs, so it is replaced in full as well.
+    if full:
+        return heat_map, data.version
+    with metrics.span('heatmap.patch'):
+        return heatmap_patch(heat_map), dash.no_update
+
+HEATMAP_OUTPUTS = [Output('choropleth-map', 'figure'), Output('map-data-version', 'data')]
+HEATMAP_INPUTS = [Input('crime-type-dropdown', 'value'),
+                  Input('year-dropdown', 'value'),
+                  Input('map-detail', 'value'),
+                  Input('map-overlay', 'value')]
+
+if background_callback_manager is not None:
+    # The job runs in a process forked from the worker: it sees the worker's
+    # dataset and heatmap cache as they were when the job started, and shares
+    # the figures it builds through the diskcache (see cached_figure). When
+    # an input changes while a job runs, the browser sends the running job
+    # along with the new one and the manager terminates it, so only the
+    # latest choice is rendered.
+    @app.callback(
+        HEATMAP_OUTPUTS,
+        HEATMAP_INPUTS,
+        State('map-data-version', 'data'),
+        background=True,
+        progress=[Output('map-progress', 'value'), Output('map-progress', 'max')],
+        progress_default=[0, 3],
+        running=[
+            (Output('map-progress', 'style'),
+             {'display': 'flex', 'height': '6px', 'margin': '0 0 10px'},
+             {'display': 'none'}),
+            (Output('choropleth-map', 'style'), {'opacity': 0.6}, {'opacity': 1}),
+        ],
+        interval=250,
     )
-    heat_map.update_geos(
-        fitbounds=None,
-        visible=False,
-        projection_scale=600,
-        center=dict(lat=-33.85, lon=151.13), # Sydney Coordinates
-        )
-    heat_map.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0},
-        paper_bgcolor=CARD_COLOR,
-        plot_bgcolor=CARD_COLOR,
-        height=1000,
-        geo=dict(
-            projection_type="mercator",
-            bgcolor=CARD_COLOR,
-            center=dict(lat=-33.85, lon=151.13),
-            projection_scale=600,
-            showframe = False
-            ),
-            coloraxis=dict(
-            colorbar=dict(
-            title=dict(
-                text='Number of {}'.format(selected_crime_type),
-                side='right'
-                ),
-                thickness=20,
-                len=0.75,
-                x=1.02,
-                xanchor='left',
-                y=0.5,
-                yanchor='middle',
-                tickmode='auto',
-                nticks=10,
-                showticklabels=True,
-                tickfont=dict(size=12, color='white'),
-                titlefont=dict(size=14, color='white')
-            )
-        )
+    def update_heatmap(set_progress, selected_crime_type, selected_year, detail, overlay, figure_version=None):
+        return render_heatmap(set_progress, selected_crime_type, selected_year, detail, overlay, figure_version)
+
+    # Timings of the background heatmap, taken in the worker since the job's
+    # own are lost with its process: the requests that start and poll jobs
+    # are labelled 'heatmap', and the time from starting a job to handing out
+    # its result is recorded as the callback's time. Spans inside the job are
+    # not recorded.
+    def heatmap_request():
+        body = request.get_json(silent=True) if request.path.endswith('/_dash-update-component') else None
+        return 'choropleth-map.figure' in (body or {}).get('output', '')
+
+    if metrics.enabled:
+        @app.server.before_request
+        def label_heatmap_request():
+            if heatmap_request():
+                metrics.label('heatmap')
+
+        @app.server.after_request
+        def time_heatmap_job(response):
+            if response.status_code != 200 or not heatmap_request():
+                return response
+            jobs = background_callback_manager.handle
+            if 'cacheKey' not in request.args:
+                # A new job, named in the response
+                job = (response.get_json(silent=True) or {}).get('job')
+                if job is not None:
+                    jobs.set(f'heatmap-started-{job}', time.time(), expire=BACKGROUND_JOB_EXPIRE)
+            elif b'"response"' in response.get_data():
+                started = jobs.pop(f'heatmap-started-{request.args.get("job")}', None)
+                if started is not None:
+                    metrics.observe_callback('heatmap', time.time() - started)
+            return response
+else:
+    @app.callback(
+        HEATMAP_OUTPUTS,
+        HEATMAP_INPUTS,
+        State('map-data-version', 'data')
     )
+    @metrics.instrument('heatmap')
+    def update_heatmap(selected_crime_type, selected_year, detail, overlay, figure_version=None):
+        return render_heatmap(None, selected_crime_type, selected_year, detail, overlay, figure_version)
+
+# Callback - Safety Score Gauge
+@app.callback(
+    Output('gauge-output', 'children'),
+    [Input('suburb-dropdown', 'value'),
+    Input('year-dropdown', 'value'),
+    Input('use-weights', 'value')] +
+    [Input(f'weight-{crime}', 'value') for crime in WEIGHT_CRIMES]
+)
+@metrics.instrument('gauges')
+def update_gauge(suburbs, selected_year=None, use_weights=None, *weights):
+    if too_many_suburbs(suburbs):
+        return []
+    suburbs = known_suburbs(suburbs, dataset)
+    year = known_year(selected_year, dataset)
+    with metrics.span('gauges.figures'):
+        gauges = gauge_graphs(suburbs, list(weights) if use_weights else None, year)
+    return [gauges[suburb] for suburb in suburbs if suburb in gauges]
 
-    # Safety Score Gauge
-    gauges = []
+@callback_cache.memoize(unordered=('suburbs',))
+def gauge_graphs(suburbs, weights=None, year=None):
+    """Returns {suburb: gauge graph}, independent of the order of the suburbs.
+
+    Scores and ranks are the ones the Top 3 lists use: recomputed from the
+    crime rates of `year` (every year when None) with `weights`, or without
+    weights the year's equal-weight score, or the Final_Safety_Score when no
+    year is selected.
+    """
+    gauges = {}
     gauge_style = {
         'flex': '1 1 auto',
         'min-width': '300px',
@@ -414,8 +1074,22 @@ def update_gauge(suburbs,selected_year,selected_crime_type,selected_crime):
         'padding': '0'
     }
 
-    for suburb in suburbs:
-        score = df.loc[df['LGA'] == suburb, 'Final_Safety_Score'].values[0]
+    data = dataset
+    ranking = data.ranking
+    if weights is None:
+        key = ('safety', None, year)
+        if key not in ranking:
+            return gauges
+        scores, ranks = ranking.values[key], ranking.ranks[key]
+    else:
+        scores = data.scorer.scores(crime_weights(weights, data), year)[ranking.rows]
+        _, ranks = rank_order(scores)
+    template = gauge_template()
+    for suburb in known_suburbs(suburbs, data):
+        row = ranking.row_positions[suburb]
+        score = round(float(scores[row]), 1)
+        rank = ranks[row]
+        safer_than = percentile(rank, len(ranking))
 
         # Gauge Colour Logic
         if score >= 70:
@@ -425,140 +1099,98 @@ def update_gauge(suburbs,selected_year,selected_crime_type,selected_crime):
         else:
             gauge_color = '#EF553B'
 
-        gauge = dcc.Graph(
-            figure=go.Figure(
-                go.Indicator(
-                    mode="gauge+number",
-                    value=score,
-                    title={
-                        'text': f"{suburb}", 
-                        'font': {'size': 20, 'color':'white'}
-                        },
-                    number={
-                        'font': {'color': 'white'}
-                        },
-                    gauge={
-                        'axis': {'range': [0, 100], 'tickwidth': 1.5, 'tickcolor': "black"},
-                        'bar': {'color': gauge_color, 'thickness': 0.3},
-                        'borderwidth': 0,
-                        'bgcolor': CARD_COLOR
-                    }
-                )
-            ).update_layout(
-                margin=dict(l=0, r=0, t=0, b=0),
-                height=300,
-                paper_bgcolor=CARD_COLOR,
-                plot_bgcolor=CARD_COLOR
-            ),
-            style=gauge_style
-        )
-        gauges.append(gauge)
+        trace = template['data'][0]
+        figure = {'data': [{
+            **trace,
+            'value': float(score),
+            'title': {**trace['title'], 'text': (
+                f"{suburb}<br><span style='font-size:14px'>Ranked {rank} of {len(ranking)}"
+                f"{f' in {year}' if year else ''}, safer than {safer_than:.0f}% of LGAs</span>")},
+            'gauge': {**trace['gauge'], 'bar': {**trace['gauge']['bar'], 'color': gauge_color}},
+        }], 'layout': template['layout']}
+        gauge = dcc.Graph(figure=figure, style=gauge_style)
+        gauges[suburb] = gauge
 
-    # Top Crime Types - Graph 1
-    try:
-        top_crime_1_data = df[df['LGA'] == suburbs[0]][['LGA', 'Theft_Count_{}'.format(selected_year), 
-                                                                'Drug_Count_{}'.format(selected_year), 
-                                                                'Assault_Count_{}'.format(selected_year), 
-                                                                'Damage_Count_{}'.format(selected_year)]]
-        
-        top_crime_1_counts = {
-            'Theft': top_crime_1_data['Theft_Count_{}'.format(selected_year)].values[0],
-            'Drug': top_crime_1_data['Drug_Count_{}'.format(selected_year)].values[0],
-            'Assault': top_crime_1_data['Assault_Count_{}'.format(selected_year)].values[0],
-            'Damage': top_crime_1_data['Damage_Count_{}'.format(selected_year)].values[0]
-        }
-
-        top_crime_1_fig = dcc.Graph(figure=px.pie(
-            names=top_crime_1_counts.keys(),
-            values=top_crime_1_counts.values(),
-            title='{}'.format(suburbs[0]),
-            hole=.4
-        ).update_traces(textposition='inside').update_layout(
-            title_x=0.5,
-            uniformtext_minsize=12, 
-            uniformtext_mode='hide',
-            paper_bgcolor=CARD_COLOR,
-            plot_bgcolor=CARD_COLOR,
-            title_font=dict(color='white',size=18),
-            legend=dict(
-                orientation='h',
-                yanchor='bottom',
-                y=-0.2,
-                xanchor='center',
-                x=0.5,
-                font=dict(color='white',size=18)
-            )))
-    except IndexError:
-        top_crime_1_fig = []
-
-# Top Crime Types - Graph 2
-    try:
-        top_crime_2_data = df[df['LGA'] == suburbs[1]][['LGA', 'Theft_Count_{}'.format(selected_year), 
-                                                                'Drug_Count_{}'.format(selected_year), 
-                                                                'Assault_Count_{}'.format(selected_year), 
-                                                                'Damage_Count_{}'.format(selected_year)]]
-        
-        top_crime_2_counts = {
-            'Theft': top_crime_2_data['Theft_Count_{}'.format(selected_year)].values[0],
-            'Drug': top_crime_2_data['Drug_Count_{}'.format(selected_year)].values[0],
-            'Assault': top_crime_2_data['Assault_Count_{}'.format(selected_year)].values[0],
-            'Damage': top_crime_2_data['Damage_Count_{}'.format(selected_year)].values[0]
-        }
-
-        top_crime_2_fig = dcc.Graph(figure=px.pie(
-        names=top_crime_2_counts.keys(),
-        values=top_crime_2_counts.values(),
-        title='{}'.format(suburbs[1]),
-        hole=.4
-        ).update_traces(
-            textposition='inside'
-        ).update_layout(
-            title_x=0.5,
-            uniformtext_minsize=12, 
-            uniformtext_mode='hide',
-            paper_bgcolor=CARD_COLOR,
-            plot_bgcolor=CARD_COLOR,
-            title_font=dict(color='white',size=18),
-            legend=dict(
-                orientation='h',
-                yanchor='bottom',
-                y=-0.2,
-                xanchor='center',
-                x=0.5,
-                font=dict(color='white', size=18)
-            )
-        ))
-    except IndexError:
-        top_crime_2_fig = []
+    return gauges
 
+# Callback - Top Crime Types
+@app.callback(
+    Output('top-crime-graphs', 'children'),
+    [Input('suburb-dropdown', 'value'),
+    Input('year-dropdown', 'value')]
+)
+@metrics.instrument('top_crimes')
+def update_top_crimes(suburbs, selected_year):
+    if too_many_suburbs(suburbs) or not suburbs or known_year(selected_year, dataset) is None:
+        return []
+    suburbs = known_suburbs(suburbs, dataset)
 
-# 5Y Crime Trend
-    try:
-        suburb1_trend = df[df['LGA'] == suburbs[0]]
-        suburb1_trend_rates = [suburb1_trend[f'{selected_crime_type}_Rate_{year}'].values[0] for year in years[:-1]] + [suburb1_trend[f'Predicted_{selected_crime_type}_2025'].values[0]]
-            
-        fig_trend = go.Figure()
-        fig_trend.add_trace(go.Scatter(x=years[1:], y=suburb1_trend_rates[:-1], mode='lines+markers', line=dict(color='#ef43cf', width=4), name=f'{suburbs[0]} - Actual'))
-        fig_trend.add_trace(go.Scatter(x=[years[-1],'2025'], y=suburb1_trend_rates[-2:], mode='lines+markers', line=dict(dash='dot', color='#ef43cf', width=4), name=f'{suburbs[0]} - Predicted'))
-    except IndexError:
-        ret = False
+    # Top Crime Types - one pie per suburb
+    with metrics.span('top_crimes.pies'):
+        pies = top_crime_graphs(suburbs, selected_year)
+    return [dbc.Col(pies[suburb], lg=6) for suburb in suburbs if suburb in pies]
 
-    try:
-        suburb2_trend = df[df['LGA'] == suburbs[1]]
-        suburb2_trend_rates = [suburb2_trend[f'{selected_crime_type}_Rate_{year}'].values[0] for year in years[:-1]] + [suburb2_trend[f'Predicted_{selected_crime_type}_2025'].values[0]]
-    
-        fig_trend.add_trace(go.Scatter(x=years[1:], y=suburb2_trend_rates[:-1], mode='lines+markers', line=dict(color='#38b6ff', width=4), name=f'{suburbs[1]} - Actual'))
-        fig_trend.add_trace(go.Scatter(x=[years[-1], '2025'], y=suburb2_trend_rates[-2:], mode='lines+markers', line=dict(dash='dot', color='#38b6ff', width=4), name=f'{suburbs[1]} - Predicted'))
-    except IndexError:
-        ret = False
-    
-    try:
-        fig_trend
-    except NameError:
-        crime_trend_graph = []
-    else:
-        fig_trend.update_layout(
-title=dict(
+@callback_cache.memoize(unordered=('suburbs',))
+def top_crime_graphs(suburbs, selected_year):
+    """Returns {suburb: top crime types pie}, independent of the order of the suburbs."""
+    data = dataset
+    store = data.store
+    suburbs = known_suburbs(suburbs, data)
+    positions = np.array([store.position(suburb) for suburb in suburbs], dtype=int)
+    top_crime_counts = store.counts[positions, :, store.year_index(selected_year)]
+
+    template = pie_template(tuple(data.crime_types))
+    trace = template['data'][0]
+    title = template['layout']['title']
+    return {
+        suburb: dcc.Graph(figure={
+            'data': [{**trace, 'values': counts.tolist()}],
+            'layout': {**template['layout'], 'title': {**title, 'text': '{}'.format(suburb)}},
+        })
+        for suburb, counts in zip(suburbs, top_crime_counts)
+    }
+
+# Callback - 5Y Crime Trend
+@app.callback(
+    Output('crime-trend-graph', 'children'),
+    [Input('suburb-dropdown', 'value'),
+    Input('crime-type-dropdown', 'value'),
+    Input('forecast-horizon', 'value')]
+)
+@metrics.instrument('crime_trend')
+@callback_cache.memoize()
+def update_crime_trend(suburbs, selected_crime_type, horizon=1):
+    if too_many_suburbs(suburbs):
+        return []
+    if not selected_crime_type:
+        selected_crime_type = 'Theft'
+    data = dataset
+    store = data.store
+    years = data.years
+    suburbs = known_suburbs(suburbs, data)
+    if not suburbs:
+        return []
+    horizon = horizon or 1
+
+    # 5Y Crime Trend: actual rates, then the fitted trend from the last year on.
+    # The rates and forecasts of every suburb are sliced in one go, and the
+    # traces are plain dicts (see Figure templates).
+    positions = np.array([store.position(suburb) for suburb in suburbs], dtype=int)
+    crime_position = store.crime_index(selected_crime_type)
+    # Rates are float32 in the store, rounded so the chart does not show float32 noise
+    trend_rates = store.rates[positions, crime_position, :].astype(float).round(2)
+    forecast_years, forecast_rates = data.forecaster.series(positions, crime_position, horizon)
+    forecast_x = [years[-1]] + [str(year) for year in forecast_years]
+
+    traces = []
+    for i, suburb in enumerate(suburbs):
+        color = SUBURB_COLORS[i % len(SUBURB_COLORS)]
+        traces.append(dict(type='scatter', x=years, y=trend_rates[i].tolist(), mode='lines+markers', line=dict(color=color, width=4), name=f'{suburb} - Actual'))
+        traces.append(dict(type='scatter', x=forecast_x, y=[float(trend_rates[i, -1])] + forecast_rates[i].tolist(), mode='lines+markers', line=dict(dash='dot', color=color, width=4), name=f'{suburb} - Predicted'))
+
+    fig_trend = go.Figure()
+    fig_trend.update_layout(
+        title=dict(
             text=f'{selected_crime_type} Rate Trend',
             font=dict(color='white',size=18)
         ),
@@ -577,92 +1209,141 @@ title=dict(
             bgcolor='#353a50',
             bordercolor='white'
         ),
-            paper_bgcolor=CARD_COLOR,
-            plot_bgcolor=CARD_COLOR
+        paper_bgcolor=CARD_COLOR,
+        plot_bgcolor=CARD_COLOR
+    )
+    crime_trend_graph = dcc.Graph(figure={'data': traces, 'layout': fig_trend.to_plotly_json()['layout']})
 
-        )
-        crime_trend_graph = dcc.Graph(figure=fig_trend)
+    return crime_trend_graph
 
-    # callback for crime compared
-    if not selected_crime or not selected_year:
-        crime_compare_graph = []
-    else:
-        fig = go.Figure()
-
-        for crime in selected_crime:
-            count_column = '{}_Count_{}'.format(crime, selected_year)
-
-            if count_column in df.columns:
-                # Filter data for Suburb 1
-                try:
-                    crime1_compared_data = df[df['LGA'] == suburbs[0]]
-                    crime1_compared_sum = crime1_compared_data[count_column].sum()
-                    fig.add_trace(
-                        go.Bar(
-                            x=[crime],
-                            y=[crime1_compared_sum],
-                            name= '{}'.format(suburbs[0]),
-                            marker=dict(color='#ef43cf', opacity=0.75),
-                            offsetgroup=0,
-                            marker_line_width=0
-                            )
-                    )
-                except IndexError:
-                    del fig
-                    break
-                
-                # Filter data for Suburb 2
-                try:
-                    crime2_compared_data = df[df['LGA'] == suburbs[1]]
-                    crime2_compared_sum = crime2_compared_data[count_column].sum()
-                    fig.add_trace(
-                        go.Bar(
-                            x=[crime],
-                            y=[crime2_compared_sum],
-                            name= '{}'.format(suburbs[1]),
-                            marker=dict(color='#38b6ff', opacity=0.75),
-                            offsetgroup=1,
-                            marker_line_width=0
-                            )
-                    )
-                except IndexError:
-                    ret = False
+# Callback - Crimes Compared
+@app.callback(
+    Output('crime-compared-graph', 'children'),
+    [Input('suburb-dropdown', 'value'),
+    Input('year-dropdown', 'value'),
+    Input('crime_count', 'value')]
+)
+@metrics.instrument('crime_compared')
+@callback_cache.memoize()
+def update_crime_compared(suburbs, selected_year, selected_crime):
+    if too_many_suburbs(suburbs):
+        return []
+    data = dataset
+    store = data.store
+    suburbs = known_suburbs(suburbs, data)
+    if not selected_crime or known_year(selected_year, data) is None or not suburbs:
+        return []
 
-    try:
-        fig
-    except NameError:
-        crime_compare_graph = []
+    compared_crimes = [crime for crime in selected_crime if crime in store.crime_types]
+    crime_positions = np.array([store.crime_index(crime) for crime in compared_crimes], dtype=int)
+    positions = np.array([store.position(suburb) for suburb in suburbs], dtype=int)
+
+    # Counts of every compared crime for every suburb, (crime, suburb), in one slice
+    crime_compared = store.counts[positions][:, crime_positions, store.year_index(selected_year)].T
+
+    # One bar trace on a two-level axis: crime types, each with a bar per suburb
+    colors = [SUBURB_COLORS[i % len(SUBURB_COLORS)] for i in range(len(suburbs))]
+    fig = go.Figure(
+        go.Bar(
+            x=[np.repeat(compared_crimes, len(suburbs)), np.tile(suburbs, len(compared_crimes))],
+            y=crime_compared.ravel(),
+            marker=dict(color=colors * len(compared_crimes), opacity=0.75),
+            marker_line_width=0,
+            hovertemplate='%{x}<br>%{y}<extra></extra>'
+            )
+    )
+
+    fig.update_layout(
+        bargap=0.15,
+        xaxis=dict(
+            type='multicategory', 
+            title='Crime Type',
+            title_font=dict(color='white', size=18), 
+            tickfont=dict(color='white', size=16),
+            showgrid=False,),
+        yaxis=dict(
+            title='Crime Count',
+            title_font=dict(color='white', size=18), 
+            tickfont=dict(color='white', size=16),
+            showgrid=False,),
+        margin=dict(t=10),
+        legend=dict(
+            font=dict(color='white',size=18),
+            bgcolor=CARD_COLOR,
+            bordercolor='white'
+    ),
+        paper_bgcolor=CARD_COLOR,
+        plot_bgcolor=CARD_COLOR
+    )
+    
+    fig.update_traces(showlegend=False)
+    crime_compare_graph = dcc.Graph(figure=fig)
+
+    return crime_compare_graph
+
+def resolve_origin(text, data):
+    """Returns (lon, lat, description) for a place name or "lat, lon", or None."""
+    match = re.fullmatch(r'\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*', text or '')
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        suburb = data.spatial.locate(lon, lat)
+        return lon, lat, f'{lat:.4f}, {lon:.4f} ({suburb})' if suburb else f'{lat:.4f}, {lon:.4f}'
+    return data.places.get(normalize(text or ''))
+
+def safest_nearby(data, lon, lat, mode='radius', radius_km=10):
+    """Returns [(suburb, LGA, km, score)] of the nearby suburbs, safest first.
+
+    Suburbs are found by the distance between centroids, and scored with the
+    Final_Safety_Score of their LGA.
+    """
+    if mode == 'nearest':
+        hits = data.spatial.nearest(lon, lat, NEARBY_RESULTS)
     else:
+        hits = data.spatial.within(lon, lat, radius_km)
+    rows = []
+    for suburb, km in hits:
+        lga = data.suburb_lgas.get(suburb)
+        if lga in data.store.positions:
+            rows.append((suburb, lga, km, float(data.store.value(lga, 'Final_Safety_Score'))))
+    rows.sort(key=lambda row: (-row[3], row[2]))
+    return rows[:NEARBY_RESULTS]
 
-        fig.update_layout(
-            barmode='group',
-            bargap=0.15,
-            bargroupgap=0.1,
-            xaxis=dict(
-                type='category', 
-                title='Crime Type',
-                title_font=dict(color='white', size=18), 
-                tickfont=dict(color='white', size=16),
-                showgrid=False,),
-            yaxis=dict(
-                title='Crime Count',
-                title_font=dict(color='white', size=18), 
-                tickfont=dict(color='white', size=16),
-                showgrid=False,),
-            margin=dict(t=10),
-            legend=dict(
-                font=dict(color='white',size=18),
-                bgcolor=CARD_COLOR,
-                bordercolor='white'
-        ),
-            paper_bgcolor=CARD_COLOR,
-            plot_bgcolor=CARD_COLOR
-        )
-        
-        fig.update_traces(showlegend=False)
-        crime_compare_graph = dcc.Graph(figure=fig)
+# Callback - Safest Areas Near Me
+@app.callback(
+    Output('nearby-areas', 'children'),
+    [Input('nearby-origin', 'value'),
+    Input('nearby-mode', 'value'),
+    Input('nearby-radius', 'value')]
+)
+@metrics.instrument('nearby')
+def update_nearby_areas(origin, mode, radius_km):
+    if not origin:
+        return html.P('Enter a suburb, an LGA or coordinates, or click an LGA on the map.')
+    data = dataset
+    place = resolve_origin(origin, data)
+    if place is None:
+        return html.P(f'No suburb or LGA called "{origin}".')
+    lon, lat, name = place
+    radius_km = radius_km or 10
+    with metrics.span('nearby.query'):
+        rows = safest_nearby(data, lon, lat, mode, radius_km)
+    if not rows:
+        if mode == 'nearest':
+            return html.P(f'No scored suburbs near {name}.')
+        return html.P(f'No suburbs within {radius_km} km of {name}.')
+
+    header = html.Thead(html.Tr([html.Th('Suburb'), html.Th('LGA'), html.Th('Distance'), html.Th('Safety Score')]))
+    body = html.Tbody([
+        html.Tr([html.Td(suburb), html.Td(lga), html.Td(f'{km:.1f} km'), html.Td(f'{score:.1f}')])
+        for suburb, lga, km, score in rows
+    ])
+    return [
+        html.P(f'Safest suburbs near {name}', style={'font-size': '18px', 'margin-top': '10px'}),
+        dbc.Table([header, body], color='dark', hover=True, size='sm', style={'font-size': '16px'}),
+    ]
 
-    return gauges, "", heat_map, top_crime_1_fig, top_crime_2_fig, crime_trend_graph, crime_compare_graph
+log_startup_timings()
 
 if __name__ == '__main__':
+    start_data_watcher()
     app.run(debug=True)
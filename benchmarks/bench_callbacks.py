@@ -0,0 +1,188 @@
+"""Callback latency and payload benchmark.
+
+Calls every panel callback directly for each combination of crime type,
+year, crime_count checklist subset and a sample of suburb pairs, on
+synthetic fixture data, and records the wall time and serialized response
+size of each stage. A stage is measured once per distinct value of the
+inputs it depends on (the heatmap once per crime type and year, and so on).
+The shared callback cache and the heatmap LRU are bypassed, so every call
+does the full work.
+
+    python benchmarks/bench_callbacks.py --save benchmarks/baseline.json
+    python benchmarks/bench_callbacks.py --compare benchmarks/baseline.json
+
+With --compare the exit status is 1 when the median time of a stage, or
+its mean response size, grew by more than --tolerance.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import write_fixture
+
+STAGES = ['heatmap', 'heatmap_patch', 'animation', 'gauges', 'pies', 'trend', 'compare', 'top_suburbs', 'search']
+
+
+def load_app(directory):
+    """Imports the app against fixture data written to `directory`."""
+    os.environ.update(write_fixture(directory))
+    os.environ['CALLBACK_CACHE'] = 'none'
+    import app
+    return app
+
+
+def serialized_size(output):
+    import plotly
+    return len(json.dumps(output, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8'))
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    output = func(*args)
+    elapsed = time.perf_counter() - start
+    return {'ms': elapsed * 1e3, 'bytes': serialized_size(output)}
+
+
+def run_stages(app, crime, year, checklist, suburbs, measured):
+    """Returns the measurements of every stage for one combination of inputs.
+
+    A stage only depends on some of the inputs, so it is measured once per
+    distinct value of those and `measured` keeps the results.
+    """
+    suburbs, checklist = list(suburbs), list(checklist)
+    stages = {
+        'heatmap': ((crime, year), lambda: measure(app.build_heatmap, crime, year)),
+        'heatmap_patch': ((crime, year), lambda: measure(app.heatmap_patch, app.build_heatmap(crime, year))),
+        # Every year of the crime type in one figure
+        'animation': ((crime,), lambda: measure(app.build_heatmap_animation, crime)),
+        'gauges': ((tuple(suburbs),), lambda: measure(app.update_gauge, suburbs)),
+        'pies': ((tuple(suburbs), year), lambda: measure(app.update_top_crimes, suburbs, year)),
+        'trend': ((tuple(suburbs), crime), lambda: measure(app.update_crime_trend, suburbs, crime)),
+        'compare': ((tuple(suburbs), year, tuple(checklist)),
+                    lambda: measure(app.update_crime_compared, suburbs, year, checklist)),
+        'top_suburbs': ((year,), lambda: measure(app.update_top_safest_suburbs, year)),
+        # What the suburb dropdown sends after the first keystrokes
+        'search': ((suburbs[0][:3],), lambda: measure(app.dataset.search.search, suburbs[0][:3], app.SEARCH_RESULTS)),
+    }
+    results = {}
+    for stage, (inputs, run) in stages.items():
+        if (stage, inputs) not in measured:
+            measured[(stage, inputs)] = run()
+        results[stage] = measured[(stage, inputs)]
+    return results
+
+
+def summarize(combinations):
+    summary = {}
+    for stage in STAGES:
+        times = sorted(c['stages'][stage]['ms'] for c in combinations)
+        sizes = [c['stages'][stage]['bytes'] for c in combinations]
+        summary[stage] = {
+            'median_ms': statistics.median(times),
+            'p95_ms': times[min(len(times) - 1, int(0.95 * len(times)))],
+            'max_ms': times[-1],
+            'mean_bytes': statistics.mean(sizes),
+            'max_bytes': max(sizes),
+        }
+    return summary
+
+
+def compare(summary, baseline, tolerance):
+    """Prints stage-by-stage changes and returns the regressed stages."""
+    regressions = []
+    print(f"\n{'stage':<14} {'median ms':>20} {'mean bytes':>24}")
+    for stage in STAGES:
+        if stage not in baseline:
+            continue
+        old, new = baseline[stage], summary[stage]
+        time_change = new['median_ms'] / old['median_ms'] - 1 if old['median_ms'] else 0
+        size_change = new['mean_bytes'] / old['mean_bytes'] - 1 if old['mean_bytes'] else 0
+        flag = ''
+        if time_change > tolerance or size_change > tolerance:
+            regressions.append(stage)
+            flag = '  REGRESSION'
+        print(f"{stage:<14} {old['median_ms']:8.2f} -> {new['median_ms']:8.2f} "
+              f"{old['mean_bytes']:10.0f} -> {new['mean_bytes']:10.0f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pairs', type=int, default=3, help='suburb pairs sampled per run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', metavar='PATH', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative growth before a stage counts as a regression')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='safety-bench-')
+    app = load_app(directory)
+
+    rng = random.Random(args.seed)
+    pairs = [rng.sample(app.dataset.store.lgas, 2) for _ in range(args.pairs)]
+    checklists = [
+        list(subset)
+        for n in range(len(app.dataset.crime_types) + 1)
+        for subset in itertools.combinations(app.dataset.crime_types, n)
+    ]
+
+    # Warm up imports and Plotly's validators before timing anything
+    run_stages(app, app.dataset.crime_types[0], app.dataset.years[0], checklists[-1], pairs[0], {})
+
+    combinations = []
+    measured = {}
+    for crime, year, checklist, suburbs in itertools.product(app.dataset.crime_types, app.dataset.years, checklists, pairs):
+        combinations.append({
+            'crime_type': crime,
+            'year': year,
+            'checklist': checklist,
+            'suburbs': suburbs,
+            'stages': run_stages(app, crime, year, checklist, suburbs, measured),
+        })
+
+    summary = summarize(combinations)
+    print(f"{len(combinations)} combinations\n")
+    print(f"{'stage':<14} {'median ms':>10} {'p95 ms':>10} {'max ms':>10} {'mean bytes':>12}")
+    for stage, s in summary.items():
+        print(f"{stage:<14} {s['median_ms']:10.2f} {s['p95_ms']:10.2f} {s['max_ms']:10.2f} {s['mean_bytes']:12.0f}")
+
+    if args.save:
+        import dash
+        import plotly
+        results = {
+            'meta': {
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'dash': dash.__version__,
+                'plotly': plotly.__version__,
+                'lgas': len(app.dataset.store),
+                'pairs': args.pairs,
+                'seed': args.seed,
+            },
+            'summary': summary,
+            'combinations': combinations,
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f'\nSaved {args.save}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['summary']
+        if compare(summary, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
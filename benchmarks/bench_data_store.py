@@ -0,0 +1,57 @@
+"""Micro-benchmark: boolean-mask lookups vs SafetyDataStore lookups.
+
+Run from the repository root:
+
+    python benchmarks/bench_data_store.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import SafetyDataStore
+from fixtures import CRIME_TYPES, YEARS, make_crime_frame
+
+N_LOOKUPS = 2000
+
+
+def mask_lookups(df, suburbs, year):
+    """The per-request lookups as the callbacks used to do them."""
+    for suburb in suburbs:
+        df.loc[df['LGA'] == suburb, 'Final_Safety_Score'].values[0]
+        for crime in CRIME_TYPES:
+            df[df['LGA'] == suburb][f'{crime}_Count_{year}'].values[0]
+        rows = df[df['LGA'] == suburb]
+        [rows[f'Theft_Rate_{y}'].values[0] for y in YEARS]
+
+
+def store_lookups(store, suburbs, year):
+    """The same lookups through the LGA index."""
+    for suburb in suburbs:
+        store.value(suburb, 'Final_Safety_Score')
+        for crime in CRIME_TYPES:
+            store.value(suburb, f'{crime}_Count_{year}')
+        store.values(suburb, [f'Theft_Rate_{y}' for y in YEARS])
+
+
+def main():
+    for n_lgas in (130, 1000, 5000):
+        df = make_crime_frame(n_lgas)
+        build = timeit.timeit(lambda: SafetyDataStore(df), number=10) / 10
+        store = SafetyDataStore(df)
+        suburbs = [df['LGA'].iloc[0], df['LGA'].iloc[-1]]
+
+        mask = timeit.timeit(lambda: mask_lookups(df, suburbs, '2023'), number=N_LOOKUPS // 100)
+        mask /= N_LOOKUPS // 100
+        indexed = timeit.timeit(lambda: store_lookups(store, suburbs, '2023'), number=N_LOOKUPS)
+        indexed /= N_LOOKUPS
+
+        print(f'{n_lgas:>5} LGAs | build {build * 1e3:7.2f} ms | '
+              f'mask {mask * 1e6:9.1f} us/request | '
+              f'store {indexed * 1e6:7.1f} us/request | '
+              f'speed-up x{mask / indexed:,.0f}')
+
+
+if __name__ == '__main__':
+    main()
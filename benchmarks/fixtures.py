@@ -0,0 +1,114 @@
+"""Synthetic data shaped like the dashboard's source files."""
+import csv
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CRIME_TYPES = ['Theft', 'Drug', 'Assault', 'Damage']
+YEARS = ['2020', '2021', '2022', '2023', '2024']
+
+
+def make_crime_frame(n_lgas=130, seed=0, suburb_names=None):
+    """Returns a random crime table with one row per LGA.
+
+    `suburb_names`, when given, supplies the nsw_loca_2 suburb of each row.
+    """
+    rng = np.random.default_rng(seed)
+    lgas = [f'LGA {i:03d}' for i in range(n_lgas)]
+    columns = {
+        'LGA': lgas,
+        'nsw_loca_2': suburb_names[:n_lgas] if suburb_names else [lga.upper() for lga in lgas],
+    }
+    for crime in CRIME_TYPES:
+        for year in YEARS:
+            columns[f'{crime}_Count_{year}'] = rng.integers(0, 5000, n_lgas)
+            columns[f'{crime}_Rate_{year}'] = rng.uniform(0, 3000, n_lgas)
+    for crime in CRIME_TYPES:
+        columns[f'Predicted_{crime}_2025'] = rng.uniform(0, 3000, n_lgas)
+    columns['Final_Safety_Score'] = rng.uniform(0, 100, n_lgas)
+    return pd.DataFrame(columns)
+
+
+def _edge(a, b, points, jitter):
+    """Returns a wiggly border from a to b (without b).
+
+    The same border is generated whichever direction it is walked, so
+    neighbouring cells share it exactly.
+    """
+    start, end = sorted([a, b])
+    rng = np.random.default_rng(abs(hash((start, end))) % 2 ** 32)
+    t = np.linspace(0, 1, points + 1)[1:-1]
+    offset = rng.normal(0, jitter, len(t))
+    x = start[0] + (end[0] - start[0]) * t
+    y = start[1] + (end[1] - start[1]) * t
+    if start[1] == end[1]:
+        y = y + offset
+    else:
+        x = x + offset
+    line = [list(start)] + [[float(px), float(py)] for px, py in zip(x, y)]
+    if (start, end) != (a, b):
+        line = [list(end)] + line[1:][::-1]
+    return line
+
+
+def make_geojson(rows=40, cols=40, cell=0.02, points=20, jitter=0.0008):
+    """Returns a grid of suburb polygons around Sydney with shared borders."""
+    features = []
+    for i in range(rows):
+        for j in range(cols):
+            x0 = round(150.7 + i * cell, 6)
+            y0 = round(-34.2 + j * cell, 6)
+            x1 = round(x0 + cell, 6)
+            y1 = round(y0 + cell, 6)
+            corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+            ring = []
+            for k in range(4):
+                ring += _edge(corners[k], corners[(k + 1) % 4], points, jitter)
+            ring.append(ring[0])
+            features.append({
+                'type': 'Feature',
+                'properties': {'nsw_loca_2': f'SUBURB {i}-{j}'},
+                'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def write_fixture(directory, n_lgas=130, rows=40, cols=40):
+    """Writes a crime CSV, suburb GeoJSON and suburb -> LGA mapping.
+
+    Returns the environment variables that point the app at them.
+    """
+    os.makedirs(directory, exist_ok=True)
+    geojson = make_geojson(rows, cols)
+
+    paths = {
+        'SAFETY_DATA_CSV': os.path.join(directory, 'crime.csv'),
+        'SAFETY_GEOJSON': os.path.join(directory, 'suburbs.geojson'),
+        'SAFETY_SUBURB_LGA': os.path.join(directory, 'suburb-lga-mapping.csv'),
+        'SAFETY_CACHE_DIR': os.path.join(directory, '.cache'),
+    }
+    # Blocks of neighbouring suburbs make up each LGA
+    block = max(1, int(np.ceil(np.sqrt(rows * cols / n_lgas))))
+    blocks_per_col = int(np.ceil(cols / block))
+    lga_of = {
+        f'SUBURB {i}-{j}': (i // block) * blocks_per_col + j // block
+        for i in range(rows) for j in range(cols)
+    }
+    n_lgas = min(n_lgas, max(lga_of.values()) + 1)
+    first_suburb = {}
+    for name, lga in lga_of.items():
+        first_suburb.setdefault(lga, name)
+
+    make_crime_frame(n_lgas, suburb_names=[first_suburb[i] for i in range(n_lgas)]).to_csv(
+        paths['SAFETY_DATA_CSV'], index=False)
+    with open(paths['SAFETY_GEOJSON'], 'w', encoding='utf-8') as f:
+        json.dump(geojson, f)
+    with open(paths['SAFETY_SUBURB_LGA'], 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['nsw_loca_2', 'LGA'])
+        for name, lga in lga_of.items():
+            if lga < n_lgas:
+                writer.writerow([name, f'LGA {lga:03d}'])
+    return paths
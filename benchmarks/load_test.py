@@ -0,0 +1,346 @@
+"""Load test for a running dashboard (standard library only).
+
+Simulated users replay the interactions of the dashboard against
+/_dash-update-component: pick other suburbs, change the year, toggle a crime
+in the checklist, switch the crime type. Each interaction posts one request
+for every callback that has the changed control as an input, with the same
+JSON payload the browser sends. The callbacks are read from /_dash-dependencies
+and the control values from /_dash-layout, so nothing is hard-coded.
+
+    gunicorn -c gunicorn.conf.py --workers 1 &
+    python benchmarks/load_test.py http://localhost:8050 --levels 1,2,4,8,16
+
+For each concurrency level the users are started over --ramp seconds, then
+requests are measured for --duration seconds. The report lists throughput
+and p50/p90/p99 latency per level, which together form the latency and
+throughput curve. Responses of 204 (PreventUpdate) count as requests, under
+"no update", but not in the latency percentiles; other statuses are errors. --only restricts the requests to callbacks updating the
+given output ids, for example --only gauge-output.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+# Control id -> how a simulated user changes it
+INTERACTIONS = {
+    'suburb-dropdown': 'suburbs',
+    'year-dropdown': 'choice',
+    'crime_count': 'toggle',
+    'crime-type-dropdown': 'choice',
+}
+
+
+def fetch_json(url):
+    with urllib.request.urlopen(url) as response:
+        return json.load(response)
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(
+        url, json.dumps(payload).encode('utf-8'), {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def parse_outputs(output):
+    """Returns the {'id', 'property'} list of a callback's output string."""
+    if output.startswith('..'):
+        parts = output[2:-2].split('...')
+    else:
+        parts = [output]
+    return [dict(zip(('id', 'property'), part.rsplit('.', 1))) for part in parts]
+
+
+def walk(component):
+    """Yields every component of a Dash layout tree."""
+    if isinstance(component, list):
+        for item in component:
+            yield from walk(item)
+    elif isinstance(component, dict) and 'props' in component:
+        yield component
+        yield from walk(component['props'].get('children'))
+
+
+def option_values(options):
+    return [option['value'] if isinstance(option, dict) else option for option in options or []]
+
+
+class Scenario:
+    """The app's callbacks and the controls a simulated user can change."""
+
+    def __init__(self, base_url, only=None):
+        dependencies = fetch_json(base_url + '/_dash-dependencies')
+        layout = fetch_json(base_url + '/_dash-layout')
+
+        self.callbacks = []
+        for dependency in dependencies:
+            outputs = parse_outputs(dependency['output'])
+            if only and not any(output['id'] in only for output in outputs):
+                continue
+            self.callbacks.append({
+                'output': dependency['output'],
+                # A single output is sent as an object, several as a list
+                'outputs': outputs if dependency['output'].startswith('..') else outputs[0],
+                'inputs': dependency['inputs'],
+                'state': dependency.get('state', []),
+            })
+
+        # Initial value and choices of every control
+        self.initial = {}
+        self.choices = {}
+        for component in walk(layout):
+            props = component['props']
+            if 'id' in props and 'value' in props:
+                self.initial[props['id']] = props['value']
+                self.choices[props['id']] = option_values(props.get('options'))
+            elif 'id' in props and 'data' in props:
+                # Stores are sent along as callback state
+                self.initial[props['id']] = props['data']
+
+        # A dropdown that searches on the server only lists its selected
+        # options in the layout; collect the choices by searching for them
+        for control in self.choices:
+            search = [c for c in dependencies if {'id': control, 'property': 'search_value'} in c['inputs']]
+            if search:
+                self.choices[control] = self.search_choices(base_url, search[0], control)
+
+        # Initial suburbs missing from the data (e.g. on fixture data) would
+        # only produce errors, start from suburbs that exist instead
+        for control, kind in INTERACTIONS.items():
+            if kind == 'suburbs' and control in self.initial:
+                selected = [item for item in self.initial[control] or [] if item in self.choices[control]]
+                self.initial[control] = selected or self.choices[control][:2]
+
+        self.controls = [
+            control for control in INTERACTIONS
+            if control in self.initial and any(
+                item['id'] == control and item['property'] == 'value'
+                for callback in self.callbacks for item in callback['inputs'])
+        ]
+        if not self.controls:
+            raise SystemExit('No callback takes one of the simulated controls as input')
+
+    def search_choices(self, base_url, callback, control):
+        """Returns the options a search callback offers for every letter and digit."""
+        choices = dict.fromkeys(self.choices[control])
+        outputs = parse_outputs(callback['output'])
+        for character in 'abcdefghijklmnopqrstuvwxyz0123456789':
+            response = post_json(base_url + '/_dash-update-component', {
+                'output': callback['output'],
+                'outputs': outputs if callback['output'].startswith('..') else outputs[0],
+                'inputs': [{**item, 'value': character} for item in callback['inputs']],
+                'state': [{**item, 'value': None} for item in callback.get('state', [])],
+                'changedPropIds': [f'{control}.search_value'],
+            })
+            for option in response['response'][control]['options']:
+                choices[option['value']] = None
+        return list(choices)
+
+    def change(self, control, value, rng):
+        """Returns a new value for a control, as a user would pick it."""
+        choices = self.choices[control]
+        kind = INTERACTIONS[control]
+        if kind == 'suburbs':
+            return rng.sample(choices, min(len(value or []) or 2, len(choices)))
+        if kind == 'toggle':
+            value = list(value or [])
+            choice = rng.choice(choices)
+            return [item for item in value if item != choice] if choice in value else value + [choice]
+        return rng.choice(choices)
+
+    def requests(self, control, values):
+        """Returns the payloads the browser posts after `control` changed."""
+        payloads = []
+        for callback in self.callbacks:
+            if not any(item['id'] == control and item['property'] == 'value' for item in callback['inputs']):
+                continue
+            payloads.append(json.dumps({
+                'output': callback['output'],
+                'outputs': callback['outputs'],
+                'inputs': [{**item, 'value': values.get(item['id'])} for item in callback['inputs']],
+                'state': [{**item, 'value': values.get(item['id'])} for item in callback['state']],
+                'changedPropIds': [f'{control}.value'],
+            }).encode('utf-8'))
+        return payloads
+
+
+class Connection:
+    """A minimal keep-alive HTTP/1.1 client for POSTing JSON."""
+
+    def __init__(self, host, port, path):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.reader = self.writer = None
+
+    async def post(self, body):
+        """Posts a body and returns the response status."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f'POST {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by the server')
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if status in (b'204', b'304'):
+            # No body, whatever the headers say
+            pass
+        elif 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close' or version == b'HTTP/1.0':
+            await self.close()
+        return int(status)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = self.writer = None
+
+
+async def user(scenario, url, rng, start_at, measure_from, stop_at, think, results):
+    """One simulated user: repeatedly changes a control and waits for the callbacks."""
+    await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+    connection = Connection(url.hostname, url.port or 80, url.path.rstrip('/') + '/_dash-update-component')
+    values = dict(scenario.initial)
+    try:
+        while time.perf_counter() < stop_at:
+            control = rng.choice(scenario.controls)
+            values[control] = scenario.change(control, values.get(control), rng)
+            # The browser fires the callbacks of one change concurrently, but
+            # a single user rarely has more than a few in flight; send them in
+            # sequence like a browser limited to one connection
+            for body in scenario.requests(control, values):
+                start = time.perf_counter()
+                try:
+                    status = await connection.post(body)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    await connection.close()
+                    status = None
+                end = time.perf_counter()
+                if start >= measure_from and end <= stop_at:
+                    results.append((end, end - start, status))
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+    finally:
+        await connection.close()
+
+
+async def run_level(scenario, url, users, ramp, duration, think, seed):
+    """Runs one concurrency level and returns the measured requests."""
+    results = []
+    now = time.perf_counter()
+    measure_from = now + ramp
+    stop_at = measure_from + duration
+    await asyncio.gather(*[
+        user(scenario, url, random.Random(seed * 1000 + i), now + ramp * i / users,
+             measure_from, stop_at, think, results)
+        for i in range(users)
+    ])
+    return results
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(users, results, duration):
+    """Returns the throughput and latency of one level.
+
+    A 204 is Dash answering PreventUpdate (for example the heatmap with the
+    year cleared): a success, counted under no_update, but left out of the
+    latency percentiles as nothing was rendered.
+    """
+    latencies = sorted(latency for _, latency, status in results if status == 200)
+    no_update = sum(1 for _, _, status in results if status == 204)
+    errors = sum(1 for _, _, status in results if status not in (200, 204))
+    requests = len(latencies) + no_update
+    if not latencies:
+        return {'users': users, 'requests': requests, 'no_update': no_update, 'errors': errors,
+                'rps': requests / duration, 'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'mean_ms': None}
+    return {
+        'users': users,
+        'requests': requests,
+        'no_update': no_update,
+        'errors': errors,
+        'rps': requests / duration,
+        'p50_ms': percentile(latencies, 0.50) * 1e3,
+        'p90_ms': percentile(latencies, 0.90) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'mean_ms': statistics.mean(latencies) * 1e3,
+    }
+
+
+def print_row(row):
+    if row['p50_ms'] is None:
+        print(f"{row['users']:>6} {row['requests']:>9} {row['no_update']:>9} {row['errors']:>7} {row['rps']:>9.1f}")
+        return
+    print(f"{row['users']:>6} {row['requests']:>9} {row['no_update']:>9} {row['errors']:>7} {row['rps']:>9.1f} "
+          f"{row['p50_ms']:>9.1f} {row['p90_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('url', nargs='?', default='http://localhost:8050')
+    parser.add_argument('--levels', default='1,2,4,8,16', help='comma-separated numbers of concurrent users')
+    parser.add_argument('--ramp', type=float, default=2.0, help='seconds over which the users of a level start')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds measured per level')
+    parser.add_argument('--think', type=float, default=0.0, help='mean pause between interactions, in seconds')
+    parser.add_argument('--only', action='append', help='only post callbacks updating this output id')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    url = urllib.parse.urlsplit(args.url)
+    scenario = Scenario(args.url.rstrip('/'), args.only)
+    levels = [int(level) for level in args.levels.split(',')]
+
+    rows = []
+    if not args.json:
+        print(f"{'users':>6} {'requests':>9} {'no update':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for users in levels:
+        results = asyncio.run(run_level(scenario, url, users, args.ramp, args.duration, args.think, args.seed))
+        row = summarize(users, results, args.duration)
+        rows.append(row)
+        if not args.json:
+            print_row(row)
+            sys.stdout.flush()
+
+    if args.json:
+        print(json.dumps(rows, indent=1))
+
+
+if __name__ == '__main__':
+    main()
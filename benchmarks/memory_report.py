@@ -0,0 +1,127 @@
+"""Memory held by each structure of the loaded data.
+
+    python benchmarks/memory_report.py --save /tmp/memory.json
+    python benchmarks/memory_report.py --compare /tmp/memory.json
+
+Loads a Dataset the way every worker does, on synthetic fixture data (or the
+configured data files with --data), and reports the bytes each structure
+holds: NumPy buffers, DataFrame columns including their strings, and Python
+containers with their contents. Arrays that are views of another array are
+counted with that array. With --mmap the store's arrays are memory-mapped
+as under gunicorn, and reported as shared, since every worker maps the same
+pages. The first row is the crime table as pandas reads the CSV, for
+reference.
+
+Save a report before a change and compare against it afterwards to see the
+bytes per structure before and after.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import write_fixture
+
+# Dataset attributes in report order; objects shared with an earlier row
+# (the store inside the scorer, say) are only counted once
+STRUCTURES = ['df', 'store', 'scorer', 'forecaster', 'ranking', 'search', 'spatial',
+              'map_geometry', 'suburb_names', 'suburb_lgas', 'places']
+
+
+def sizes(obj, seen):
+    """Returns (private, shared) bytes reachable from obj, skipping ids in `seen`."""
+    if id(obj) in seen:
+        return 0, 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        if isinstance(obj.base, np.ndarray):
+            # A view: count the array it views instead
+            return sizes(obj.base, seen)
+        if isinstance(obj, np.memmap):
+            return 0, obj.nbytes
+        return obj.nbytes, 0
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage), 0
+    private, shared = sys.getsizeof(obj), 0
+    if isinstance(obj, dict):
+        children = [item for pair in obj.items() for item in pair]
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        children = obj
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        children = [obj.__dict__]
+    else:
+        children = []
+    for child in children:
+        p, s = sizes(child, seen)
+        private += p
+        shared += s
+    return private, shared
+
+
+def report(dataset, csv_path):
+    rows = {'csv as read': (int(pd.read_csv(csv_path).memory_usage(deep=True).sum()), 0)}
+    seen = set()
+    for name in STRUCTURES:
+        if hasattr(dataset, name):
+            rows[name] = sizes(getattr(dataset, name), seen)
+    if hasattr(dataset, 'store'):
+        # Breakdown of the store, already counted in its row
+        store_seen = set()
+        for name in ('counts', 'rates', 'predictions', 'columns'):
+            if hasattr(dataset.store, name):
+                rows[f'  store.{name}'] = sizes(getattr(dataset.store, name), store_seen)
+    return rows
+
+
+def print_report(rows, baseline=None):
+    if baseline is None:
+        print(f"{'structure':<22} {'private':>12} {'shared':>12}")
+        for name, (private, shared) in rows.items():
+            print(f'{name:<22} {private:>12,} {shared:>12,}')
+    else:
+        print(f"{'structure':<22} {'private before':>15} {'after':>12} {'change':>8} {'shared before':>15} {'after':>12}")
+        for name in dict.fromkeys(list(baseline) + list(rows)):
+            old = baseline.get(name, (0, 0))
+            new = rows.get(name, (0, 0))
+            change = f'{new[0] / old[0] - 1:+.0%}' if old[0] else ''
+            print(f'{name:<22} {old[0]:>15,} {new[0]:>12,} {change:>8} {old[1]:>15,} {new[1]:>12,}')
+    totals = [sum(rows[name][i] for name in rows if name in STRUCTURES) for i in (0, 1)]
+    print(f"\n{'total':<22} {totals[0]:>12,} private {totals[1]:>12,} shared")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--data', action='store_true', help='use the configured data files instead of fixture data')
+    parser.add_argument('--lgas', type=int, default=130, help='LGAs in the fixture data')
+    parser.add_argument('--mmap', action='store_true', help='memory-map the store arrays as under gunicorn')
+    parser.add_argument('--save', metavar='PATH', help='write the report as JSON')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a saved report')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not args.data:
+            os.environ.update(write_fixture(directory, n_lgas=args.lgas))
+        os.environ['SAFETY_RELOAD_INTERVAL'] = '0'
+        from dataset import Dataset
+        from loader import CSV_PATH
+        rows = report(Dataset(mmap=args.mmap), CSV_PATH)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = {name: tuple(value) for name, value in json.load(f).items()}
+    print_report(rows, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
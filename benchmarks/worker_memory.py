@@ -0,0 +1,90 @@
+"""Reports the memory used by each gunicorn worker (Linux only).
+
+Start the app with gunicorn, then point this script at the master:
+
+    gunicorn -c gunicorn.conf.py --pid /tmp/dashboard.pid &
+    python benchmarks/worker_memory.py --pidfile /tmp/dashboard.pid --warm http://localhost:8050
+
+RSS counts every page a worker touches, including pages it shares with the
+master and the other workers. PSS splits shared pages evenly between the
+processes using them, and Private is what the worker alone holds, so Private
+is the cost of one more worker.
+"""
+import argparse
+import json
+import os
+import urllib.request
+
+FIELDS = ['Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty']
+
+
+def children(pid):
+    """Returns the pids of the direct children of a process."""
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name is in parentheses and may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            found.append(int(entry))
+    return sorted(found)
+
+
+def memory(pid):
+    """Returns the smaps_rollup fields of a process, in KiB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[0].rstrip(':') in FIELDS:
+                values[parts[0].rstrip(':')] = int(parts[1])
+    values['Private'] = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values
+
+
+def warm(url, requests):
+    """Loads the page and its layout so every worker has built its state."""
+    for _ in range(requests):
+        for path in ('/', '/_dash-layout', '/_dash-dependencies'):
+            urllib.request.urlopen(url.rstrip('/') + path).read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pid', type=int, help='gunicorn master pid')
+    parser.add_argument('--pidfile', help='file holding the gunicorn master pid')
+    parser.add_argument('--warm', metavar='URL', help='request the app before measuring')
+    parser.add_argument('--warm-requests', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = parser.parse_args()
+
+    pid = args.pid
+    if pid is None:
+        with open(args.pidfile) as f:
+            pid = int(f.read().strip())
+    if args.warm:
+        warm(args.warm, args.warm_requests)
+
+    report = {'master': memory(pid), 'workers': {str(child): memory(child) for child in children(pid)}}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    columns = ['Rss', 'Pss', 'Private']
+    print(f"{'process':>12} " + ' '.join(f'{c + " MiB":>12}' for c in columns))
+    rows = [('master', report['master'])] + [(f'worker {p}', m) for p, m in report['workers'].items()]
+    for name, values in rows:
+        print(f'{name:>12} ' + ' '.join(f'{values.get(c, 0) / 1024:12.1f}' for c in columns))
+    workers = list(report['workers'].values())
+    if workers:
+        mean = {c: sum(w.get(c, 0) for w in workers) / len(workers) for c in columns}
+        print(f"{'worker mean':>12} " + ' '.join(f'{mean[c] / 1024:12.1f}' for c in columns))
+
+
+if __name__ == '__main__':
+    main()
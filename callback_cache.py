@@ -0,0 +1,259 @@
+"""Memoization of callback results, shared between workers.
+
+Popular combinations (the default suburbs, year and crime type) are computed
+by every gunicorn worker on its own. A CallbackCache stores the result of a
+callback in a backend that all workers can read:
+
+- DiskBackend keeps entries in an SQLite file, shared by every worker on
+  the host, with a TTL per entry and a bound on the number of entries.
+- RedisBackend keeps them in Redis, shared by every host. Size is bounded
+  by the server's maxmemory policy. LocalRedis is an in-process stand-in
+  with the same interface, for running without a Redis server.
+
+Cache keys are built from the callback name, the data version and the
+normalized inputs, so whitespace and the order of unordered arguments (such
+as the selected suburbs) do not create separate entries.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from loader import CACHE_DIR
+
+logger = logging.getLogger('safety.cache')
+
+CACHE_BACKEND = os.environ.get('CALLBACK_CACHE', 'disk').lower()
+CACHE_PATH = os.environ.get('CALLBACK_CACHE_PATH', os.path.join(CACHE_DIR, 'callbacks.sqlite'))
+CACHE_TTL = int(os.environ.get('CALLBACK_CACHE_TTL', 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get('CALLBACK_CACHE_MAX_ENTRIES', 5000))
+REDIS_URL = os.environ.get('CALLBACK_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+
+class DiskBackend:
+    """Cache entries in an SQLite file that every worker on a host shares."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+
+    def _connection(self):
+        # One connection per thread and per process (connections must not
+        # cross a fork)
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key, value, ttl):
+        db = self._connection()
+        now = time.time()
+        db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, value, now + ttl),
+        )
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        # Over the size bound: drop the entries closest to expiring
+        excess = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_entries
+        if excess > 0:
+            db.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY expires LIMIT ?)', (excess,)
+            )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+
+class LocalRedis:
+    """In-process stand-in for the part of the redis.Redis client we use."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, None if ex is None else time.time() + ex)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match=None):
+        prefix = match[:-1] if match and match.endswith('*') else match
+        with self._lock:
+            keys = list(self._data)
+        return [key for key in keys if prefix is None or key.startswith(prefix)]
+
+
+class RedisBackend:
+    """Cache entries in Redis (or anything with the same get/set interface)."""
+
+    def __init__(self, client, prefix='safety:callbacks:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def backend_from_env():
+    """Returns the backend selected by CALLBACK_CACHE (disk, redis or none)."""
+    if CACHE_BACKEND == 'disk':
+        return DiskBackend()
+    if CACHE_BACKEND == 'redis':
+        import redis
+        return RedisBackend(redis.Redis.from_url(REDIS_URL))
+    return None
+
+
+def _normalize(value):
+    """Returns a JSON-friendly, whitespace-insensitive version of an input."""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    return value
+
+
+class CallbackCache:
+    """Memoizes callbacks in a shared backend and counts hits and misses.
+
+    With no backend every call goes straight to the callback. `version` is
+    part of every key; it can be a function returning the current data
+    version, in which case a result is only stored if the version did not
+    change while it was computed.
+    """
+
+    def __init__(self, backend=None, ttl=CACHE_TTL, version=''):
+        self.backend = backend
+        self.ttl = ttl
+        self.version = version
+        self.hits = Counter()
+        self.misses = Counter()
+        self.errors = Counter()
+
+    def current_version(self):
+        return self.version() if callable(self.version) else self.version
+
+    def key(self, name, arguments, unordered=(), version=None):
+        """Returns the cache key for a call with the given bound arguments."""
+        if version is None:
+            version = self.current_version()
+        normalized = {}
+        for argument, value in arguments.items():
+            value = _normalize(value)
+            if argument in unordered and isinstance(value, list):
+                value = sorted(set(value), key=str)
+            normalized[argument] = value
+        payload = json.dumps([name, version, normalized], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def memoize(self, name=None, unordered=()):
+        """Decorator that caches a function's result.
+
+        `unordered` names list arguments whose order does not matter. The
+        function must then return a result that does not depend on that
+        order either.
+        """
+        def decorator(func):
+            cache_name = name or func.__name__
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return func(*args, **kwargs)
+
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                version = self.current_version()
+                key = self.key(cache_name, bound.arguments, unordered, version)
+                try:
+                    cached = self.backend.get(key)
+                except Exception as e:
+                    self.errors[cache_name] += 1
+                    logger.warning('Callback cache read failed: %s', e)
+                    cached = None
+                if cached is not None:
+                    self.hits[cache_name] += 1
+                    return pickle.loads(cached)
+
+                self.misses[cache_name] += 1
+                result = func(*args, **kwargs)
+                if self.current_version() != version:
+                    # The data was swapped while computing, the result may
+                    # come from either version
+                    return result
+                try:
+                    self.backend.set(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), self.ttl)
+                except Exception as e:
+                    self.errors[cache_name] += 1
+                    logger.warning('Callback cache write failed: %s', e)
+                return result
+
+            wrapper.uncached = func
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """Returns {callback: {'hits': n, 'misses': n, 'errors': n}} for this process."""
+        names = set(self.hits) | set(self.misses) | set(self.errors)
+        return {
+            name: {'hits': self.hits[name], 'misses': self.misses[name], 'errors': self.errors[name]}
+            for name in sorted(names)
+        }
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
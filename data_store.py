@@ -0,0 +1,165 @@
+"""LGA-indexed data store used by the dashboard callbacks."""
+import os
+import re
+
+import numpy as np
+
+# Wide crime columns look like Theft_Count_2023 or Assault_Rate_2020
+CRIME_COLUMN = re.compile(r'^(?P<crime>[A-Za-z]+)_(?P<kind>Count|Rate)_(?P<year>\d{4})$')
+PREDICTION_COLUMN = re.compile(r'^Predicted_(?P<crime>[A-Za-z]+)_(?P<year>\d{4})$')
+
+
+class SafetyDataStore:
+    """Columnar view of the crime table, indexed by LGA.
+
+    The table is scanned once when the store is built. After that every
+    per-suburb lookup is a dict lookup plus a NumPy index instead of a
+    boolean mask over the whole frame.
+
+    The wide ``{Crime}_{Count|Rate}_{Year}`` columns are also reshaped into
+    dense ``counts`` and ``rates`` cubes of shape (LGA, crime type, year), and
+    the ``Predicted_{Crime}_{Year}`` columns into a ``predictions`` array of
+    shape (LGA, crime type). Crime types and years are read from the column
+    names, so a new year or crime type in the CSV needs no code changes.
+
+    The arrays keep the dtypes of the table's columns (see
+    loader.compact_table), and ``columns`` holds views into them for the
+    crime and prediction columns rather than a second copy.
+    """
+
+    def __init__(self, df):
+        self.lgas = df['LGA'].tolist()
+        self.positions = {}
+        for i, lga in enumerate(self.lgas):
+            # Keep the first row for an LGA, like df[df['LGA'] == lga].values[0]
+            self.positions.setdefault(lga, i)
+
+        self.columns = {
+            column: np.ascontiguousarray(df[column].to_numpy())
+            for column in df.select_dtypes('number').columns
+        }
+
+        crime_columns = {}
+        crime_types = []
+        years = set()
+        for column in self.columns:
+            match = CRIME_COLUMN.match(column)
+            if match:
+                crime, kind, year = match.group('crime', 'kind', 'year')
+                crime_columns[(crime, kind, year)] = column
+                if crime not in crime_types:
+                    crime_types.append(crime)
+                years.add(year)
+
+        self.crime_types = crime_types
+        self.years = sorted(years)
+        self.crime_positions = {crime: i for i, crime in enumerate(self.crime_types)}
+        self.year_positions = {year: i for i, year in enumerate(self.years)}
+
+        def dtype(columns):
+            return np.result_type(*(self.columns[column].dtype for column in columns)) if columns else float
+
+        # Column -> (array name, index into it) for the columns kept in the arrays
+        self.array_columns = {}
+        shape = (len(self.lgas), len(self.crime_types), len(self.years))
+        kinds = {
+            kind: [column for (_, k, _), column in crime_columns.items() if k == kind]
+            for kind in ('Count', 'Rate')
+        }
+        self.counts = np.zeros(shape, dtype=dtype(kinds['Count']))
+        self.rates = np.zeros(shape, dtype=dtype(kinds['Rate']))
+        for (crime, kind, year), column in crime_columns.items():
+            index = (slice(None), self.crime_positions[crime], self.year_positions[year])
+            self.array_columns[column] = ('counts' if kind == 'Count' else 'rates', index)
+
+        self.prediction_year = None
+        prediction_columns = {}
+        for column in self.columns:
+            match = PREDICTION_COLUMN.match(column)
+            if match and match.group('crime') in self.crime_positions:
+                prediction_columns[column] = self.crime_positions[match.group('crime')]
+                self.prediction_year = match.group('year')
+        self.predictions = np.zeros(shape[:2], dtype=dtype(list(prediction_columns)))
+        for column, c in prediction_columns.items():
+            self.array_columns[column] = ('predictions', (slice(None), c))
+
+        for column, (name, index) in self.array_columns.items():
+            getattr(self, name)[index] = self.columns[column]
+        self._link_columns()
+
+    def _link_columns(self):
+        """Points the crime and prediction columns at views of the arrays."""
+        for column, (name, index) in self.array_columns.items():
+            self.columns[column] = getattr(self, name)[index]
+
+    def memory_map(self, directory):
+        """Moves every array into a read-only, memory-mapped .npy file.
+
+        Processes that map the same files share one physical copy of the
+        data through the page cache, instead of each holding their own.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        def mapped(name, array):
+            path = os.path.join(directory, name + '.npy')
+            if not os.path.exists(path):
+                tmp = f'{path}.{os.getpid()}.tmp.npy'
+                np.save(tmp, np.ascontiguousarray(array))
+                os.replace(tmp, path)
+            return np.load(path, mmap_mode='r')
+
+        self.columns = {
+            column: mapped(f'column-{i}', array)
+            for i, (column, array) in enumerate(self.columns.items())
+            if column not in self.array_columns
+        }
+        self.counts = mapped('counts', self.counts)
+        self.rates = mapped('rates', self.rates)
+        self.predictions = mapped('predictions', self.predictions)
+        self._link_columns()
+
+    def __len__(self):
+        return len(self.lgas)
+
+    def __contains__(self, lga):
+        return lga in self.positions
+
+    def has_column(self, column):
+        return column in self.columns
+
+    def position(self, lga):
+        """Returns the row position of an LGA."""
+        return self.positions[lga]
+
+    def crime_index(self, crime):
+        """Returns the position of a crime type on the cube's second axis."""
+        return self.crime_positions[crime]
+
+    def year_index(self, year):
+        """Returns the position of a year on the cube's last axis."""
+        return self.year_positions[str(year)]
+
+    def value(self, lga, column):
+        """Returns a single value for an LGA."""
+        return self.columns[column][self.positions[lga]]
+
+    def values(self, lga, columns):
+        """Returns the values of several columns for an LGA."""
+        i = self.positions[lga]
+        return [self.columns[column][i] for column in columns]
+
+    def year_counts(self, lga, year):
+        """Returns the count of every crime type for an LGA in one year."""
+        return self.counts[self.positions[lga], :, self.year_index(year)]
+
+    def rate_series(self, lga, crime):
+        """Returns the yearly rates of one crime type for an LGA."""
+        return self.rates[self.positions[lga], self.crime_positions[crime], :]
+
+    def prediction(self, lga, crime):
+        """Returns the predicted rate of one crime type for an LGA."""
+        return self.predictions[self.positions[lga], self.crime_positions[crime]]
+
+    def crime_counts(self, crime, year):
+        """Returns the count of one crime type in one year for every LGA."""
+        return self.counts[:, self.crime_positions[crime], self.year_index(year)]
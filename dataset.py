@@ -0,0 +1,320 @@
+"""The data behind the dashboard, and hot reloading of it.
+
+A Dataset holds everything the callbacks read (the crime table, the data
+store and the indexes derived from it, and the map geometry), built from one
+snapshot of the source files. It is not modified once built. The app keeps
+the current Dataset in a single module global: a reload builds a complete new
+Dataset in a background thread and then replaces that reference, so a
+request that already picked up the old one finishes with it and the next
+request sees the new one.
+
+DatasetWatcher polls the source files and does that reload when their
+version (see loader.data_version) changes.
+"""
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # No other process to coordinate with outside gunicorn
+    fcntl = None
+
+from data_store import SafetyDataStore
+from forecast import TrendForecaster
+from geometry import DEFAULT_DETAIL, DETAIL_LEVELS, build_detail_levels, dissolve
+from loader import (CACHE_DIR, CSV_PATH, GEOJSON_PATH, cached, data_version,
+                    load_crime_table, load_geojson, load_suburb_lga_mapping,
+                    mapping_sources, timed, write_geometry)
+from ranking import RankingIndex
+from scoring import SafetyScorer
+from search_index import SearchIndex, normalize
+from spatial import SpatialIndex
+
+logger = logging.getLogger('safety.reload')
+
+RELOAD_INTERVAL = float(os.environ.get('SAFETY_RELOAD_INTERVAL', 30))
+# Seconds a new array or geometry directory is kept even if no process
+# records its version yet (see VersionRegistry)
+VERSION_GRACE = float(os.environ.get('SAFETY_VERSION_GRACE', 600))
+
+# Level of detail the spatial index is built from: the most detailed one,
+# which is within metres of the source shapes
+SPATIAL_DETAIL = min(DETAIL_LEVELS, key=lambda level: DETAIL_LEVELS[level][0])
+
+
+def data_sources():
+    """Returns the files the crime data (and its caches) are derived from."""
+    return list(dict.fromkeys([CSV_PATH] + mapping_sources()))
+
+
+def geometry_sources():
+    """Returns the files the map geometry is derived from."""
+    return [GEOJSON_PATH] + mapping_sources()
+
+
+def sources_version():
+    """Returns the version of the current source files."""
+    return data_version(list(dict.fromkeys(data_sources() + geometry_sources())))
+
+
+def sources_modified():
+    """Returns the latest modification time of the source files, in UTC."""
+    mtime = max(os.stat(path).st_mtime for path in dict.fromkeys(data_sources() + geometry_sources()))
+    return datetime.datetime.fromtimestamp(int(mtime), datetime.timezone.utc)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class VersionRegistry:
+    """The data and geometry versions held by the processes sharing CACHE_DIR.
+
+    Every reload writes array and geometry directories under CACHE_DIR,
+    named by version, and each gunicorn worker reloads on its own. A worker
+    can lag behind its siblings, and one respawned after a reload forks from
+    the master, which still holds the startup data. So each process records
+    the versions it holds in `versions/<pid>.json`, and remove_unused() only
+    deletes the directories of versions that no live process records.
+    """
+
+    def __init__(self, cache_dir=None, grace=VERSION_GRACE):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.directory = os.path.join(self.cache_dir, 'versions')
+        self.grace = grace
+
+    def record(self, data_versions, geometry_versions):
+        """Records the versions this process holds, replacing what it recorded before."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'data': list(data_versions), 'geometry': list(geometry_versions)}, f)
+        os.replace(tmp, path)
+
+    def held(self):
+        """Returns the (data, geometry) versions recorded by live processes.
+
+        Records of processes that have exited are deleted.
+        """
+        data, geometry = set(), set()
+        try:
+            entries = os.listdir(self.directory)
+        except OSError:
+            return data, geometry
+        for entry in entries:
+            pid, extension = os.path.splitext(entry)
+            if extension != '.json' or not pid.isdigit():
+                continue
+            path = os.path.join(self.directory, entry)
+            if not _process_alive(int(pid)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    versions = json.load(f)
+            except (OSError, ValueError):
+                continue
+            data.update(versions['data'])
+            geometry.update(versions['geometry'])
+        return data, geometry
+
+    def remove_unused(self):
+        """Deletes the array and geometry directories no live process holds.
+
+        One process cleans up at a time; the others skip it. Directories
+        changed in the last `grace` seconds are kept, as another process
+        may be writing them for a reload it has not swapped in yet. Open
+        memory maps of a deleted array file stay valid until they are closed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return
+            data, geometry = self.held()
+            now = time.time()
+            for name, keep in (('arrays', data), ('geometry', geometry)):
+                directory = os.path.join(self.cache_dir, name)
+                try:
+                    entries = os.listdir(directory)
+                except OSError:
+                    continue
+                for entry in entries:
+                    path = os.path.join(directory, entry)
+                    try:
+                        recent = now - os.stat(path).st_mtime < self.grace
+                    except OSError:
+                        continue
+                    if entry not in keep and not recent and os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                        logger.info('Removed the %s of version %s', name, entry)
+
+
+class Dataset:
+    """Everything the callbacks read, built from one snapshot of the source files."""
+
+    def __init__(self, mmap=False, previous=None):
+        # Taken before reading, so a file that changes while it is read is
+        # picked up again on the next check
+        self.version = sources_version()
+        self.modified = sources_modified()
+
+        with timed('read crime table'):
+            df = load_crime_table()
+            self.df = df[df['LGA'] != "Lord Howe Island"].reset_index(drop=True)
+
+        # LGA-indexed arrays for the per-suburb lookups in the callbacks. With
+        # mmap (SAFETY_MMAP=1, set by wsgi.py) they are memory-mapped
+        # read-only, so every worker on the host shares one copy.
+        with timed('build data store'):
+            self.store = SafetyDataStore(self.df)
+            if mmap:
+                self.store.memory_map(os.path.join(CACHE_DIR, 'arrays', self.version))
+        # The crime and prediction columns now live in the store's arrays, the
+        # frame only keeps the keys and scores
+        self.df = self.df[[column for column in self.df.columns if column not in self.store.array_columns]]
+
+        # Safety scores recomputed from the crime rates with the user's weights
+        self.scorer = SafetyScorer(self.store)
+
+        # Linear trend of every LGA and crime type, for the forecasts in the
+        # trend chart. When a reload only adds years, the new years are added
+        # to the previous Dataset's fits.
+        self.forecaster = None
+        if previous is not None:
+            self.forecaster = previous.forecaster.extended(self.store, previous.store)
+            if self.forecaster is not None:
+                logger.info('Extended the forecasts with %s', ', '.join(self.store.years[len(previous.years):]))
+        if self.forecaster is None:
+            self.forecaster = TrendForecaster.from_store(self.store)
+
+        # Sorted LGA orders per metric, crime type and year, for the top-N lists and gauge ranks
+        with timed('build ranking index'):
+            self.ranking = RankingIndex(self.store, self.scorer)
+
+        self.crime_types = self.store.crime_types
+        self.years = self.store.years
+
+        # Map geometry: the simplified suburb shapes and the LGA shapes
+        # dissolved from them, one of each per level of detail. They are
+        # written once per source version as compact JSON files, which the
+        # browser downloads (and caches) separately from the figures and every
+        # worker serves from the same file. The full-resolution GeoJSON is only
+        # read when they are rebuilt.
+        self.geometry_version = data_version(geometry_sources())
+        with timed('load geometry'):
+            self.map_geometry = cached(
+                'geometry.pickle', geometry_sources(), self._build_geometry,
+                valid=lambda index: all(os.path.exists(path) for path in index['files'].values()),
+            )
+        self.suburb_names = [name for name in self.map_geometry['suburb_names'] if name != "LORD HOWE ISLAND"]
+
+        self.suburb_lgas = load_suburb_lga_mapping(self.df)
+
+        # Prefix and trigram index of LGA and suburb names for the suburb dropdown
+        with timed('build search index'):
+            self.search = SearchIndex(self.ranking.lgas, self.suburb_lgas)
+
+        # Suburb centroids, bounding boxes and polygons for the nearby areas panel
+        with timed('load spatial index'):
+            self.spatial = cached('spatial.pickle', geometry_sources(), self._build_spatial)
+
+        # Places the nearby areas panel can start from: normalised suburb or
+        # LGA name -> (lon, lat, name)
+        self.places = {}
+        lga_suburbs = {}
+        for suburb, lga in self.suburb_lgas.items():
+            lga_suburbs.setdefault(lga, []).append(suburb)
+        for lga in self.ranking.lgas:
+            centroid = self.spatial.group_centroid(lga_suburbs.get(lga, []))
+            if centroid is not None:
+                self.places[normalize(lga)] = (*centroid, lga)
+        for suburb in self.spatial.names:
+            self.places.setdefault(normalize(suburb), (*self.spatial.centroid(suburb), suburb))
+
+    def _build_spatial(self):
+        with open(self.map_geometry['files'][('suburbs', SPATIAL_DETAIL)], encoding='utf-8') as f:
+            return SpatialIndex(json.load(f))
+
+    def _build_geometry(self):
+        geometry_dir = os.path.join(CACHE_DIR, 'geometry', self.geometry_version)
+        suburb_levels = build_detail_levels(load_geojson())
+        mapping = load_suburb_lga_mapping(self.df)
+        files = {}
+        for level, geo in suburb_levels.items():
+            files[('suburbs', level)] = write_geometry(geometry_dir, f'suburbs-{level}', geo)
+            files[('lgas', level)] = write_geometry(geometry_dir, f'lgas-{level}', dissolve(geo, mapping))
+        suburb_names = [feature['properties']['nsw_loca_2'] for feature in suburb_levels[DEFAULT_DETAIL]['features']]
+        return {'files': files, 'suburb_names': suburb_names}
+
+
+class DatasetWatcher:
+    """Builds a new Dataset in a background thread whenever the source files change.
+
+    `current` returns the Dataset in use and `swap` is called with the new
+    one once it is completely built. A snapshot that fails to load is logged
+    and not retried until the files change again.
+    """
+
+    def __init__(self, current, swap, interval=RELOAD_INTERVAL, mmap=False):
+        self.current = current
+        self.swap = swap
+        self.interval = interval
+        self.mmap = mmap
+        self.failed_version = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Reloads the data if the source files changed. Returns True after a swap."""
+        try:
+            version = sources_version()
+        except OSError:
+            # A file is missing, probably in the middle of being replaced
+            return False
+        if version in (self.current().version, self.failed_version):
+            return False
+
+        logger.info('Source files changed, loading data version %s', version)
+        try:
+            dataset = Dataset(mmap=self.mmap, previous=self.current())
+        except Exception:
+            logger.exception('Could not load data version %s, keeping %s', version, self.current().version)
+            self.failed_version = version
+            return False
+        self.swap(dataset)
+        logger.info('Now serving data version %s', dataset.version)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """Starts polling in a daemon thread (once per process)."""
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='dataset-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,126 @@
+"""Linear trend forecasts of the crime rates, for every LGA and crime type at once.
+
+Each (LGA, crime type) series is fitted with ordinary least squares on the
+year. All series share the same years, so the fit only needs the running
+sums n, sum(x), sum(x^2) (scalars) and sum(y), sum(x*y) (one array each):
+
+    slope     = (n * sum(xy) - sum(x) * sum(y)) / (n * sum(x^2) - sum(x)^2)
+    intercept = (sum(y) - slope * sum(x)) / n
+
+Fitting every series is a handful of array operations, and appending a year
+of data only adds that year to the sums instead of refitting from scratch.
+A reload whose table only adds years extends the previous fits this way
+(see Dataset).
+"""
+import copy
+
+import numpy as np
+
+
+class TrendForecaster:
+    """Batched least-squares trend lines over an (LGA, crime type) grid of series."""
+
+    def __init__(self, shape, base_year=0):
+        # Years are stored relative to base_year, which keeps the sums small
+        self.base_year = int(base_year)
+        self.years = []
+        self.n = 0
+        self.sum_x = 0.0
+        self.sum_xx = 0.0
+        self.sum_y = np.zeros(shape)
+        self.sum_xy = np.zeros(shape)
+        self._fit = None
+
+    @classmethod
+    def from_store(cls, store):
+        """Fits every LGA and crime type of a SafetyDataStore on its yearly rates."""
+        rates = np.asarray(store.rates, dtype=float)
+        x = np.array([int(year) for year in store.years], dtype=float)
+        forecaster = cls(rates.shape[:2], base_year=x[0] if len(x) else 0)
+        x -= forecaster.base_year
+        forecaster.years = [int(year) for year in store.years]
+        forecaster.n = len(x)
+        forecaster.sum_x = float(x.sum())
+        forecaster.sum_xx = float((x * x).sum())
+        forecaster.sum_y = rates.sum(axis=2)
+        forecaster.sum_xy = rates @ x
+        return forecaster
+
+    def extended(self, store, previous_store):
+        """Returns a forecaster of `store` that adds its new years to these fits.
+
+        Returns None unless `store` only appends years to `previous_store`
+        (the store these fits were made from), with the same LGAs, crime
+        types and rates for the years they share. This forecaster is not
+        changed.
+        """
+        old_years = list(previous_store.years)
+        if (store.lgas != previous_store.lgas or store.crime_types != previous_store.crime_types
+                or list(store.years[:len(old_years)]) != old_years or len(store.years) == len(old_years)
+                or not np.array_equal(store.rates[:, :, :len(old_years)], previous_store.rates)):
+            return None
+        forecaster = copy.copy(self)
+        forecaster.years = list(self.years)
+        for y in range(len(old_years), len(store.years)):
+            forecaster.append(store.years[y], store.rates[:, :, y])
+        return forecaster
+
+    def append(self, year, rates):
+        """Adds one year of rates, an (LGA, crime type) array, to the fits."""
+        x = int(year) - self.base_year
+        rates = np.asarray(rates, dtype=float)
+        self.years.append(int(year))
+        self.n += 1
+        self.sum_x += x
+        self.sum_xx += x * x
+        self.sum_y = self.sum_y + rates
+        self.sum_xy = self.sum_xy + x * rates
+        self._fit = None
+
+    def fit(self):
+        """Returns the (slope, intercept) arrays of every series.
+
+        With a single year the trend is flat at that year's rate.
+        """
+        if self._fit is None:
+            if self.n == 0:
+                raise ValueError('No data to fit')
+            denominator = self.n * self.sum_xx - self.sum_x ** 2
+            if denominator > 0:
+                slope = (self.n * self.sum_xy - self.sum_x * self.sum_y) / denominator
+            else:
+                slope = np.zeros_like(self.sum_y)
+            intercept = (self.sum_y - slope * self.sum_x) / self.n
+            self._fit = (slope, intercept)
+        return self._fit
+
+    def predict(self, years):
+        """Returns the fitted rates for the given years, shape (LGA, crime type, year).
+
+        Rates cannot be negative, so falling trends stop at 0.
+        """
+        slope, intercept = self.fit()
+        x = np.array([int(year) for year in years], dtype=float) - self.base_year
+        return np.clip(intercept[..., None] + slope[..., None] * x, 0, None)
+
+    def forecast_years(self, horizon):
+        """Returns the `horizon` years after the last year of data."""
+        last = max(self.years)
+        return [last + step for step in range(1, horizon + 1)]
+
+    def forecast(self, horizon=1):
+        """Returns the years after the data and the rates forecast for them."""
+        years = self.forecast_years(horizon)
+        return years, self.predict(years)
+
+    def series(self, lga_position, crime_position, horizon=1):
+        """Returns the forecast years and rates of some series.
+
+        The positions index the (LGA, crime type) grid like a NumPy array, so
+        an array of LGA positions gives an (LGA, year) array of rates.
+        """
+        years = self.forecast_years(horizon)
+        slope, intercept = self.fit()
+        x = np.array(years, dtype=float) - self.base_year
+        values = np.asarray(intercept[lga_position, crime_position])[..., None] + np.asarray(slope[lga_position, crime_position])[..., None] * x
+        return years, np.clip(values, 0, None)
@@ -0,0 +1,296 @@
+"""Geometry preprocessing for the crime heatmap.
+
+The suburb GeoJSON is far more detailed than the map can show at
+projection_scale=600 around Sydney. This module simplifies it into a few
+levels of detail while keeping the borders shared by neighbouring suburbs
+identical, so simplification never opens gaps or overlaps between them.
+
+The approach follows TopoJSON: every ring is cut into arcs at junctions
+(points where more than two borders meet), each arc is simplified once with
+Douglas-Peucker, and every ring that uses the arc gets the same result.
+"""
+import numpy as np
+
+# Grid used to decide whether two vertices are the same point (~1 m)
+TOPOLOGY_DECIMALS = 5
+
+# Level of detail -> (Douglas-Peucker tolerance in degrees, output decimals).
+# At projection_scale=600 one screen pixel is roughly 0.0006 degrees.
+DETAIL_LEVELS = {
+    'high': (0.0001, 5),
+    'medium': (0.0003, 4),
+    'low': (0.001, 4),
+}
+DEFAULT_DETAIL = 'medium'
+
+
+def _polygons(geometry):
+    """Returns the polygons (lists of rings) of a Polygon or MultiPolygon."""
+    if geometry is None:
+        return []
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def _quantize(ring):
+    """Snaps a ring to the topology grid and drops repeated points.
+
+    The returned ring is open (the closing point is not repeated).
+    """
+    scale = 10 ** TOPOLOGY_DECIMALS
+    points = []
+    for x, y in (point[:2] for point in ring):
+        point = (int(round(x * scale)), int(round(y * scale)))
+        if not points or points[-1] != point:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+
+def _douglas_peucker(points, tolerance):
+    """Returns the indices of `points` kept by Douglas-Peucker simplification."""
+    n = len(points)
+    if n < 3:
+        return list(range(n))
+
+    xy = np.asarray(points, dtype=float)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = xy[first], xy[last]
+        inner = xy[first + 1:last]
+        dx, dy = end - start
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:
+            distances = np.abs(dx * (inner[:, 1] - start[1]) - dy * (inner[:, 0] - start[0])) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep).tolist()
+
+
+class Topology:
+    """Rings of a GeoJSON collection cut into shared arcs."""
+
+    def __init__(self, geojson):
+        self.geojson = geojson
+        self.rings = []
+        neighbours = {}
+        for feature in geojson['features']:
+            for polygon in _polygons(feature.get('geometry')):
+                for ring in polygon:
+                    points = _quantize(ring)
+                    self.rings.append(points)
+                    n = len(points)
+                    for i, point in enumerate(points):
+                        adjacent = neighbours.setdefault(point, set())
+                        adjacent.add(points[i - 1])
+                        adjacent.add(points[(i + 1) % n])
+
+        # A point where more than two borders meet (or a border ends) is a junction
+        self.junctions = {point for point, adjacent in neighbours.items() if len(adjacent) != 2}
+
+    def _ring_arcs(self, points):
+        """Cuts a ring into arcs that start and end on junctions."""
+        cuts = [i for i, point in enumerate(points) if point in self.junctions]
+        if not cuts:
+            # No junction: the whole ring is one closed arc, started at its
+            # smallest point so every ring sharing it cuts it the same way
+            start = points.index(min(points))
+            rotated = points[start:] + points[:start]
+            return [rotated + [rotated[0]]]
+        rotated = points[cuts[0]:] + points[:cuts[0]]
+        offsets = [i - cuts[0] for i in cuts] + [len(points)]
+        rotated.append(rotated[0])
+        return [rotated[offsets[k]:offsets[k + 1] + 1] for k in range(len(cuts))]
+
+    def simplify(self, tolerance, decimals):
+        """Returns a copy of the GeoJSON simplified with the given tolerance.
+
+        `tolerance` is in degrees. Coordinates are rounded to `decimals`.
+        """
+        scale = 10 ** TOPOLOGY_DECIMALS
+        grid_tolerance = tolerance * scale
+        simplified_arcs = {}
+
+        def simplify_arc(arc):
+            # Simplify every arc in one canonical direction so both rings
+            # sharing it get exactly the same points
+            forward = (arc[0], arc[1] if len(arc) > 1 else arc[0]) <= (arc[-1], arc[-2] if len(arc) > 1 else arc[-1])
+            key = tuple(arc) if forward else tuple(reversed(arc))
+            if key not in simplified_arcs:
+                simplified_arcs[key] = [key[i] for i in _douglas_peucker(key, grid_tolerance)]
+            result = simplified_arcs[key]
+            return result if forward else result[::-1]
+
+        def simplify_ring(points):
+            ring = []
+            if len(points) >= 3:
+                for arc in self._ring_arcs(points):
+                    ring.extend(simplify_arc(arc)[:-1])
+            if len(ring) < 3:
+                # Too small to survive at this tolerance, keep it as it was
+                ring = points
+            out = []
+            for x, y in ring + ring[:1]:
+                point = [round(x / scale, decimals), round(y / scale, decimals)]
+                if not out or out[-1] != point:
+                    out.append(point)
+            return out
+
+        rings = iter(self.rings)
+        features = []
+        for feature in self.geojson['features']:
+            geometry = feature.get('geometry')
+            polygons = [[simplify_ring(next(rings)) for _ in polygon] for polygon in _polygons(geometry)]
+            if geometry is not None and geometry['type'] == 'Polygon':
+                geometry = {'type': 'Polygon', 'coordinates': polygons[0]}
+            elif geometry is not None and geometry['type'] == 'MultiPolygon':
+                geometry = {'type': 'MultiPolygon', 'coordinates': polygons}
+            features.append({**feature, 'geometry': geometry})
+        return {**self.geojson, 'features': features}
+
+
+def build_detail_levels(geojson, levels=DETAIL_LEVELS):
+    """Returns {level: simplified GeoJSON} for every level of detail."""
+    topology = Topology(geojson)
+    return {
+        level: topology.simplify(tolerance, decimals)
+        for level, (tolerance, decimals) in levels.items()
+    }
+
+
+def vertex_count(geojson):
+    """Returns the number of vertices in a GeoJSON collection."""
+    return sum(
+        len(ring)
+        for feature in geojson['features']
+        for polygon in _polygons(feature.get('geometry'))
+        for ring in polygon
+    )
+
+
+def _ring_area(ring):
+    """Returns the signed area of a closed ring (shoelace formula)."""
+    xy = np.asarray(ring, dtype=float)
+    x, y = xy[:, 0], xy[:, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+
+def point_in_ring(x, y, ring):
+    """Returns True when (x, y) lies inside a closed ring (ray casting)."""
+    xy = np.asarray(ring, dtype=float)
+    x1, y1 = xy[:-1, 0], xy[:-1, 1]
+    x2, y2 = xy[1:, 0], xy[1:, 1]
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crosses & (x < x_cross)) % 2)
+
+
+def _chain_rings(edges):
+    """Joins undirected boundary edges into closed rings."""
+    adjacency = {}
+    for a, b in edges:
+        adjacency.setdefault(a, []).append(b)
+        adjacency.setdefault(b, []).append(a)
+
+    rings = []
+    for start in list(adjacency):
+        while adjacency[start]:
+            ring = [start]
+            current = start
+            while True:
+                following = adjacency[current].pop()
+                adjacency[following].remove(current)
+                ring.append(following)
+                current = following
+                if current == start:
+                    break
+            if len(ring) >= 4:
+                rings.append(ring)
+    return rings
+
+
+def _dissolve_polygons(polygons):
+    """Unions polygons that share borders into a MultiPolygon coordinate list.
+
+    Borders must be vertex-identical on both sides (see Topology.simplify).
+    Edges used by two member polygons are interior and cancel out; what is
+    left is chained into rings, and every ring nested inside an odd number
+    of other rings becomes a hole of the ring directly around it.
+    """
+    edges = {}
+    for polygon in polygons:
+        for ring in polygon:
+            for a, b in zip(ring, ring[1:]):
+                a, b = tuple(a), tuple(b)
+                if a == b:
+                    continue
+                key = (a, b) if a < b else (b, a)
+                edges[key] = edges.get(key, 0) + 1
+    boundary = [edge for edge, count in edges.items() if count % 2]
+    rings = _chain_rings(boundary)
+    if not rings:
+        return []
+
+    areas = [abs(_ring_area(ring)) for ring in rings]
+    parents = []
+    for i, ring in enumerate(rings):
+        # Rings containing this one, smallest first. A vertex can sit on a
+        # neighbouring ring, so test the midpoint of the first edge instead
+        x = (ring[0][0] + ring[1][0]) / 2
+        y = (ring[0][1] + ring[1][1]) / 2
+        containing = [
+            j for j, other in enumerate(rings)
+            if j != i and areas[j] > areas[i] and point_in_ring(x, y, other)
+        ]
+        parents.append(sorted(containing, key=lambda j: areas[j]))
+
+    polygons_out = {}
+    for i, containing in enumerate(parents):
+        if len(containing) % 2 == 0:
+            polygons_out.setdefault(i, [[list(p) for p in rings[i]]])
+    for i, containing in enumerate(parents):
+        if len(containing) % 2 == 1:
+            outer = containing[0]
+            polygons_out.setdefault(outer, [[list(p) for p in rings[outer]]])
+            polygons_out[outer].append([list(p) for p in rings[i]])
+    return list(polygons_out.values())
+
+
+def dissolve(geojson, mapping, key='nsw_loca_2', group='LGA'):
+    """Unions the features of a GeoJSON collection into one feature per group.
+
+    `mapping` maps each feature's `key` property to its group (its LGA).
+    Features without a group are left out.
+    """
+    members = {}
+    for feature in geojson['features']:
+        name = mapping.get(feature['properties'].get(key))
+        if name is not None:
+            members.setdefault(name, []).extend(_polygons(feature.get('geometry')))
+
+    features = []
+    for name, polygons in members.items():
+        coordinates = _dissolve_polygons(polygons)
+        if coordinates:
+            features.append({
+                'type': 'Feature',
+                'properties': {group: name},
+                'geometry': {'type': 'MultiPolygon', 'coordinates': coordinates},
+            })
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,27 @@
+"""gunicorn settings for the dashboard (see wsgi.py)."""
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:server'
+bind = os.environ.get('BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# Load the app (and its data) once in the master, then fork the workers
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Threads do not survive the fork, so each worker starts its own watcher
+    # for changes to the source files (SAFETY_RELOAD_INTERVAL)
+    from app import start_data_watcher
+    start_data_watcher()
@@ -0,0 +1,314 @@
+"""Builds the dashboard's crime table from raw BOCSAR incident extracts.
+
+    python ingest.py incidents-2024.csv incidents-2025-q1.csv --population population.csv
+
+Each raw file is read in chunks of --chunksize rows, so memory use depends on
+the number of LGAs, offence types and years, not on the number of incidents.
+Incidents are counted per LGA, crime type and year, and the rate per 100,000
+residents is computed from the population file (columns LGA, Population and
+optionally Year). The result is written atomically, in the wide
+{Crime}_{Count|Rate}_{Year} layout the app reads, to --output.
+
+Columns of the current output file that ingestion does not produce
+(nsw_loca_2, Final_Safety_Score, Predicted_*) are kept for the LGAs already
+in it. LGAs new to the table get an equal-weight safety score and a linear
+trend forecast instead (see scoring.py and forecast.py).
+
+Runs are incremental: the per-period counts and the raw files already read
+are kept in --state. A later run skips files it has already read and, in new
+files, rows of periods (months, or years when the date column only holds a
+year) it has already counted. Years with fewer than 12 months of data are
+kept in the state but left out of the table until they are complete. --full
+ignores the state and starts over.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+
+import pandas as pd
+
+from data_store import CRIME_COLUMN, SafetyDataStore
+from forecast import TrendForecaster
+from loader import CSV_PATH, CACHE_DIR, source_key
+from scoring import SafetyScorer
+
+logger = logging.getLogger('safety.ingest')
+
+CHUNK_SIZE = 500_000
+
+# How the date column is parsed: 'ISO8601' (2024-03-05), 'mixed' (guessed
+# per value, day first as in 05/03/2024) or a strftime format like %d/%m/%Y
+DATE_FORMAT = 'ISO8601'
+STATE_DIR = os.path.join(CACHE_DIR, 'ingest')
+
+# BOCSAR offence category -> crime type used in the column names
+OFFENCE_TYPES = {
+    'Assault': 'Assault',
+    'Drug offences': 'Drug',
+    'Malicious damage to property': 'Damage',
+    'Theft': 'Theft',
+    'Robbery': 'Robbery',
+    'Homicide': 'Homicide',
+    'Sexual offences': 'Sexual',
+    'Disorderly conduct': 'Disorderly',
+    'Weapons offences': 'Weapons',
+    'Prohibited and regulated weapons offences': 'Weapons',
+}
+
+
+def crime_type(offence):
+    """Returns the crime type of a BOCSAR offence category.
+
+    Unknown categories use their first word, which keeps column names like
+    Fraud_Count_2024 valid.
+    """
+    offence = str(offence).strip()
+    if offence in OFFENCE_TYPES:
+        return OFFENCE_TYPES[offence]
+    words = re.findall(r'[A-Za-z]+', offence)
+    return words[0].capitalize() if words else None
+
+
+def periods(values, date_format=DATE_FORMAT):
+    """Returns (period, year) Series for a date column.
+
+    Periods are months ('2024-03'), or years when the column only holds years.
+    Dates that do not match `date_format` get a missing year.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        years = pd.to_numeric(values, errors='coerce').astype('Int64')
+        return years.astype(str), years
+    # An explicit format, since pandas otherwise infers one from the first
+    # value: with dayfirst, 2025-01-05 sets %Y-%d-%m for the whole chunk.
+    # Day first only applies to guessed, non-ISO layouts.
+    dates = pd.to_datetime(values, errors='coerce', format=date_format, dayfirst=date_format == 'mixed')
+    return dates.dt.to_period('M').astype(str), dates.dt.year.astype('Int64')
+
+
+def count_incidents(path, lga_column, offence_column, date_column, skip_periods=(), chunksize=CHUNK_SIZE,
+                    date_format=DATE_FORMAT):
+    """Counts the incidents of one raw file per (LGA, crime type, year, period).
+
+    Rows of `skip_periods` are left out, and so are rows without an LGA,
+    crime type or readable date, which are logged. Returns a Series indexed
+    by those four levels.
+    """
+    totals = None
+    bad_dates = dropped = 0
+    reader = pd.read_csv(
+        path, usecols=[lga_column, offence_column, date_column], chunksize=chunksize,
+        dtype={lga_column: 'string', offence_column: 'category'},
+    )
+    for i, chunk in enumerate(reader):
+        period, year = periods(chunk[date_column], date_format)
+        frame = pd.DataFrame({
+            'LGA': chunk[lga_column].str.strip(),
+            'crime': chunk[offence_column].map(crime_type).astype('string'),
+            'year': year,
+            'period': period,
+        })
+        bad_dates += int((year.isna() & chunk[date_column].notna()).sum())
+        dropped += len(frame)
+        frame = frame.dropna()
+        dropped -= len(frame)
+        if skip_periods:
+            frame = frame[~frame['period'].isin(skip_periods)]
+        counts = frame.groupby(['LGA', 'crime', 'year', 'period'], observed=True).size()
+        totals = counts if totals is None else totals.add(counts, fill_value=0)
+        logger.info('%s: chunk %d, %d rows', path, i + 1, len(chunk))
+    if dropped:
+        logger.warning('%s: left out %d rows without an LGA, offence or date, %d of them with a date '
+                       'not matching %s (see --date-format)', path, dropped, bad_dates, date_format)
+    if totals is None:
+        return pd.Series(dtype='int64')
+    return totals.astype('int64')
+
+
+def load_state(state_dir):
+    """Returns (files, counts): the raw files read so far and their counts."""
+    try:
+        with open(os.path.join(state_dir, 'state.json'), encoding='utf-8') as f:
+            files = json.load(f)['files']
+        counts = pd.read_csv(os.path.join(state_dir, 'counts.csv'), dtype={'LGA': 'string', 'crime': 'string', 'period': 'string'})
+        counts = counts.set_index(['LGA', 'crime', 'year', 'period'])['count']
+        return files, counts
+    except (OSError, ValueError, KeyError):
+        return [], pd.Series(dtype='int64')
+
+
+def _replace(path, write):
+    """Writes a file through a temporary file, so readers never see half of it."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def save_state(state_dir, files, counts):
+    frame = counts.rename('count').reset_index()
+    _replace(os.path.join(state_dir, 'counts.csv'), lambda tmp: frame.to_csv(tmp, index=False))
+    _replace(os.path.join(state_dir, 'state.json'), lambda tmp: _write_json({'files': files}, tmp))
+
+
+def _write_json(obj, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=1)
+
+
+def load_population(path):
+    """Returns population indexed by LGA, or by (LGA, year) when the file has a Year column."""
+    population = pd.read_csv(path)
+    population['LGA'] = population['LGA'].astype(str).str.strip()
+    if 'Year' in population.columns:
+        population['year'] = population['Year'].astype(int)
+        return population.set_index(['LGA', 'year'])['Population']
+    return population.set_index('LGA')['Population']
+
+
+def build_table(counts, population, base=None, crime_types=None):
+    """Returns the wide crime table from per-period counts.
+
+    `base` is the current table. Its columns other than the counts and rates
+    are carried over for the LGAs it contains. LGAs without a population are
+    left out, since they have no rates, and so are years with monthly
+    periods that do not have all 12 months yet.
+    """
+    yearly = counts.groupby(level=['LGA', 'crime', 'year']).sum().rename('count').reset_index()
+
+    # With monthly periods, hold back years that do not have all 12 months yet
+    period_index = counts.index.to_frame(index=False)[['year', 'period']].drop_duplicates()
+    if period_index['period'].astype(str).str.len().gt(4).any():
+        months = period_index.groupby('year').size()
+        partial = months[months < 12].index
+        if len(partial):
+            logger.info('Held back incomplete years: %s', ', '.join(str(year) for year in partial))
+            yearly = yearly[~yearly['year'].isin(partial)]
+    if crime_types:
+        yearly = yearly[yearly['crime'].isin(crime_types)]
+    yearly['year'] = yearly['year'].astype(int)
+
+    if population.index.nlevels == 2:
+        yearly = yearly.join(population, on=['LGA', 'year'])
+    else:
+        yearly = yearly.join(population, on='LGA')
+    missing = sorted(yearly.loc[yearly['Population'].isna(), 'LGA'].unique())
+    if missing:
+        logger.warning('No population for %d LGAs, left out: %s', len(missing), ', '.join(missing))
+        yearly = yearly[~yearly['LGA'].isin(missing)]
+    yearly['rate'] = yearly['count'] / yearly['Population'] * 100_000
+
+    wide = yearly.pivot_table(index='LGA', columns=['crime', 'year'], values=['count', 'rate'], fill_value=0)
+    crimes = list(crime_types) if crime_types else sorted(yearly['crime'].unique())
+    years = sorted(yearly['year'].unique())
+    columns = {'LGA': wide.index.to_numpy()}
+    for crime in crimes:
+        for year in years:
+            count = ('count', crime, year)
+            rate = ('rate', crime, year)
+            columns[f'{crime}_Count_{year}'] = wide[count].to_numpy().astype(int) if count in wide.columns else 0
+            columns[f'{crime}_Rate_{year}'] = wide[rate].to_numpy() if rate in wide.columns else 0.0
+    table = pd.DataFrame(columns)
+
+    if base is not None:
+        extra = [c for c in base.columns if c != 'LGA' and not CRIME_COLUMN.match(c)]
+        carried = base.drop_duplicates('LGA').set_index('LGA')[extra]
+        table = table.join(carried, on='LGA')
+    return fill_derived(table)
+
+
+def fill_derived(table):
+    """Fills the score and prediction columns of LGAs that have none.
+
+    Final_Safety_Score gets the equal-weight score of the crime rates, and
+    Predicted_{Crime}_{Year} columns the linear trend for the year already
+    predicted in the table (or the year after the data).
+    """
+    store = SafetyDataStore(table)
+    if not store.crime_types:
+        return table
+
+    score = pd.Series(SafetyScorer(store).scores([1] * len(store.crime_types)), index=table.index)
+    if 'Final_Safety_Score' in table.columns:
+        table['Final_Safety_Score'] = table['Final_Safety_Score'].fillna(score)
+    else:
+        table['Final_Safety_Score'] = score
+
+    forecaster = TrendForecaster.from_store(store)
+    target = int(store.prediction_year) if store.prediction_year else forecaster.forecast_years(1)[0]
+    predicted = forecaster.predict([target])[:, :, 0]
+    for crime in store.crime_types:
+        column = f'Predicted_{crime}_{target}'
+        values = pd.Series(predicted[:, store.crime_index(crime)], index=table.index)
+        table[column] = table[column].fillna(values) if column in table.columns else values
+    return table
+
+
+def ingest(raw_paths, population_path, output=CSV_PATH, state_dir=STATE_DIR, full=False,
+           lga_column='LGA', offence_column='Offence category', date_column='Date',
+           crime_types=None, chunksize=CHUNK_SIZE, date_format=DATE_FORMAT):
+    """Counts new incidents, rebuilds the crime table and writes it to `output`.
+
+    Returns the table.
+    """
+    files, counts = ([], pd.Series(dtype='int64')) if full else load_state(state_dir)
+    seen = {json.dumps(key, sort_keys=True) for key in files}
+    done_periods = set(counts.index.get_level_values('period')) if len(counts) else set()
+
+    new_counts = []
+    for path in raw_paths:
+        key = source_key(path)
+        if json.dumps(key, sort_keys=True) in seen:
+            logger.info('%s: already ingested, skipped', path)
+            continue
+        file_counts = count_incidents(path, lga_column, offence_column, date_column, done_periods, chunksize,
+                                      date_format)
+        new_counts.append(file_counts)
+        files.append(key)
+        # An extract covers its periods completely, later files do not add to them
+        if len(file_counts):
+            done_periods |= set(file_counts.index.get_level_values('period'))
+
+    for file_counts in new_counts:
+        counts = file_counts if not len(counts) else counts.add(file_counts, fill_value=0).astype('int64')
+
+    base = pd.read_csv(output) if os.path.exists(output) else None
+    if crime_types is None and base is not None:
+        crime_types = list(SafetyDataStore(base).crime_types) or None
+    table = build_table(counts, load_population(population_path), base, crime_types)
+
+    _replace(output, lambda tmp: table.to_csv(tmp, index=False))
+    save_state(state_dir, files, counts)
+    logger.info('Wrote %s: %d LGAs, %d columns', output, len(table), len(table.columns))
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('raw', nargs='+', help='raw BOCSAR incident CSV files')
+    parser.add_argument('--population', required=True, help='CSV with LGA, Population and optionally Year')
+    parser.add_argument('--output', default=CSV_PATH)
+    parser.add_argument('--state', default=STATE_DIR, help='directory for the incremental state')
+    parser.add_argument('--full', action='store_true', help='ignore the state and count every file again')
+    parser.add_argument('--lga-column', default='LGA')
+    parser.add_argument('--offence-column', default='Offence category')
+    parser.add_argument('--date-column', default='Date')
+    parser.add_argument('--date-format', default=DATE_FORMAT,
+                        help="ISO8601 (default), mixed (guessed, day first) or a strftime format like %%d/%%m/%%Y")
+    parser.add_argument('--crimes', help='comma-separated crime types to keep (default: those of the current output)')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ingest(
+        args.raw, args.population, args.output, args.state, args.full,
+        args.lga_column, args.offence_column, args.date_column,
+        args.crimes.split(',') if args.crimes else None, args.chunksize, args.date_format,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Loads the dashboard's source files through a build-once binary cache.
+
+The first start reads the CSV and GeoJSON as usual and writes a Parquet copy
+of the tables and a pickled copy of the parsed geometry to CACHE_DIR. Later
+starts load those files directly. A cache entry is rebuilt whenever the
+mtime or size of one of its source files changes (or its SHA-1, when
+SAFETY_CACHE_HASH=1).
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from data_store import CRIME_COLUMN, PREDICTION_COLUMN
+
+CSV_PATH = os.environ.get('SAFETY_DATA_CSV', 'community_safety_predictions_2025_lga.csv')
+GEOJSON_PATH = os.environ.get('SAFETY_GEOJSON', 'NSW-suburb.geojson')
+MAPPING_PATH = os.environ.get('SAFETY_SUBURB_LGA', 'suburb-lga-mapping.csv')
+CACHE_DIR = os.environ.get('SAFETY_CACHE_DIR', '.cache')
+USE_CACHE = os.environ.get('SAFETY_CACHE', '1').lower() not in ('0', 'false', 'no')
+HASH_SOURCES = os.environ.get('SAFETY_CACHE_HASH', '').lower() in ('1', 'true', 'yes')
+
+# Bump when the way cached results are built changes
+CACHE_VERSION = 2
+
+logger = logging.getLogger('safety.startup')
+
+# Step name -> seconds, in the order the steps ran
+startup_timings = OrderedDict()
+
+
+@contextmanager
+def timed(step):
+    """Records how long a startup step takes."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[step] = time.perf_counter() - start
+
+
+def log_startup_timings():
+    """Logs every recorded startup step and the total."""
+    for step, seconds in startup_timings.items():
+        logger.info('%-28s %8.1f ms', step, seconds * 1e3)
+    logger.info('%-28s %8.1f ms', 'total', sum(startup_timings.values()) * 1e3)
+
+
+def source_key(path):
+    """Returns what a cache entry built from `path` is keyed on."""
+    stat = os.stat(path)
+    key = {'path': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if HASH_SOURCES:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        key['sha1'] = digest.hexdigest()
+    return key
+
+
+def data_version(sources):
+    """Returns a short id that changes whenever one of the source files changes."""
+    key = json.dumps([CACHE_VERSION] + [source_key(source) for source in sources], sort_keys=True)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+
+def _atomic_write(path, write):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_frame(df, path):
+    try:
+        df.to_parquet(path, index=False)
+    except ImportError:
+        # No Parquet engine installed, fall back to a pickle
+        df.to_pickle(path)
+
+
+def _read_frame(path):
+    try:
+        return pd.read_parquet(path)
+    except (ImportError, ValueError, OSError):
+        return pd.read_pickle(path)
+
+
+def _write_json(obj, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f)
+
+
+def _write_object(obj, path):
+    with open(path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_object(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def cached(name, sources, build, write=_write_object, read=_read_object, valid=None):
+    """Returns the cached result of `build()`, rebuilding it when a source changed.
+
+    `sources` are the files the result is derived from. The cache entry is the
+    data file `CACHE_DIR/<name>` plus a `<name>.key` file recording the source
+    keys it was built from. `valid`, when given, is called with a cached result
+    and can reject it (for example when files it points to were deleted).
+    """
+    if not USE_CACHE:
+        return build()
+
+    path = os.path.join(CACHE_DIR, name)
+    key_path = path + '.key'
+    key = {'version': CACHE_VERSION, 'sources': [source_key(source) for source in sources]}
+
+    try:
+        with open(key_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == key:
+                result = read(path)
+                if valid is None or valid(result):
+                    return result
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+        pass
+
+    result = build()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _atomic_write(path, lambda tmp: write(result, tmp))
+        _atomic_write(key_path, lambda tmp: _write_json(key, tmp))
+    except OSError as e:
+        logger.warning('Could not write cache entry %s: %s', path, e)
+    return result
+
+
+def cached_frame(name, sources, build):
+    """Like cached(), for results that are DataFrames (stored as Parquet)."""
+    return cached(name, sources, build, write=_write_frame, read=_read_frame)
+
+
+def compact_table(df):
+    """Returns the crime table with the smallest dtypes that hold its values.
+
+    Counts become the smallest integer type that fits them and rates
+    (including the predicted ones) float32, which is more precision than
+    the published rates have. String columns become categoricals where that
+    is smaller, i.e. when values repeat.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        match = CRIME_COLUMN.match(column)
+        if match and match.group('kind') == 'Count' and pd.api.types.is_numeric_dtype(values):
+            if values.notna().all() and (values == np.round(values)).all():
+                values = pd.to_numeric(values.astype('int64'), downcast='unsigned' if (values >= 0).all() else 'integer')
+        elif (match or PREDICTION_COLUMN.match(column)) and pd.api.types.is_float_dtype(values):
+            values = values.astype('float32')
+        elif values.dtype == object:
+            category = values.astype('category')
+            if category.memory_usage(deep=True) < values.memory_usage(deep=True):
+                values = category
+        columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def load_crime_table(path=CSV_PATH):
+    """Returns the compacted crime table, from the Parquet cache when it is current."""
+    return cached_frame('crime_table.parquet', [path], lambda: compact_table(pd.read_csv(path)))
+
+
+def load_geojson(path=GEOJSON_PATH):
+    """Returns the parsed suburb GeoJSON, from the pickle cache when it is current."""
+    def build():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return cached('geojson.pickle', [path], build)
+
+
+def mapping_sources():
+    """Returns the files the suburb -> LGA mapping is derived from."""
+    if os.path.exists(MAPPING_PATH):
+        return [MAPPING_PATH]
+    return [CSV_PATH]
+
+
+def load_suburb_lga_mapping(df):
+    """Returns {nsw_loca_2: LGA} for every suburb with a known LGA.
+
+    The mapping comes from MAPPING_PATH (columns nsw_loca_2, LGA) when that
+    file exists. Otherwise each LGA row of the crime table maps its own
+    nsw_loca_2 suburb.
+    """
+    if os.path.exists(MAPPING_PATH):
+        pairs = pd.read_csv(MAPPING_PATH, usecols=['nsw_loca_2', 'LGA'])
+    else:
+        pairs = df[['nsw_loca_2', 'LGA']]
+    pairs = pairs.dropna().drop_duplicates(subset=['nsw_loca_2'])
+    return dict(zip(pairs['nsw_loca_2'], pairs['LGA']))
+
+
+def _write_bytes(payload, path):
+    with open(path, 'wb') as f:
+        f.write(payload)
+
+
+def write_geometry(directory, name, geojson):
+    """Writes a GeoJSON collection as compact JSON, plus a gzipped copy.
+
+    Returns the absolute path of the JSON file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.abspath(os.path.join(directory, name + '.json'))
+    payload = json.dumps(geojson, separators=(',', ':')).encode('utf-8')
+    _atomic_write(path, lambda tmp: _write_bytes(payload, tmp))
+    _atomic_write(path + '.gz', lambda tmp: _write_bytes(gzip.compress(payload, 9), tmp))
+    return path
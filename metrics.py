@@ -0,0 +1,207 @@
+"""Timing and response-size instrumentation for the dashboard callbacks.
+
+Turned on with SAFETY_METRICS=1. The app then records, per callback:
+
+- the time spent in the callback and in named spans inside it (building the
+  choropleth, the gauge figures, ...),
+- the time of the whole /_dash-update-component request, and the part of it
+  spent outside the callback (decoding inputs, serializing the response),
+- the size of the response body,
+
+as Prometheus histograms served from /metrics. With SAFETY_SLOW_REQUEST_MS
+set, requests slower than that are also logged with their span breakdown.
+
+When both are off, instrument() returns the callback unchanged and span()
+returns a shared no-op context manager, so the instrumentation costs one
+attribute lookup per span.
+
+Every gunicorn worker keeps its own histograms, so a scrape sees the worker
+that answered it.
+"""
+import bisect
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+
+from flask import Response, request
+
+logger = logging.getLogger('safety.metrics')
+
+METRICS_ENABLED = os.environ.get('SAFETY_METRICS', '').lower() in ('1', 'true', 'yes')
+SLOW_REQUEST_MS = float(os.environ.get('SAFETY_SLOW_REQUEST_MS', 0) or 0)
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label value."""
+
+    def __init__(self, name, help_text, label, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Per-bucket counts (plus +Inf), sum
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def exposition(self):
+        """Returns the histogram in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(series.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Collects callback, span and request measurements for one process."""
+
+    def __init__(self, enabled=METRICS_ENABLED, slow_request_ms=SLOW_REQUEST_MS):
+        self.slow_request_ms = slow_request_ms
+        self.serve_metrics = enabled
+        self.enabled = enabled or slow_request_ms > 0
+        self.callback_seconds = Histogram(
+            'safety_callback_seconds', 'Time spent in a Dash callback.', 'callback', TIME_BUCKETS)
+        self.span_seconds = Histogram(
+            'safety_span_seconds', 'Time spent in a section of a callback.', 'span', TIME_BUCKETS)
+        self.request_seconds = Histogram(
+            'safety_request_seconds', 'Time of a whole callback request.', 'callback', TIME_BUCKETS)
+        self.overhead_seconds = Histogram(
+            'safety_request_overhead_seconds',
+            'Time of a callback request spent outside the callback (input decoding, '
+            'JSON serialization).', 'callback', TIME_BUCKETS)
+        self.response_bytes = Histogram(
+            'safety_response_bytes', 'Size of a callback response body.', 'callback', SIZE_BUCKETS)
+        self._local = threading.local()
+        self.collectors = []
+
+    def span(self, name):
+        """Context manager that times a section of a callback."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name)
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.span_seconds.observe(name, seconds)
+            spans = getattr(self._local, 'spans', None)
+            if spans is not None:
+                spans.append((name, seconds))
+
+    def instrument(self, name=None):
+        """Decorator that times a callback and labels the request with it."""
+        def decorator(func):
+            if not self.enabled:
+                return func
+            callback_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                self._local.callback = callback_name
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    seconds = time.perf_counter() - start
+                    self._local.callback_seconds = seconds
+                    self.callback_seconds.observe(callback_name, seconds)
+            return wrapper
+        return decorator
+
+    def label(self, name):
+        """Labels the current request with a callback that runs elsewhere (a background job)."""
+        if self.enabled:
+            self._local.callback = name
+
+    def observe_callback(self, name, seconds):
+        """Records the time of a callback that was not timed by instrument()."""
+        if self.enabled:
+            self.callback_seconds.observe(name, seconds)
+
+    def _before_request(self):
+        if request.path.endswith('/_dash-update-component'):
+            self._local.start = time.perf_counter()
+            self._local.spans = []
+            self._local.callback = None
+            self._local.callback_seconds = 0.0
+
+    def _after_request(self, response):
+        start = getattr(self._local, 'start', None)
+        if start is None:
+            return response
+        self._local.start = None
+        seconds = time.perf_counter() - start
+        callback_name = self._local.callback or 'other'
+        size = response.calculate_content_length() or 0
+
+        self.request_seconds.observe(callback_name, seconds)
+        self.overhead_seconds.observe(callback_name, max(seconds - self._local.callback_seconds, 0.0))
+        self.response_bytes.observe(callback_name, size)
+
+        if self.slow_request_ms and seconds * 1e3 >= self.slow_request_ms:
+            breakdown = ', '.join(f'{span} {span_seconds * 1e3:.1f} ms' for span, span_seconds in self._local.spans)
+            logger.warning(
+                'Slow request: %s took %.1f ms (callback %.1f ms; %s), %d bytes',
+                callback_name, seconds * 1e3, self._local.callback_seconds * 1e3,
+                breakdown or 'no spans', size,
+            )
+        self._local.spans = None
+        return response
+
+    def exposition(self):
+        """Returns every metric in the Prometheus text format."""
+        lines = []
+        for histogram in (self.callback_seconds, self.span_seconds, self.request_seconds,
+                          self.overhead_seconds, self.response_bytes):
+            lines.extend(histogram.exposition())
+        for collect in self.collectors:
+            lines.extend(collect())
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, server, path='/metrics'):
+        """Registers the request hooks (and the /metrics endpoint) on a Flask server."""
+        if not self.enabled:
+            return
+        server.before_request(self._before_request)
+        server.after_request(self._after_request)
+        if self.serve_metrics:
+            server.add_url_rule(path, 'metrics', lambda: Response(
+                self.exposition(), mimetype='text/plain; version=0.0.4'))
+
+
+def counter_lines(name, help_text, label, values):
+    """Returns Prometheus text lines for a counter with one series per label value."""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    lines.extend(f'{name}{{{label}="{_escape(key)}"}} {value}' for key, value in sorted(values.items()))
+    return lines
@@ -0,0 +1,98 @@
+"""Precomputed LGA rankings for the top-N panels and the gauges.
+
+Every ranking is built once, when the app starts: for each metric (crime
+count, crime rate, safety score), crime type and year, the LGAs sorted from
+the highest value to the lowest, and each LGA's rank in that order. A top-N
+or bottom-N list is then a slice, and an LGA's rank or percentile a single
+array lookup.
+"""
+import numpy as np
+
+
+def rank_order(values):
+    """Returns (order, ranks) for an array of values, highest first.
+
+    `order` lists the indices from the highest value to the lowest (ties keep
+    their original order) and `ranks[i]` is the 1-based rank of index i.
+    """
+    order = np.argsort(-np.asarray(values, dtype=float), kind='stable')
+    ranks = np.empty(len(order), dtype=int)
+    ranks[order] = np.arange(1, len(order) + 1)
+    return order, ranks
+
+
+def percentile(rank, n):
+    """Returns the share of the other n - 1 LGAs ranked below `rank`, from 0 to 100."""
+    if n < 2:
+        return 100.0
+    return 100.0 * (n - rank) / (n - 1)
+
+
+class RankingIndex:
+    """Sorted orders and ranks of the LGAs of a SafetyDataStore.
+
+    Keys are (metric, crime type, year):
+
+    - ('count', crime, year) and ('rate', crime, year): rank 1 is the LGA with
+      the most crime of that type that year.
+    - ('safety', None, year): the equal-weight safety score of that year's
+      rates (see SafetyScorer); rank 1 is the safest LGA.
+    - ('safety', None, None): the Final_Safety_Score column, when present.
+
+    An LGA that appears on several rows is ranked once, with its first row.
+    """
+
+    def __init__(self, store, scorer):
+        self.store = store
+        # One row per LGA, in table order
+        self.rows = np.array(sorted(store.positions.values()), dtype=int)
+        self.lgas = [store.lgas[i] for i in self.rows]
+        self.row_positions = {lga: i for i, lga in enumerate(self.lgas)}
+        self.orders = {}
+        self.ranks = {}
+        self.values = {}
+
+        counts = np.asarray(store.counts)[self.rows]
+        rates = np.asarray(store.rates)[self.rows]
+        equal_weights = [1] * len(store.crime_types)
+        for year in store.years:
+            y = store.year_index(year)
+            for crime in store.crime_types:
+                c = store.crime_index(crime)
+                self._add(('count', crime, year), counts[:, c, y])
+                self._add(('rate', crime, year), rates[:, c, y])
+            self._add(('safety', None, year), scorer.scores(equal_weights, year)[self.rows])
+        if store.has_column('Final_Safety_Score'):
+            self._add(('safety', None, None), np.asarray(store.columns['Final_Safety_Score'])[self.rows])
+
+    def _add(self, key, values):
+        self.values[key] = values
+        self.orders[key], self.ranks[key] = rank_order(values)
+
+    def __len__(self):
+        return len(self.lgas)
+
+    def __contains__(self, key):
+        return key in self.orders
+
+    def top(self, metric, crime=None, year=None, n=3):
+        """Returns the n LGAs ranked highest for a metric."""
+        order = self.orders[(metric, crime, year)]
+        return [self.lgas[i] for i in order[:n]]
+
+    def bottom(self, metric, crime=None, year=None, n=3):
+        """Returns the n LGAs ranked lowest for a metric, lowest first."""
+        order = self.orders[(metric, crime, year)]
+        return [self.lgas[i] for i in order[::-1][:n]]
+
+    def rank(self, lga, metric, crime=None, year=None):
+        """Returns the 1-based rank of an LGA for a metric."""
+        return int(self.ranks[(metric, crime, year)][self.row_positions[lga]])
+
+    def value(self, lga, metric, crime=None, year=None):
+        """Returns the value an LGA is ranked by for a metric."""
+        return self.values[(metric, crime, year)][self.row_positions[lga]]
+
+    def percentile(self, lga, metric, crime=None, year=None):
+        """Returns the share of the other LGAs ranked below this one, from 0 to 100."""
+        return percentile(self.rank(lga, metric, crime, year), len(self.lgas))
@@ -0,0 +1,67 @@
+"""Safety scores recomputed from the crime rates with user-chosen weights."""
+import numpy as np
+
+
+def _minmax(values, axis=0):
+    """Scales values to [0, 1] along an axis (constant slices become 0)."""
+    low = values.min(axis=axis, keepdims=True)
+    span = values.max(axis=axis, keepdims=True) - low
+    return np.divide(values - low, span, out=np.zeros_like(values), where=span > 0)
+
+
+class SafetyScorer:
+    """Scores every LGA from 0 (least safe) to 100 (safest) for a set of crime weights.
+
+    Each crime type's rate is MinMax-scaled across LGAs once, when the scorer
+    is built. A score is then one matrix-vector product of the scaled rates
+    and the weights, MinMax-scaled again and flipped, so the LGA with the
+    least weighted crime scores 100 and the one with the most scores 0.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.crime_types = store.crime_types
+        rates = np.asarray(store.rates, dtype=float)
+        # (LGA, crime type) over the mean of every year, and (LGA, crime type,
+        # year); float32 like the rates, the scores are only shown to 1 decimal
+        self.scaled_mean = _minmax(rates.mean(axis=2)).astype(np.float32)
+        self.scaled_years = _minmax(rates).astype(np.float32)
+
+    def slider_weights(self, crimes, weights):
+        """Returns the weights of the sliders for `crimes`, in crime type order.
+
+        Crime types without a slider, such as one a reload added after the
+        page was built, weigh 1.
+        """
+        by_crime = dict(zip(crimes, weights))
+        return [by_crime.get(crime, 1) for crime in self.crime_types]
+
+    def weight_vector(self, weights):
+        """Returns weights (one per crime type, in order) as a normalized array."""
+        w = np.array([0 if weight is None else weight for weight in weights], dtype=float)
+        if w.shape != (len(self.crime_types),):
+            raise ValueError(f'Expected {len(self.crime_types)} weights, got {len(w)}')
+        w = np.clip(w, 0, None)
+        total = w.sum()
+        return w / total if total > 0 else w
+
+    def scores(self, weights, year=None):
+        """Returns the score of every LGA, in store row order.
+
+        Rates are averaged over every year unless `year` is given.
+        """
+        if year is None:
+            scaled = self.scaled_mean
+        else:
+            scaled = self.scaled_years[:, :, self.store.year_index(year)]
+        crime = scaled @ self.weight_vector(weights)
+        return 100 * (1 - _minmax(crime))
+
+    def score(self, lga, weights, year=None):
+        """Returns the score of one LGA."""
+        return self.scores(weights, year)[self.store.position(lga)]
+
+    def top(self, weights, n=3, year=None):
+        """Returns the n LGAs with the highest scores, best first."""
+        order = np.argsort(-self.scores(weights, year), kind='stable')[:n]
+        return [self.store.lgas[i] for i in order]
@@ -0,0 +1,126 @@
+"""Case-insensitive search over LGA and suburb names, for the suburb dropdown.
+
+Names are normalised (lower case, runs of other characters as one space) and
+indexed two ways:
+
+- sorted keys for every name and every word suffix of it ("sutherland
+  shire", "shire"), so the names starting with the query, or with a word
+  starting with it, are found by binary search;
+- trigram postings, for queries no name or word starts with (typos, the
+  middle of a word): the names sharing most trigrams with the query match.
+
+Every name selects an LGA, since that is what the callbacks compare: typing
+a suburb offers the LGA it is in.
+"""
+import bisect
+import re
+from collections import defaultdict
+
+# Share of the query's trigrams a name needs for a fuzzy match
+MIN_TRIGRAM_SHARE = 0.35
+
+
+def normalize(text):
+    """Returns text in lower case, with runs of other characters as one space."""
+    return ' '.join(re.findall(r'[a-z0-9]+', str(text).lower()))
+
+
+def trigrams(text):
+    """Returns the trigrams of a normalised text, padded to mark word starts."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Prefix and trigram index of dropdown options.
+
+    `lgas` are the LGA names and `suburbs` maps suburb names to their LGA.
+    Matches are ranked in tiers: LGA names starting with the query, suburb
+    names starting with it, then names with a later word starting with it.
+    Within a tier they are alphabetical. Only a query without any of those
+    falls back to fuzzy trigram matches.
+    """
+
+    def __init__(self, lgas, suburbs=None):
+        lgas = list(dict.fromkeys(lgas))
+        known = set(lgas)
+        # (label, LGA) of every name, LGAs first
+        self.entries = [(lga, lga) for lga in lgas]
+        self.entries += [
+            (f'{suburb} ({lga})', lga)
+            for suburb, lga in sorted((suburbs or {}).items())
+            if lga in known and normalize(suburb) != normalize(lga)
+        ]
+        names = [normalize(lga) for lga in lgas]
+        # Normalised LGA name -> LGA, for exact lookups
+        self.lga_names = {}
+        for name, lga in zip(names, lgas):
+            self.lga_names.setdefault(name, lga)
+        names += [normalize(label.rsplit(' (', 1)[0]) for label, _ in self.entries[len(lgas):]]
+
+        # Sorted (key, entry) pairs per tier, see the class docstring
+        tiers = [[], [], [], []]
+        self.postings = defaultdict(list)
+        for i, name in enumerate(names):
+            suburb = i >= len(lgas)
+            words = name.split()
+            tiers[suburb].append((name, i))
+            for k in range(1, len(words)):
+                tiers[2 + suburb].append((' '.join(words[k:]), i))
+            for gram in trigrams(name):
+                self.postings[gram].append(i)
+        self.tiers = []
+        for tier in tiers:
+            tier.sort()
+            self.tiers.append(([key for key, _ in tier], [i for _, i in tier]))
+        self.names = names
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lga(self, name):
+        """Returns the LGA whose name matches, ignoring case and punctuation, or None."""
+        return self.lga_names.get(normalize(name))
+
+    def _prefix_matches(self, query):
+        for keys, ids in self.tiers:
+            start = bisect.bisect_left(keys, query)
+            for j in range(start, len(keys)):
+                if not keys[j].startswith(query):
+                    break
+                yield ids[j]
+
+    def _fuzzy_matches(self, query):
+        grams = trigrams(query)
+        shared = defaultdict(int)
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] += 1
+        needed = MIN_TRIGRAM_SHARE * len(grams)
+        matches = [i for i, count in shared.items() if count >= needed]
+        matches.sort(key=lambda i: (-shared[i], abs(len(self.names[i]) - len(query)), self.names[i]))
+        return matches
+
+    def search(self, query, limit=20):
+        """Returns up to `limit` (label, LGA) matches for a query, best first.
+
+        Each LGA is offered once, with the label of its best match.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        matches = self._collect(self._prefix_matches(query), limit)
+        return matches or self._collect(self._fuzzy_matches(query), limit)
+
+    def _collect(self, ids, limit):
+        matches = []
+        seen = set()
+        for i in ids:
+            label, lga = self.entries[i]
+            if lga in seen:
+                continue
+            seen.add(lga)
+            matches.append((label, lga))
+            if len(matches) >= limit:
+                break
+        return matches
@@ -0,0 +1,193 @@
+"""Spatial index over the suburb polygons, for the "safest areas near me" panel.
+
+Built once per geometry version (and cached with it, see loader.cached): the
+centroid and bounding box of every suburb, as arrays, and its rings for exact
+point-in-polygon tests. Distance queries run on the centroids:
+
+- with SciPy installed, through a KD-tree of the centroids as points on the
+  unit sphere, where straight-line distance grows with great-circle distance;
+- without it, through a vectorised haversine over every centroid, which still
+  takes well under a millisecond for the ~4,600 NSW suburbs.
+
+Locating a point only runs the polygon test on the suburbs whose bounding
+box contains it. A point is inside a suburb when an odd number of its rings
+(outer rings and holes) contain it. The rings of every suburb share one
+float32 vertex array (about 1.5 m of precision at NSW longitudes), indexed
+by offset arrays, which takes half the memory of float64 rings and none of
+the per-ring Python objects.
+"""
+import numpy as np
+
+from geometry import _polygons, point_in_ring
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def _unit_vectors(lons, lats):
+    """Returns points on the unit sphere for arrays of longitudes and latitudes."""
+    lon, lat = np.radians(lons), np.radians(lats)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def haversine_km(lon, lat, lons, lats):
+    """Returns the great-circle distances in km from a point to arrays of points."""
+    lon, lat, lons, lats = np.radians(lon), np.radians(lat), np.radians(lons), np.radians(lats)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _ring_centroid(ring):
+    """Returns (area, x, y) of a closed ring, area unsigned."""
+    x, y = ring[:, 0], ring[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    area = cross.sum() / 2
+    if area == 0:
+        return 0.0, float(x.mean()), float(y.mean())
+    cx = ((x[:-1] + x[1:]) * cross).sum() / (6 * area)
+    cy = ((y[:-1] + y[1:]) * cross).sum() / (6 * area)
+    return abs(float(area)), float(cx), float(cy)
+
+
+def _centroid(polygons):
+    """Returns (area, x, y) of polygons, holes subtracted."""
+    weights, xs, ys = [], [], []
+    for polygon in polygons:
+        for i, ring in enumerate(polygon):
+            area, x, y = _ring_centroid(ring)
+            weights.append(area if i == 0 else -area)
+            xs.append(x)
+            ys.append(y)
+    total = sum(weights)
+    if total <= 0:
+        points = np.concatenate([polygon[0] for polygon in polygons])
+        return 0.0, float(points[:, 0].mean()), float(points[:, 1].mean())
+    return total, float(np.dot(weights, xs) / total), float(np.dot(weights, ys) / total)
+
+
+class SpatialIndex:
+    """Centroids, bounding boxes and polygons of the features of a GeoJSON collection.
+
+    Features are named by their `key` property. Distances are in km between
+    centroids, and results are (name, km) pairs, nearest first.
+    """
+
+    def __init__(self, geojson, key='nsw_loca_2'):
+        self.names = []
+        centroids, areas, bboxes, rings = [], [], [], []
+        ring_counts = []
+        for feature in geojson['features']:
+            polygons = [
+                [np.asarray(ring, dtype=float)[:, :2] for ring in polygon]
+                for polygon in _polygons(feature.get('geometry'))
+                if polygon and len(polygon[0]) >= 4
+            ]
+            if not polygons:
+                continue
+            area, x, y = _centroid(polygons)
+            outer = np.concatenate([polygon[0] for polygon in polygons])
+            feature_rings = [ring for polygon in polygons for ring in polygon]
+            rings.extend(feature_rings)
+            ring_counts.append(len(feature_rings))
+            self.names.append(feature['properties'][key])
+            centroids.append((x, y))
+            areas.append(area)
+            bboxes.append((*outer.min(axis=0), *outer.max(axis=0)))
+
+        self.vertices = np.concatenate(rings).astype(np.float32) if rings else np.zeros((0, 2), dtype=np.float32)
+        # Vertices of ring r: ring_starts[r]:ring_starts[r + 1]; rings of
+        # feature i: feature_rings[i]:feature_rings[i + 1]
+        self.ring_starts = np.concatenate([[0], np.cumsum([len(ring) for ring in rings], dtype=np.int64)]).astype(np.int32)
+        self.feature_rings = np.concatenate([[0], np.cumsum(ring_counts, dtype=np.int64)]).astype(np.int32)
+        self.centroids = np.array(centroids, dtype=float).reshape(-1, 2)
+        self.areas = np.array(areas, dtype=float)
+        # min lon, min lat, max lon, max lat
+        self.bboxes = np.array(bboxes, dtype=float).reshape(-1, 4)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self._build_tree()
+
+    def _build_tree(self):
+        self.tree = None
+        if cKDTree is not None and len(self.names):
+            self.tree = cKDTree(_unit_vectors(self.centroids[:, 0], self.centroids[:, 1]))
+
+    # The tree is rebuilt on load rather than pickled, so a cached index
+    # still loads where SciPy is not installed
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['tree'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_tree()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def centroid(self, name):
+        """Returns the (lon, lat) centroid of a feature."""
+        x, y = self.centroids[self.positions[name]]
+        return float(x), float(y)
+
+    def group_centroid(self, names):
+        """Returns the area-weighted (lon, lat) centroid of several features, or None."""
+        rows = [self.positions[name] for name in names if name in self.positions]
+        if not rows:
+            return None
+        weights = self.areas[rows]
+        if weights.sum() <= 0:
+            weights = np.ones(len(rows))
+        x, y = np.average(self.centroids[rows], axis=0, weights=weights)
+        return float(x), float(y)
+
+    def locate(self, lon, lat):
+        """Returns the name of the feature containing a point, or None."""
+        b = self.bboxes
+        candidates = np.flatnonzero((b[:, 0] <= lon) & (lon <= b[:, 2]) & (b[:, 1] <= lat) & (lat <= b[:, 3]))
+        starts = self.ring_starts
+        for i in candidates:
+            inside = False
+            for r in range(self.feature_rings[i], self.feature_rings[i + 1]):
+                inside ^= point_in_ring(lon, lat, self.vertices[starts[r]:starts[r + 1]])
+            if inside:
+                return self.names[i]
+        return None
+
+    def _results(self, lon, lat, rows):
+        rows = np.asarray(rows, dtype=int)
+        distances = haversine_km(lon, lat, self.centroids[rows, 0], self.centroids[rows, 1])
+        order = np.argsort(distances, kind='stable')
+        return [(self.names[rows[i]], float(distances[i])) for i in order]
+
+    def within(self, lon, lat, radius_km):
+        """Returns the features whose centroid is within `radius_km` of a point."""
+        if not len(self.names):
+            return []
+        if self.tree is not None:
+            chord = 2 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2)
+            rows = self.tree.query_ball_point(_unit_vectors([lon], [lat])[0], chord)
+        else:
+            distances = haversine_km(lon, lat, self.centroids[:, 0], self.centroids[:, 1])
+            rows = np.flatnonzero(distances <= radius_km)
+        return self._results(lon, lat, rows)
+
+    def nearest(self, lon, lat, k):
+        """Returns the `k` features whose centroids are nearest to a point."""
+        k = min(int(k), len(self.names))
+        if k <= 0:
+            return []
+        if self.tree is not None:
+            _, rows = self.tree.query(_unit_vectors([lon], [lat])[0], k)
+            rows = np.atleast_1d(rows)
+        else:
+            distances = haversine_km(lon, lat, self.centroids[:, 0], self.centroids[:, 1])
+            rows = np.argpartition(distances, k - 1)[:k]
+        return self._results(lon, lat, rows)
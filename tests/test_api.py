@@ -0,0 +1,155 @@
+import io
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+import api
+from data_store import SafetyDataStore
+from ranking import RankingIndex
+from scoring import SafetyScorer
+from search_index import SearchIndex
+
+LGAS = ['Albury', 'Ballina', 'Bega Valley']
+
+
+def make_data(version='v1'):
+    """Returns the parts of a Dataset the API reads, over a small table."""
+    df = pd.DataFrame({
+        'LGA': LGAS,
+        'Theft_Count_2023': [10, 11, 12],
+        'Theft_Rate_2023': [100.0, 101.0, 102.0],
+        'Theft_Count_2024': [20, 21, 22],
+        'Theft_Rate_2024': [200.0, 201.0, 202.0],
+        'Final_Safety_Score': [70.0, 40.0, 90.0],
+    })
+    store = SafetyDataStore(df)
+    return SimpleNamespace(
+        version=version,
+        modified=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        store=store,
+        ranking=RankingIndex(store, SafetyScorer(store)),
+        search=SearchIndex(store.lgas),
+        df=df[[column for column in df.columns if column not in store.array_columns]],
+    )
+
+
+def empty_table():
+    """Returns what the exports read of a Dataset whose table has no rows."""
+    full = make_data()
+    store = SafetyDataStore(pd.DataFrame({column: [] for column in ['LGA', *full.store.columns]}))
+    return SimpleNamespace(version='v0', modified=full.modified, store=store, df=full.df.iloc[:0])
+
+
+def make_client(data):
+    server = Flask(__name__)
+    server.register_blueprint(api.create_blueprint(lambda: data['current']))
+    return server.test_client()
+
+
+@pytest.fixture
+def data():
+    # A dict, so a test can swap the data like a reload does
+    return {'current': make_data()}
+
+
+@pytest.fixture
+def client(data):
+    return make_client(data)
+
+
+def test_lgas_revalidates_until_the_data_changes(client, data):
+    response = client.get('/api/lgas')
+    assert response.status_code == 200
+    assert response.json == {'version': 'v1', 'lgas': LGAS}
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    again = client.get('/api/lgas', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+
+    data['current'] = make_data(version='v2')
+    reloaded = client.get('/api/lgas', headers={'If-None-Match': etag})
+    assert reloaded.status_code == 200
+    assert reloaded.json['version'] == 'v2'
+
+
+def test_lga_detail(client):
+    response = client.get('/api/lgas/bega-valley')
+    assert response.status_code == 200
+    body = response.json
+    assert body['lga'] == 'Bega Valley'
+    assert body['safety_score'] == 90.0
+    assert body['safety_rank'] == 1 and body['lgas_ranked'] == 3
+    assert body['crimes']['Theft'] == {
+        'counts': {'2023': 12, '2024': 22},
+        'rates': {'2023': 102.0, '2024': 202.0},
+    }
+
+
+def test_unknown_lga(client):
+    response = client.get('/api/lgas/Nowhere')
+    assert response.status_code == 404
+    assert response.json == {'error': 'Unknown LGA: Nowhere'}
+    assert 'ETag' not in response.headers
+
+
+def test_batch_get_and_post_agree(client):
+    got = client.get('/api/lgas/batch?lga=Albury&lga=nowhere&lga=ALBURY&lga=Ballina')
+    posted = client.post('/api/lgas/batch', json={'lgas': ['Albury', 'nowhere', 'ALBURY', 'Ballina']})
+    assert got.status_code == posted.status_code == 200
+    assert got.json == posted.json
+    assert list(got.json['lgas']) == ['Albury', 'Ballina']
+    assert got.json['unknown'] == ['nowhere']
+    assert got.json['lgas']['Ballina']['safety_rank'] == 3
+
+
+def test_only_get_batches_revalidate(client):
+    etag = client.get('/api/lgas/batch?lga=Albury').headers['ETag']
+    assert client.get('/api/lgas/batch?lga=Albury', headers={'If-None-Match': etag}).status_code == 304
+    posted = client.post('/api/lgas/batch', json={'lgas': ['Albury']}, headers={'If-None-Match': etag})
+    assert posted.status_code == 200
+
+
+def test_batch_limit(client):
+    names = ['Albury'] * (api.MAX_BATCH + 1)
+    assert client.post('/api/lgas/batch', json={'lgas': names}).status_code == 400
+    assert client.get('/api/lgas/batch', query_string={'lga': names}).status_code == 400
+    assert client.post('/api/lgas/batch', json={'lgas': names[1:]}).status_code == 200
+
+
+@pytest.mark.parametrize('body', [{'lgas': 'Albury'}, {'lgas': [1]}, ['Albury'], {}])
+def test_batch_rejects_other_bodies(client, body):
+    response = client.post('/api/lgas/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+def test_csv_export(client, data, monkeypatch):
+    # Two rows per chunk, so only the first chunk carries the header
+    monkeypatch.setattr(api.table_chunks, '__defaults__', (2,))
+    assert len(list(api.table_chunks(data['current']))) == 2
+    response = client.get('/api/export.csv')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename="crime-v1.csv"'
+    table = pd.read_csv(io.StringIO(response.get_data(as_text=True)))
+    assert table['LGA'].tolist() == LGAS
+    assert table['Theft_Count_2024'].tolist() == [20, 21, 22]
+
+
+def test_csv_export_of_an_empty_table():
+    client = make_client({'current': empty_table()})
+    text = client.get('/api/export.csv').get_data(as_text=True)
+    assert text.splitlines() == ['LGA,Final_Safety_Score,Theft_Count_2023,Theft_Rate_2023,Theft_Count_2024,Theft_Rate_2024']
+
+
+def test_parquet_export_of_an_empty_table():
+    pq = pytest.importorskip('pyarrow.parquet')
+    client = make_client({'current': empty_table()})
+    table = pq.read_table(io.BytesIO(client.get('/api/export.parquet').data))
+    assert table.num_rows == 0
+    assert 'Theft_Rate_2024' in table.column_names
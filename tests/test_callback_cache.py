@@ -0,0 +1,65 @@
+import callback_cache
+from callback_cache import CallbackCache, LocalRedis, RedisBackend
+
+
+def make_cache(ttl=60):
+    return CallbackCache(RedisBackend(LocalRedis()), ttl=ttl, version='v1')
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(callback_cache.time, 'time', lambda: now[0])
+    cache = make_cache(ttl=60)
+    calls = []
+
+    @cache.memoize()
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9
+    now[0] += 59
+    assert square(3) == 9
+    assert calls == [3]
+
+    now[0] += 2
+    assert square(3) == 9
+    assert calls == [3, 3]
+    assert cache.stats()['square'] == {'hits': 1, 'misses': 2, 'errors': 0}
+
+
+def test_suburb_order_does_not_change_the_key():
+    cache = make_cache()
+    calls = []
+
+    @cache.memoize(unordered=('suburbs',))
+    def graphs(suburbs, year):
+        calls.append(list(suburbs))
+        return {suburb: year for suburb in suburbs}
+
+    first = graphs(['Albury', 'Ballina'], '2023')
+    assert graphs(['Ballina', ' Albury '], '2023') == first
+    assert len(calls) == 1
+
+    graphs(['Albury', 'Ballina'], '2024')
+    assert len(calls) == 2
+
+
+def test_key_changes_with_the_data_version():
+    version = ['v1']
+    cache = CallbackCache(RedisBackend(LocalRedis()), version=lambda: version[0])
+    arguments = {'suburbs': ['Albury', 'Ballina']}
+    key = cache.key('graphs', arguments, unordered=('suburbs',))
+    assert key == cache.key('graphs', {'suburbs': ['Ballina', 'Albury']}, unordered=('suburbs',))
+    version[0] = 'v2'
+    assert key != cache.key('graphs', arguments, unordered=('suburbs',))
+
+
+def test_clear_only_removes_this_prefix():
+    client = LocalRedis()
+    client.set('other:key', b'x')
+    backend = RedisBackend(client)
+    backend.set('a', b'1', 60)
+    backend.clear()
+    assert backend.get('a') is None
+    assert client.get('other:key') == b'x'
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import time
+
+import dataset
+
+OLD = time.time() - 3600
+
+
+def make_versions(cache_dir, arrays, geometry):
+    for name, versions in (('arrays', arrays), ('geometry', geometry)):
+        for version in versions:
+            os.makedirs(cache_dir / name / version)
+            os.utime(cache_dir / name / version, (OLD, OLD))
+
+
+def hold_versions(cache_dir, data_versions, geometry_versions, recorded, release):
+    """Runs in another process: records its versions and lives until released."""
+    dataset.VersionRegistry(str(cache_dir)).record(data_versions, geometry_versions)
+    recorded.set()
+    release.wait(10)
+
+
+def test_remove_unused_keeps_versions_of_other_processes(tmp_path):
+    make_versions(tmp_path, ['a1', 'a2', 'a3'], ['g1', 'g2', 'g3'])
+    (tmp_path / 'arrays' / 'notes.txt').write_text('not a version')
+    registry = dataset.VersionRegistry(str(tmp_path))
+
+    # A worker still on the startup data (or forked from a master holding
+    # it), while this one has reloaded twice
+    context = multiprocessing.get_context('fork')
+    recorded, release = context.Event(), context.Event()
+    other = context.Process(target=hold_versions, args=(tmp_path, ['a1'], ['g1'], recorded, release))
+    other.start()
+    try:
+        assert recorded.wait(10)
+        registry.record(['a3'], ['g3'])
+        registry.remove_unused()
+        assert sorted(os.listdir(tmp_path / 'arrays')) == ['a1', 'a3', 'notes.txt']
+        assert sorted(os.listdir(tmp_path / 'geometry')) == ['g1', 'g3']
+    finally:
+        release.set()
+        other.join(10)
+
+    # Once it has exited, its versions go too
+    registry.remove_unused()
+    assert sorted(os.listdir(tmp_path / 'arrays')) == ['a3', 'notes.txt']
+    assert os.listdir(tmp_path / 'geometry') == ['g3']
+    # And so does its record
+    assert sorted(os.listdir(tmp_path / 'versions')) == ['.lock', f'{os.getpid()}.json']
+
+
+def test_remove_unused_keeps_recent_directories(tmp_path):
+    make_versions(tmp_path, ['a1'], ['g1'])
+    # Being written by a process that has not swapped it in yet
+    os.makedirs(tmp_path / 'arrays' / 'a2')
+    registry = dataset.VersionRegistry(str(tmp_path), grace=60)
+    registry.record([], [])
+    registry.remove_unused()
+    assert os.listdir(tmp_path / 'arrays') == ['a2']
+    assert os.listdir(tmp_path / 'geometry') == []
+
+
+def test_remove_unused_without_cache(tmp_path):
+    dataset.VersionRegistry(str(tmp_path / 'missing')).remove_unused()
+    assert os.listdir(tmp_path / 'missing') == ['versions']
+
+
+def test_one_process_cleans_up_at_a_time(tmp_path):
+    make_versions(tmp_path, ['a1'], ['g1'])
+    registry = dataset.VersionRegistry(str(tmp_path))
+    registry.record([], [])
+    with open(tmp_path / 'versions' / '.lock', 'w') as lock:
+        dataset.fcntl.flock(lock, dataset.fcntl.LOCK_EX)
+        registry.remove_unused()
+        assert os.listdir(tmp_path / 'arrays') == ['a1']
+    registry.remove_unused()
+    assert os.listdir(tmp_path / 'arrays') == []
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from data_store import SafetyDataStore
+from forecast import TrendForecaster
+
+
+def make_store(years, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {'LGA': ['Albury', 'Ballina', 'Bega Valley']}
+    for crime in ('Theft', 'Assault'):
+        for year in years:
+            columns[f'{crime}_Count_{year}'] = rng.integers(0, 500, 3)
+            columns[f'{crime}_Rate_{year}'] = rng.uniform(0, 2000, 3)
+    return SafetyDataStore(pd.DataFrame(columns))
+
+
+def test_extended_matches_a_full_fit():
+    new = make_store(['2020', '2021', '2022', '2023', '2024'])
+    old = SafetyDataStore(pd.DataFrame({
+        column: values for column, values in new.columns.items() if not column.endswith('2024')
+    } | {'LGA': new.lgas}))
+    previous = TrendForecaster.from_store(old)
+    previous_fit = [array.copy() for array in previous.fit()]
+
+    extended = previous.extended(new, old)
+    full = TrendForecaster.from_store(new)
+    assert extended.years == full.years
+    for a, b in zip(extended.fit(), full.fit()):
+        np.testing.assert_allclose(a, b)
+    # The previous fits are left as they were
+    assert previous.years == [2020, 2021, 2022, 2023]
+    for a, b in zip(previous.fit(), previous_fit):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_extended_refuses_changed_history():
+    old = make_store(['2020', '2021'], seed=1)
+    new = make_store(['2020', '2021', '2022'], seed=2)
+    assert TrendForecaster.from_store(old).extended(new, old) is None
+    # Same years: nothing to append
+    assert TrendForecaster.from_store(old).extended(old, old) is None
@@ -0,0 +1,132 @@
+import numpy as np
+
+from geometry import (DETAIL_LEVELS, _chain_rings, _ring_area, build_detail_levels, dissolve,
+                      vertex_count)
+
+# Grid cells of 0.01 degrees near Sydney, with borders of STEPS segments each
+X0, Y0, CELL, STEPS = 151.0, -33.9, 0.01, 20
+
+
+def grid(columns, rows, wiggle=0.0, seed=0):
+    """Returns a FeatureCollection of columns x rows square suburbs named 'c<i>-<j>'.
+
+    Every border between two cells is a polyline shared point for point by
+    both of them, moved sideways by up to `wiggle` degrees.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, CELL, STEPS + 1)
+
+    def point(x, y):
+        # Rounded like simplified geometry, so corners meet exactly
+        return [round(x, 6), round(y, 6)]
+
+    def noise():
+        offsets = rng.uniform(-wiggle, wiggle, STEPS + 1)
+        offsets[0] = offsets[-1] = 0
+        return offsets
+
+    # Horizontal borders [row line][column], vertical borders [column line][row]
+    horizontal = [[[point(X0 + i * CELL + dx, Y0 + j * CELL + dy) for dx, dy in zip(t, noise())]
+                   for i in range(columns)] for j in range(rows + 1)]
+    vertical = [[[point(X0 + i * CELL + dx, Y0 + j * CELL + dy) for dx, dy in zip(noise(), t)]
+                 for j in range(rows)] for i in range(columns + 1)]
+
+    features = []
+    for i in range(columns):
+        for j in range(rows):
+            ring = (horizontal[j][i][:-1] + vertical[i + 1][j][:-1]
+                    + horizontal[j + 1][i][::-1][:-1] + vertical[i][j][::-1])
+            features.append({
+                'type': 'Feature',
+                'properties': {'nsw_loca_2': f'c{i}-{j}'},
+                'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def rings_of(geojson):
+    for feature in geojson['features']:
+        geometry = feature['geometry']
+        polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+        for polygon in polygons:
+            yield from polygon
+
+
+def test_adjacent_squares_dissolve_to_one_ring():
+    geojson = grid(2, 1)
+    lgas = dissolve(geojson, {'c0-0': 'Albury', 'c1-0': 'Albury'})
+
+    [feature] = lgas['features']
+    assert feature['properties'] == {'LGA': 'Albury'}
+    [[ring]] = feature['geometry']['coordinates']
+    assert ring[0] == ring[-1]
+    assert np.isclose(abs(_ring_area(ring)), 2 * CELL * CELL)
+    # The shared border is gone: no vertex of the outline lies inside the union
+    assert all(not (X0 < x < X0 + 2 * CELL and Y0 < y < Y0 + CELL) for x, y in ring)
+
+
+def test_hole_survives_dissolve():
+    # Eight cells around the middle one of a 3 x 3 grid form an LGA with a hole
+    geojson = grid(3, 3)
+    mapping = {f'c{i}-{j}': 'Albury' for i in range(3) for j in range(3)}
+    mapping['c1-1'] = 'Ballina'
+    lgas = {feature['properties']['LGA']: feature for feature in dissolve(geojson, mapping)['features']}
+
+    [[outer, hole]] = lgas['Albury']['geometry']['coordinates']
+    assert np.isclose(abs(_ring_area(outer)), 9 * CELL * CELL)
+    assert np.isclose(abs(_ring_area(hole)), CELL * CELL)
+    [[ballina]] = lgas['Ballina']['geometry']['coordinates']
+    assert sorted(map(tuple, ballina[:-1])) == sorted(map(tuple, hole[:-1]))
+
+
+def test_features_without_a_group_are_left_out():
+    lgas = dissolve(grid(2, 1), {'c0-0': 'Albury'})
+    assert [feature['properties']['LGA'] for feature in lgas['features']] == ['Albury']
+
+
+def test_chain_rings_closes_every_ring():
+    square = [(0, 0), (1, 0), (1, 1), (0, 1)]
+    edges = list(zip(square, square[1:] + square[:1]))
+    [ring] = _chain_rings(edges)
+    assert ring[0] == ring[-1]
+    assert sorted(ring[:-1]) == sorted(square)
+
+
+def t_junction(wiggle):
+    """Returns a tall suburb next to two small ones, meeting it halfway up its side."""
+    cells = grid(2, 2, wiggle=wiggle)
+    tall = dissolve(cells, {'c0-0': 'tall', 'c0-1': 'tall'}, group='nsw_loca_2')['features']
+    return {**cells, 'features': tall + cells['features'][2:]}
+
+
+def test_simplified_neighbours_share_their_borders():
+    geojson = t_junction(wiggle=0.0005)
+    for level, simplified in build_detail_levels(geojson).items():
+        # A border point kept on one side only would leave slivers, which
+        # the dissolve returns as holes
+        mapping = {feature['properties']['nsw_loca_2']: 'Albury' for feature in geojson['features']}
+        [feature] = dissolve(simplified, mapping)['features']
+        assert [len(polygon) for polygon in feature['geometry']['coordinates']] == [1], level
+
+    simplified = build_detail_levels(geojson)['low']
+    assert vertex_count(simplified) < vertex_count(geojson)
+
+    # The junction halfway up the tall suburb's side is kept on both sides
+    def points(name):
+        [feature] = [feature for feature in simplified['features'] if feature['properties']['nsw_loca_2'] == name]
+        return {tuple(point) for ring in rings_of({'features': [feature]}) for point in ring}
+
+    junction = (X0 + CELL, round(Y0 + CELL, 6))
+    assert junction in points('tall') & points('c1-0') & points('c1-1')
+
+
+def test_every_detail_level_produces_closed_rings():
+    geojson = grid(3, 3, wiggle=0.0005, seed=1)
+    levels = build_detail_levels(geojson)
+    assert set(levels) == set(DETAIL_LEVELS)
+    for level, simplified in levels.items():
+        assert len(simplified['features']) == len(geojson['features'])
+        for ring in rings_of(simplified):
+            assert len(ring) >= 4, level
+            assert ring[0] == ring[-1], level
+            assert _ring_area(ring) != 0, level
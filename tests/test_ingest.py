@@ -0,0 +1,53 @@
+import logging
+
+import pandas as pd
+import pytest
+
+from ingest import build_table, count_incidents
+
+# (day, month) of the incidents: the first has a day of 12 or less, which
+# made pandas read every ISO date as year-day-month
+DAYS = [(5, 1), (20, 1), (3, 2), (28, 2), (13, 3), (1, 3), (31, 3)]
+EXPECTED = {'2025-01': 2, '2025-02': 2, '2025-03': 3}
+
+
+def write_extract(path, dates):
+    pd.DataFrame({
+        'LGA': ['Albury'] * len(dates),
+        'Offence category': ['Theft'] * len(dates),
+        'Date': dates,
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def period_counts(counts):
+    return counts.groupby(level='period').sum().to_dict()
+
+
+def test_iso_dates(tmp_path):
+    path = write_extract(tmp_path / 'iso.csv', [f'2025-{m:02d}-{d:02d}' for d, m in DAYS])
+    counts = count_incidents(path, 'LGA', 'Offence category', 'Date')
+    assert period_counts(counts) == EXPECTED
+
+
+@pytest.mark.parametrize('date_format', ['%d/%m/%Y', 'mixed'])
+def test_day_first_dates(tmp_path, date_format):
+    path = write_extract(tmp_path / 'dmy.csv', [f'{d:02d}/{m:02d}/2025' for d, m in DAYS])
+    counts = count_incidents(path, 'LGA', 'Offence category', 'Date', date_format=date_format)
+    assert period_counts(counts) == EXPECTED
+
+
+def test_unreadable_dates_are_logged(tmp_path, caplog):
+    path = write_extract(tmp_path / 'bad.csv', ['2025-01-05', '05/01/2025', 'soon'])
+    with caplog.at_level(logging.WARNING, logger='safety.ingest'):
+        counts = count_incidents(path, 'LGA', 'Offence category', 'Date')
+    assert period_counts(counts) == {'2025-01': 1}
+    assert 'left out 2 rows' in caplog.text
+
+
+def test_partial_year_is_held_back(tmp_path):
+    path = write_extract(tmp_path / 'iso.csv', [f'2025-{m:02d}-{d:02d}' for d, m in DAYS])
+    counts = count_incidents(path, 'LGA', 'Offence category', 'Date')
+    population = pd.Series({'Albury': 50_000}, name='Population')
+    table = build_table(counts, population)
+    assert not [column for column in table.columns if column.endswith('_2025')]
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import SafetyDataStore
+from ranking import RankingIndex, percentile, rank_order
+from scoring import SafetyScorer
+
+
+def make_index(final_scores=True):
+    columns = {
+        'LGA': ['Albury', 'Ballina', 'Bega Valley', 'Blacktown', 'Albury'],
+        'Theft_Count_2023': [10, 30, 30, 5, 99],
+        'Theft_Rate_2023': [100.0, 300.0, 300.0, 50.0, 990.0],
+        'Theft_Count_2024': [20, 10, 40, 30, 99],
+        'Theft_Rate_2024': [200.0, 100.0, 400.0, 300.0, 990.0],
+    }
+    if final_scores:
+        columns['Final_Safety_Score'] = [70.0, 40.0, 90.0, 55.0, 0.0]
+    store = SafetyDataStore(pd.DataFrame(columns))
+    return RankingIndex(store, SafetyScorer(store))
+
+
+def test_rank_order_keeps_ties_in_order():
+    order, ranks = rank_order([3, 7, 7, 1])
+    assert order.tolist() == [1, 2, 0, 3]
+    assert ranks.tolist() == [3, 1, 2, 4]
+
+
+def test_rank_order_of_nothing():
+    order, ranks = rank_order([])
+    assert order.tolist() == [] and ranks.tolist() == []
+
+
+def test_top_and_bottom():
+    index = make_index()
+    assert index.top('count', 'Theft', '2024', n=2) == ['Bega Valley', 'Blacktown']
+    assert index.bottom('count', 'Theft', '2024', n=2) == ['Ballina', 'Albury']
+    # Ties keep table order, from both ends
+    assert index.top('rate', 'Theft', '2023', n=2) == ['Ballina', 'Bega Valley']
+    assert index.bottom('rate', 'Theft', '2023', n=4) == ['Blacktown', 'Albury', 'Bega Valley', 'Ballina']
+    assert index.top('count', 'Theft', '2024', n=10) == ['Bega Valley', 'Blacktown', 'Albury', 'Ballina']
+
+
+def test_duplicate_lga_is_ranked_with_its_first_row():
+    index = make_index()
+    assert len(index) == 4
+    assert index.rank('Albury', 'count', 'Theft', '2023') == 3
+    assert index.value('Albury', 'count', 'Theft', '2023') == 10
+
+
+def test_safety_rank_and_percentile():
+    index = make_index()
+    assert index.top('safety', n=1) == ['Bega Valley']
+    assert [index.rank(lga, 'safety') for lga in index.lgas] == [2, 4, 1, 3]
+    assert index.percentile('Bega Valley', 'safety') == 100.0
+    assert index.percentile('Ballina', 'safety') == 0.0
+    assert index.percentile('Albury', 'safety') == pytest.approx(200 / 3)
+    assert percentile(1, 1) == 100.0
+
+
+def test_year_safety_scores_rank_the_least_crime_first():
+    index = make_index()
+    # Equal-weight score of the 2024 rates: Ballina has the lowest rate
+    assert index.top('safety', year='2024', n=4) == ['Ballina', 'Albury', 'Blacktown', 'Bega Valley']
+    assert index.value('Ballina', 'safety', year='2024') == pytest.approx(100)
+    for rank, lga in enumerate(index.top('safety', year='2024', n=4), start=1):
+        assert index.rank(lga, 'safety', year='2024') == rank
+
+
+def test_missing_keys():
+    index = make_index(final_scores=False)
+    assert ('safety', None, None) not in index
+    assert ('safety', None, '2024') in index
+    assert ('count', 'Drug', '2024') not in index
+    with pytest.raises(KeyError):
+        index.top('safety')
+    with pytest.raises(KeyError):
+        index.rank('Albury', 'count', 'Theft', '2019')
+    with pytest.raises(KeyError):
+        index.rank('Nowhere', 'count', 'Theft', '2024')
+
+
+def test_values_match_the_ranks():
+    index = make_index()
+    for key, values in index.values.items():
+        assert np.all(np.diff(np.asarray(values)[index.orders[key]]) <= 0), key
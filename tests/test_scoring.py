@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import SafetyDataStore
+from scoring import SafetyScorer, _minmax
+
+LGAS = ['Albury', 'Ballina', 'Bega Valley', 'Blacktown']
+
+
+def make_scorer(rates):
+    """Returns a scorer over {crime: [rate per LGA]}, the same for 2023 and 2024."""
+    columns = {'LGA': LGAS}
+    for crime, values in rates.items():
+        for year in ('2023', '2024'):
+            columns[f'{crime}_Count_{year}'] = [int(value) for value in values]
+            columns[f'{crime}_Rate_{year}'] = values
+    return SafetyScorer(SafetyDataStore(pd.DataFrame(columns)))
+
+
+def test_minmax_constant_column_is_zero():
+    values = np.array([[1.0, 5.0], [3.0, 5.0], [2.0, 5.0]])
+    np.testing.assert_array_equal(_minmax(values), [[0, 0], [1, 0], [0.5, 0]])
+
+
+def test_scores_run_from_least_to_most_weighted_crime():
+    scorer = make_scorer({'Theft': [10.0, 40.0, 20.0, 30.0], 'Assault': [5.0, 5.0, 5.0, 5.0]})
+    np.testing.assert_allclose(scorer.scores([1, 0]), [100, 0, 200 / 3, 100 / 3], rtol=1e-6)
+    assert scorer.top([1, 0], n=2) == ['Albury', 'Bega Valley']
+
+
+def test_constant_crime_type_does_not_change_the_order():
+    scorer = make_scorer({'Theft': [10.0, 40.0, 20.0, 30.0], 'Assault': [5.0, 5.0, 5.0, 5.0]})
+    np.testing.assert_allclose(scorer.scores([1, 1]), scorer.scores([1, 0]), rtol=1e-6)
+    # Weighting only the constant crime type leaves every LGA equal
+    np.testing.assert_array_equal(scorer.scores([0, 1]), [100] * 4)
+
+
+def test_all_zero_weights_score_every_lga_equally():
+    scorer = make_scorer({'Theft': [10.0, 40.0, 20.0, 30.0], 'Assault': [1.0, 2.0, 3.0, 4.0]})
+    np.testing.assert_array_equal(scorer.weight_vector([0, 0]), [0, 0])
+    np.testing.assert_array_equal(scorer.scores([0, 0]), [100] * 4)
+    # Cleared sliders send None, and negative weights count as 0
+    np.testing.assert_array_equal(scorer.scores([None, -1]), [100] * 4)
+
+
+def test_weights_are_normalized():
+    scorer = make_scorer({'Theft': [10.0, 40.0, 20.0, 30.0], 'Assault': [4.0, 1.0, 3.0, 2.0]})
+    np.testing.assert_allclose(scorer.scores([2, 6]), scorer.scores([1, 3]), rtol=1e-6)
+    with pytest.raises(ValueError):
+        scorer.weight_vector([1, 2, 3])
+
+
+def test_crime_types_without_a_slider_weigh_one():
+    scorer = make_scorer({'Theft': [10.0, 40.0, 20.0, 30.0], 'Assault': [4.0, 1.0, 3.0, 2.0]})
+    assert scorer.slider_weights(['Assault', 'Theft'], [3, 0]) == [0, 3]
+    # Assault was added after the sliders were built
+    assert scorer.slider_weights(['Theft'], [2]) == [2, 1]
+    # Sliders of crime types the data no longer has are ignored
+    assert scorer.slider_weights(['Theft', 'Drug', 'Assault'], [2, 5, 0]) == [2, 0]
+
+
+def test_scores_of_one_year():
+    scorer = make_scorer({'Theft': [10.0, 40.0, 20.0, 30.0]})
+    np.testing.assert_allclose(scorer.scores([1], year='2024'), scorer.scores([1]), rtol=1e-6)
+    assert scorer.score('Ballina', [1], year='2023') == 0
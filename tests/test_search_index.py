@@ -0,0 +1,82 @@
+from search_index import SearchIndex, normalize
+
+LGAS = ['Sutherland Shire', 'Sydney', 'North Sydney', 'Bega Valley', 'The Hills Shire', 'Parramatta', "St Mary's"]
+SUBURBS = {
+    'Sylvania': 'Sutherland Shire',
+    'Sydney Olympic Park': 'Parramatta',
+    'North Sydney': 'North Sydney',
+    'Bega': 'Bega Valley',
+    'Hillsdale': 'Bayside',
+}
+
+
+def make_index():
+    return SearchIndex(LGAS, SUBURBS)
+
+
+def test_lga_prefix_then_suburb_prefix_then_later_words():
+    assert make_index().search('sy') == [
+        ('Sydney', 'Sydney'),
+        ('Sydney Olympic Park (Parramatta)', 'Parramatta'),
+        ('Sylvania (Sutherland Shire)', 'Sutherland Shire'),
+        ('North Sydney', 'North Sydney'),
+    ]
+
+
+def test_later_words_are_alphabetical():
+    assert make_index().search('shire') == [
+        ('Sutherland Shire', 'Sutherland Shire'),
+        ('The Hills Shire', 'The Hills Shire'),
+    ]
+
+
+def test_middle_of_a_word_and_typos_fall_back_to_trigrams():
+    index = make_index()
+    assert index.search('ylvan')[0] == ('Sylvania (Sutherland Shire)', 'Sutherland Shire')
+    assert index.search('paramatta')[0] == ('Parramatta', 'Parramatta')
+    # A prefix match hides the fuzzy ones
+    assert index.search('sydney') == [
+        ('Sydney', 'Sydney'),
+        ('Sydney Olympic Park (Parramatta)', 'Parramatta'),
+        ('North Sydney', 'North Sydney'),
+    ]
+    assert index.search('qqqq') == []
+
+
+def test_each_lga_is_offered_once():
+    assert make_index().search('bega') == [('Bega Valley', 'Bega Valley')]
+    assert len(make_index().search('s', limit=2)) == 2
+
+
+def test_case_and_punctuation_are_ignored():
+    index = make_index()
+    assert normalize("  St. Mary's--NORTH ") == 'st mary s north'
+    assert index.search('  NORTH-sydney!! ') == [('North Sydney', 'North Sydney')]
+    assert index.search('st marys') == index.search("St Mary's") == [("St Mary's", "St Mary's")]
+
+
+def test_empty_query():
+    index = make_index()
+    assert index.search('') == []
+    assert index.search(' -- ') == []
+
+
+def test_suburbs_of_unknown_lgas_and_lga_names_are_left_out():
+    index = make_index()
+    # Hillsdale is in an LGA the table does not have, and the suburb North
+    # Sydney would only repeat the LGA
+    assert len(index) == len(LGAS) + 3
+    assert 'Hillsdale (Bayside)' not in [label for label, _ in index.entries]
+
+
+def test_lga_names():
+    index = make_index()
+    assert index.lga_names['the hills shire'] == 'The Hills Shire'
+    assert index.lga('the hills  SHIRE') == 'The Hills Shire'
+    assert index.lga("st marys") is None
+    assert index.lga("ST MARY'S") == "St Mary's"
+    # Suburbs and partial names are not LGAs
+    assert index.lga('Sylvania') is None
+    assert index.lga('hills') is None
+    # The first of two LGAs with the same normalised name wins
+    assert SearchIndex(['Bega-Valley', 'Bega Valley']).lga('bega valley') == 'Bega-Valley'
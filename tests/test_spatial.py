@@ -0,0 +1,134 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import spatial
+from geometry import point_in_ring
+from spatial import SpatialIndex, haversine_km
+
+X0, Y0 = 151.0, -34.0
+
+
+def square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+def feature(name, *rings):
+    return {
+        'type': 'Feature',
+        'properties': {'nsw_loca_2': name},
+        'geometry': {'type': 'Polygon', 'coordinates': list(rings)},
+    }
+
+
+def donut():
+    """Returns a square suburb with a hole, another one filling the hole, and one to the east."""
+    return {'type': 'FeatureCollection', 'features': [
+        feature('Donut', square(X0, Y0, 0.03), square(X0 + 0.01, Y0 + 0.01, 0.01)[::-1]),
+        feature('Middle', square(X0 + 0.01, Y0 + 0.01, 0.01)),
+        feature('East', square(X0 + 0.05, Y0, 0.03)),
+    ]}
+
+
+def scattered(n=300, seed=0):
+    """Returns n small square suburbs scattered over about 100 km."""
+    rng = np.random.default_rng(seed)
+    return {'type': 'FeatureCollection', 'features': [
+        feature(f's{i}', square(X0 + x, Y0 + y, 0.005))
+        for i, (x, y) in enumerate(rng.uniform(0, 1, (n, 2)))
+    ]}
+
+
+def test_point_in_ring_with_a_hole():
+    outer, hole = donut()['features'][0]['geometry']['coordinates']
+    # Inside the hole, the point is inside both rings: an even count is outside
+    assert point_in_ring(X0 + 0.015, Y0 + 0.015, outer)
+    assert point_in_ring(X0 + 0.015, Y0 + 0.015, hole)
+    assert point_in_ring(X0 + 0.005, Y0 + 0.015, outer)
+    assert not point_in_ring(X0 + 0.005, Y0 + 0.015, hole)
+    assert not point_in_ring(X0 + 0.04, Y0 + 0.015, outer)
+
+
+def test_locate_respects_holes():
+    index = SpatialIndex(donut())
+    assert index.locate(X0 + 0.015, Y0 + 0.015) == 'Middle'
+    assert index.locate(X0 + 0.005, Y0 + 0.015) == 'Donut'
+    assert index.locate(X0 + 0.025, Y0 + 0.025) == 'Donut'
+    assert index.locate(X0 + 0.06, Y0 + 0.01) == 'East'
+    assert index.locate(X0 + 0.04, Y0 + 0.01) is None
+    assert index.locate(0, 0) is None
+
+
+def test_locate_only_tests_polygons_whose_bbox_holds_the_point(monkeypatch):
+    tested = []
+
+    def counting(x, y, ring):
+        tested.append(len(ring))
+        return point_in_ring(x, y, ring)
+
+    monkeypatch.setattr(spatial, 'point_in_ring', counting)
+    index = SpatialIndex(donut())
+    assert index.locate(X0 + 0.06, Y0 + 0.01) == 'East'
+    assert len(tested) == 1
+    # Outside every bounding box, no polygon is tested at all
+    tested.clear()
+    assert index.locate(X0 + 0.04, Y0 + 0.01) is None
+    assert tested == []
+
+
+def test_centroids_subtract_holes():
+    index = SpatialIndex(donut())
+    assert index.centroid('Donut') == pytest.approx((X0 + 0.015, Y0 + 0.015))
+    assert index.areas[index.positions['Donut']] == pytest.approx(0.03 ** 2 - 0.01 ** 2)
+
+
+def test_haversine_km():
+    # Sydney to Melbourne
+    assert haversine_km(151.2093, -33.8688, np.array([144.9631]), np.array([-37.8136]))[0] == pytest.approx(713.4, abs=1)
+    assert haversine_km(X0, Y0, np.array([X0]), np.array([Y0]))[0] == 0
+
+
+def test_within_and_nearest_are_sorted_by_distance():
+    index = SpatialIndex(scattered())
+    lon, lat = X0 + 0.5, Y0 + 0.5
+    distances = haversine_km(lon, lat, index.centroids[:, 0], index.centroids[:, 1])
+
+    within = index.within(lon, lat, 20)
+    assert {name for name, _ in within} == {index.names[i] for i in np.flatnonzero(distances <= 20)}
+    assert [km for _, km in within] == sorted(km for _, km in within)
+
+    nearest = index.nearest(lon, lat, 5)
+    assert [name for name, _ in nearest] == [index.names[i] for i in np.argsort(distances)[:5]]
+    assert len(index.nearest(lon, lat, 1000)) == len(index)
+    assert index.nearest(lon, lat, 0) == []
+
+
+def test_kd_tree_matches_haversine():
+    if spatial.cKDTree is None:
+        pytest.skip('needs SciPy')
+    index = SpatialIndex(scattered())
+    brute = pickle.loads(pickle.dumps(index))
+    brute.tree = None
+    for lon, lat in [(X0 + 0.5, Y0 + 0.5), (X0, Y0), (X0 + 2, Y0 - 1)]:
+        for radius in (1, 10, 50, 500):
+            assert index.within(lon, lat, radius) == pytest.approx(brute.within(lon, lat, radius))
+        for k in (1, 7, len(index)):
+            assert index.nearest(lon, lat, k) == pytest.approx(brute.nearest(lon, lat, k))
+
+
+def test_pickle_rebuilds_the_tree():
+    index = SpatialIndex(scattered(n=20))
+    assert index.__getstate__()['tree'] is None
+    loaded = pickle.loads(pickle.dumps(index))
+    assert (loaded.tree is None) == (spatial.cKDTree is None)
+    assert loaded.within(X0 + 0.5, Y0 + 0.5, 30) == index.within(X0 + 0.5, Y0 + 0.5, 30)
+    assert loaded.locate(*index.centroid('s3')) == 's3'
+
+
+def test_empty_index():
+    index = SpatialIndex({'type': 'FeatureCollection', 'features': []})
+    assert len(index) == 0
+    assert index.within(X0, Y0, 10) == []
+    assert index.nearest(X0, Y0, 5) == []
+    assert index.locate(X0, Y0) is None
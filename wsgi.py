@@ -0,0 +1,16 @@
+"""Production entry point.
+
+    gunicorn -c gunicorn.conf.py
+
+gunicorn.conf.py preloads this module in the master process, so the data is
+loaded once and the workers are forked from it. The numeric arrays are
+memory-mapped read-only and the map geometry is served from files, so the
+workers share those pages instead of each holding a copy.
+"""
+import os
+
+os.environ.setdefault('SAFETY_MMAP', '1')
+
+from app import app  # noqa: E402
+
+server = app.server